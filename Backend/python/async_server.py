@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+"""
+Asyncio request server for the SmartReq AI NLP processor
+--------------------------------------------------------
+One warm Python service for all generate/refine traffic from the Node
+backend. Speaks the NDJSON protocol of worker.py on a Unix socket, but
+unlike worker.serve_unix_socket it accepts many connections and many
+in-flight requests per connection; responses carry the request id and may
+arrive out of order.
+
+spaCy work runs in a thread or process executor so the event loop only
+does I/O, or in forked children awaited without an executor (prefork.py).
+Backpressure:
+
+  - at most max_inflight requests run in the executor at once
+  - up to max_queue more wait for a slot
+  - beyond that requests are rejected immediately with
+    {"type": "error", "error": "Server busy ...", "retryable": true}
+
+Health responses include a "queue" section with the in-flight count, queue
+depth and rejections. SIGTERM/SIGINT or a shutdown message stop accepting
+connections, answer everything already received, then exit.
+"""
+
+import asyncio
+import logging
+import os
+import signal
+from concurrent.futures import Executor
+from contextlib import asynccontextmanager
+from typing import IO, Any, Callable, Dict, Set
+
+from worker import WorkerState, control_response, encode_message, parse_line
+
+
+logger = logging.getLogger("smartreq.nlp.server")
+
+# Requests can carry whole documents; asyncio's default line limit is 64 KiB
+MAX_LINE_BYTES = 64 * 1024 * 1024
+
+
+class ServerBusy(Exception):
+    """Raised when both the in-flight slots and the wait queue are full."""
+
+
+class RequestQueue:
+    """Max in-flight limit with a bounded wait queue."""
+
+    def __init__(self, max_inflight: int, max_queue: int):
+        if max_inflight < 1:
+            raise ValueError("max_inflight must be >= 1")
+        if max_queue < 0:
+            raise ValueError("max_queue must be >= 0")
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.inflight = 0
+        self.queued = 0
+        self.rejected = 0
+        self._slots = asyncio.Semaphore(max_inflight)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Wait for an execution slot, or raise ServerBusy if the queue is full."""
+        if self._slots.locked() and self.queued >= self.max_queue:
+            self.rejected += 1
+            raise ServerBusy(f"Server busy: {self.inflight} in flight, {self.queued} queued")
+        self.queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+        self.inflight += 1
+        try:
+            yield
+        finally:
+            self.inflight -= 1
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "inflight": self.inflight,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "max_inflight": self.max_inflight,
+            "max_queue": self.max_queue,
+        }
+
+
+class AsyncServer:
+    """Concurrent NDJSON server that offloads requests to an executor.
+
+    call(payload) -> result dict runs in executor; for a process executor it
+    must be picklable (a module-level function). With executor None, call is
+    a coroutine function awaited on the loop (PreforkPool.call).
+    on_result(payload, result), if given, post-processes each result in this
+    process (e.g. metrics).
+    """
+
+    def __init__(
+        self,
+        call: Callable[[Dict[str, Any]], Dict[str, Any]],
+        executor: Executor | None,
+        state: WorkerState,
+        max_inflight: int,
+        max_queue: int = 64,
+        on_result: Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]] | None = None,
+    ):
+        self.call = call
+        self.on_result = on_result
+        self.executor = executor
+        self.state = state
+        self.queue = RequestQueue(max_inflight, max_queue)
+        self.state.health_providers["queue"] = self.queue.stats
+        self._stop: asyncio.Event | None = None
+        self._requests: Set[asyncio.Task] = set()
+        self._writers: Set[asyncio.StreamWriter] = set()
+
+    async def _process(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        request_id = payload.get("id")
+        try:
+            async with self.queue.slot():
+                if self.executor is None:
+                    result = await self.call(payload)
+                else:
+                    loop = asyncio.get_running_loop()
+                    result = await loop.run_in_executor(self.executor, self.call, payload)
+            if self.on_result is not None:
+                result = self.on_result(payload, result)
+        except ServerBusy as e:
+            self.state.failed += 1
+            return {"id": request_id, "type": "error", "error": str(e), "retryable": True}
+        except Exception as e:
+            logger.exception("Failed to process server request")
+            self.state.failed += 1
+            return {"id": request_id, "type": "error", "error": str(e)}
+        self.state.processed += 1
+        return {"id": request_id, "type": "result", **result}
+
+    async def _respond(self, line: str, writer: asyncio.StreamWriter, lock: asyncio.Lock) -> None:
+        payload, response = parse_line(line, self.state)
+        if payload is not None:
+            response = control_response(payload, self.state)
+            if response is None:
+                response = await self._process(payload)
+            elif self.state.stopping:
+                self._stop.set()
+        if response is None:
+            return
+        async with lock:
+            if writer.is_closing():
+                return
+            try:
+                writer.write(encode_message(response).encode("utf-8"))
+                await writer.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                logger.warning("Client disconnected before the response was written")
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._writers.add(writer)
+        lock = asyncio.Lock()
+        pending: Set[asyncio.Task] = set()
+        try:
+            while not self._stop.is_set():
+                line = await reader.readline()
+                if not line:  # client closed its side
+                    break
+                task = asyncio.create_task(self._respond(line.decode("utf-8"), writer, lock))
+                for tasks in (pending, self._requests):
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            # Answer everything this client sent before closing
+            await asyncio.gather(*pending)
+        except (ValueError, asyncio.LimitOverrunError) as e:
+            logger.warning(f"Dropping client: {e}")
+        except ConnectionResetError:
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def serve_unix(self, path: str, outfile: IO[str]) -> None:
+        """Serve on a Unix socket until shutdown; ready message goes to outfile."""
+        self._stop = asyncio.Event()
+        if os.path.exists(path):
+            os.unlink(path)
+
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, self._handle_signal, signum)
+
+        server = await asyncio.start_unix_server(self._client, path=path, limit=MAX_LINE_BYTES)
+        ready = self.state.ready_message()
+        ready.update(socket=path, max_inflight=self.queue.max_inflight, max_queue=self.queue.max_queue)
+        outfile.write(encode_message(ready))
+        outfile.flush()
+
+        try:
+            await self._stop.wait()
+        finally:
+            server.close()
+            # Finish requests already received, then drop idle connections
+            if self._requests:
+                await asyncio.gather(*self._requests, return_exceptions=True)
+            for writer in list(self._writers):
+                writer.close()
+            await server.wait_closed()
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                loop.remove_signal_handler(signum)
+            if os.path.exists(path):
+                os.unlink(path)
+            logger.info(f"Server stopped after {self.state.processed} requests")
+
+    def _handle_signal(self, signum: int) -> None:
+        logger.info(f"Received signal {signum}, shutting down server")
+        self.state.stopping = True
+        self._stop.set()
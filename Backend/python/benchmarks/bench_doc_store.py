@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+"""
+Benchmark the parsed-Doc store
+------------------------------
+Times a fresh parse (nlp(text)) against restoring the same Doc from the
+DocStore memory tier and from its SQLite tier, on synthetic corpora, and
+reports the serialized size and the speedup over parsing as JSON.
+
+Usage:
+  python python/benchmarks/bench_doc_store.py --sizes page 10-pages 100-pages --repeat 3
+"""
+
+import argparse
+import json
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import nlp_processor  # noqa: E402
+from benchmarks.corpus import SIZES, corpus_for  # noqa: E402
+from doc_store import DocStore, doc_key, doc_to_bytes  # noqa: E402
+from pipelines import pipeline_key  # noqa: E402
+
+
+def best_of(func, repeat: int) -> float:
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - started)
+    return min(runs)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark parsing against loading from the parsed-Doc store")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=["page", "10-pages", "100-pages"])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    nlp = nlp_processor.load_models()
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        disk = DocStore(path=str(Path(directory) / "docs.sqlite3"), max_memory_bytes=0)
+        memory = DocStore()
+        for size in args.sizes:
+            text = corpus_for(size, seed=0)
+            nlp.max_length = max(nlp.max_length, len(text) + 1)
+            key = doc_key(text, pipeline_key(nlp))
+            doc = nlp(text)
+            disk.put(key, doc)
+            memory.put(key, doc)
+
+            parse = best_of(lambda: nlp(text), args.repeat)
+            from_memory = best_of(lambda: memory.get(key, nlp.vocab), args.repeat)
+            from_disk = best_of(lambda: disk.get(key, nlp.vocab), args.repeat)
+            results.append({
+                "size": size,
+                "chars": len(text),
+                "serialized_bytes": len(doc_to_bytes(doc)),
+                "parse_ms": round(parse * 1000, 2),
+                "memory_ms": round(from_memory * 1000, 2),
+                "disk_ms": round(from_disk * 1000, 2),
+                "memory_speedup": round(parse / from_memory, 1),
+                "disk_speedup": round(parse / from_disk, 1),
+            })
+        disk.close()
+
+    print(json.dumps({"model": nlp_processor.model_info(nlp), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+"""
+Stage benchmark for the SmartReq AI NLP pipeline
+------------------------------------------------
+Times every stage of a generation separately on synthetic requirement
+corpora (benchmarks.corpus), with and without fintech terms:
+
+  parse, extract (extract_candidates_spacy), domain_boost, stories,
+  flow (build_swimlane_flow incl. Mermaid), confidence, process_text
+
+For each stage it reports p50/p95 latency, throughput in input characters
+per second and peak traced memory as JSON. Timing runs are made without
+tracemalloc; peak memory comes from one extra traced run per stage.
+
+--save-baseline writes the report; --baseline compares against a saved
+report and exits with status 1 if any stage's p50 (or peak memory) grew by
+more than --tolerance.
+
+Usage:
+  python python/benchmarks/bench_nlp.py --sizes sentence page 10-pages --repeat 5
+  python python/benchmarks/bench_nlp.py --save-baseline bench-baseline.json
+  python python/benchmarks/bench_nlp.py --baseline bench-baseline.json --tolerance 0.2
+"""
+
+import argparse
+import json
+import logging
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import nlp_processor  # noqa: E402
+from benchmarks.corpus import SIZES, corpus_for  # noqa: E402
+from uniqueness import get_tracker  # noqa: E402
+from utils import (  # noqa: E402
+    apply_domain_boost,
+    build_gherkin_stories,
+    build_swimlane_flow,
+    confidence_score,
+    extract_candidates_spacy,
+)
+
+STAGES = ("parse", "extract", "domain_boost", "stories", "flow", "confidence", "process_text")
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0..100)."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def stage_calls(nlp, text: str, project_type: str) -> Dict[str, Callable[[], Any]]:
+    """One zero-argument callable per stage, fed with the previous stage's output."""
+    doc = nlp(text)
+    roles, actions, benefits = extract_candidates_spacy(doc, rng=random.Random(0))
+    boosted = apply_domain_boost(project_type, actions, rng=random.Random(0))
+    actors = roles[:5] if len(roles) >= 2 else None
+
+    def process():
+        get_tracker().clear()  # keep the duplicate check out of the measurement
+        return nlp_processor.process_text(text, project_type, nlp, seed=0)
+
+    return {
+        "parse": lambda: nlp(text),
+        "extract": lambda: extract_candidates_spacy(doc, rng=random.Random(0)),
+        "domain_boost": lambda: apply_domain_boost(project_type, actions, rng=random.Random(0)),
+        "stories": lambda: build_gherkin_stories(roles, boosted, benefits, max_stories=5, rng=random.Random(0)),
+        "flow": lambda: build_swimlane_flow(boosted, min_steps=20, actors=actors, rng=random.Random(0), timestamp=0),
+        "confidence": lambda: confidence_score(roles, boosted, benefits),
+        "process_text": process,
+    }
+
+
+def measure(call: Callable[[], Any], repeat: int, chars: int) -> Dict[str, Any]:
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        runs.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    p50 = percentile(runs, 50)
+    return {
+        "p50_ms": round(p50 * 1000, 3),
+        "p95_ms": round(percentile(runs, 95) * 1000, 3),
+        "chars_per_second": round(chars / p50) if p50 else None,
+        "peak_memory_bytes": peak,
+    }
+
+
+def run(sizes: List[str], repeat: int, stages: List[str]) -> Dict[str, Any]:
+    nlp = nlp_processor.load_models()
+    results = []
+    for size in sizes:
+        for fintech in (False, True):
+            text = corpus_for(size, fintech=fintech, seed=0)
+            # The largest corpora exceed spaCy's default max_length (1M chars)
+            nlp.max_length = max(nlp.max_length, len(text) + 1)
+            calls = stage_calls(nlp, text, "fintech" if fintech else "default")
+            row = {"size": size, "fintech": fintech, "chars": len(text), "stages": {}}
+            for stage in stages:
+                row["stages"][stage] = measure(calls[stage], repeat, len(text))
+            results.append(row)
+    return {
+        "python": platform.python_version(),
+        "model": nlp_processor.model_info(nlp),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(
+    report: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float,
+    min_ms: float = 1.0,
+    min_bytes: int = 64 * 1024,
+) -> List[Dict[str, Any]]:
+    """Stages whose p50 or peak memory grew by more than tolerance."""
+    previous = {(row["size"], row["fintech"]): row["stages"] for row in baseline.get("results", [])}
+    regressions = []
+    for row in report["results"]:
+        before = previous.get((row["size"], row["fintech"]), {})
+        for stage, now in row["stages"].items():
+            old = before.get(stage)
+            if old is None:
+                continue
+            # Floors keep noise on tiny stages from counting as regressions
+            for metric, floor in (("p50_ms", min_ms), ("peak_memory_bytes", min_bytes)):
+                if now[metric] > floor and now[metric] > old[metric] * (1 + tolerance):
+                    regressions.append({
+                        "size": row["size"],
+                        "fintech": row["fintech"],
+                        "stage": stage,
+                        "metric": metric,
+                        "baseline": old[metric],
+                        "current": now[metric],
+                        "change": round(now[metric] / old[metric] - 1, 3) if old[metric] else None,
+                    })
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the NLP pipeline stage by stage")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=["sentence", "paragraph", "page", "10-pages"])
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save-baseline", dest="save_baseline", type=str, default=None, help="Write the report to this file")
+    parser.add_argument("--baseline", type=str, default=None, help="Compare against a saved report")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative growth before a stage counts as regressed")
+    parser.add_argument("--min-ms", dest="min_ms", type=float, default=1.0, help="Ignore latency regressions of stages faster than this")
+    parser.add_argument("--min-bytes", dest="min_bytes", type=int, default=64 * 1024, help="Ignore memory regressions of stages peaking below this")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    report = run(args.sizes, args.repeat, args.stages)
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(report, indent=2))
+
+    regressions = []
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(report, baseline, args.tolerance, args.min_ms, args.min_bytes)
+        report["regressions"] = regressions
+
+    print(json.dumps(report, indent=2))
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+"""
+Benchmark spaCy pipeline profiles
+---------------------------------
+Loads every profile from pipelines.PIPELINE_PROFILES and times parsing the
+same synthetic corpus with each, reporting load time, parse time and
+throughput relative to the full pipeline as JSON.
+
+Usage:
+  python python/benchmarks/bench_pipelines.py --size 10-pages --repeat 3
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.corpus import SIZES, corpus_for  # noqa: E402
+from pipelines import PIPELINE_PROFILES, load_pipeline  # noqa: E402
+
+
+def bench_profile(profile: str, paragraphs, repeat: int) -> dict:
+    started = time.perf_counter()
+    nlp = load_pipeline.__wrapped__(profile)  # bypass the per-process cache to time a cold load
+    load_seconds = time.perf_counter() - started
+
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _doc in nlp.pipe(paragraphs):
+            pass
+        runs.append(time.perf_counter() - started)
+
+    chars = sum(len(p) for p in paragraphs)
+    parse_seconds = statistics.median(runs)
+    return {
+        "profile": profile,
+        "components": nlp.pipe_names,
+        "load_seconds": round(load_seconds, 4),
+        "parse_seconds": round(parse_seconds, 4),
+        "chars_per_second": round(chars / parse_seconds) if parse_seconds else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark spaCy pipeline profiles")
+    parser.add_argument("--size", choices=list(SIZES), default="10-pages")
+    parser.add_argument("--fintech", action="store_true", help="Include fintech terms in the corpus")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--profiles", nargs="*", default=list(PIPELINE_PROFILES))
+    args = parser.parse_args()
+
+    paragraphs = corpus_for(args.size, fintech=args.fintech).split("\n\n")
+    results = [bench_profile(profile, paragraphs, args.repeat) for profile in args.profiles]
+
+    full = next((r for r in results if r["profile"] == "full"), None)
+    if full:
+        for r in results:
+            r["speedup_vs_full"] = round(full["parse_seconds"] / r["parse_seconds"], 2) if r["parse_seconds"] else None
+
+    print(json.dumps({"size": args.size, "fintech": args.fintech, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+"""
+Benchmark result serialization formats
+--------------------------------------
+Encodes real process_text results (seeded, from synthetic corpora of
+growing size) with the previous output encodings and with every --format
+this installation supports, and reports bytes, encode and decode time
+(best of --repeat) and the savings against the previous default as JSON:
+
+  json-indent   json.dumps(result, indent=2)   (pretty-printed)
+  json-default  json.dumps(result)             (old nlp_processor output)
+  json / orjson / msgpack                      (serialization.FORMATS)
+
+Usage:
+  python python/benchmarks/bench_serialization.py --sizes page 10-pages 100-pages --repeat 20
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import nlp_processor  # noqa: E402
+from benchmarks.corpus import SIZES, corpus_for  # noqa: E402
+from serialization import FORMATS, available, get_serializer  # noqa: E402
+from uniqueness import get_tracker  # noqa: E402
+
+
+def best_of(func, repeat: int) -> float:
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - started)
+    return min(runs)
+
+
+def encoders():
+    """(name, encode, decode) for the old encodings and each available format."""
+    found = [
+        ("json-indent", lambda r: json.dumps(r, indent=2).encode("utf-8"), json.loads),
+        ("json-default", lambda r: json.dumps(r, ensure_ascii=False).encode("utf-8"), json.loads),
+    ]
+    for name in FORMATS:
+        if available(name):
+            serializer = get_serializer(name)
+            if serializer.name == name:  # skip orjson when it fell back to json
+                found.append((name, serializer.dumps, serializer.loads))
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark result serialization formats")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=["page", "10-pages", "100-pages"])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    nlp = nlp_processor.load_models()
+    results = []
+    for size in args.sizes:
+        text = corpus_for(size, fintech=True, seed=0)
+        nlp.max_length = max(nlp.max_length, len(text) + 1)
+        get_tracker().clear()
+        result = nlp_processor.process_text(text, "fintech", nlp, seed=0)
+
+        rows = {}
+        for name, encode, decode in encoders():
+            data = encode(result)
+            rows[name] = {
+                "bytes": len(data),
+                "encode_ms": round(best_of(lambda: encode(result), args.repeat) * 1000, 3),
+                "decode_ms": round(best_of(lambda: decode(data), args.repeat) * 1000, 3),
+            }
+        baseline = rows["json-default"]
+        for row in rows.values():
+            row["bytes_saved"] = round(1 - row["bytes"] / baseline["bytes"], 3)
+            row["encode_speedup"] = round(baseline["encode_ms"] / row["encode_ms"], 2) if row["encode_ms"] else None
+        results.append({"size": size, "flow_nodes": len(result["flow"]["nodes"]), "formats": rows})
+
+    print(json.dumps({"results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+"""
+Benchmark sharded extraction of long documents
+----------------------------------------------
+Times nlp_processor.process_text (one Doc, one core) against
+process_sharded with a growing number of worker processes on the same
+synthetic document, and reports wall time and speedup as JSON.
+
+Usage:
+  python python/benchmarks/bench_sharding.py --size 100-pages --workers 2 4 8
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import nlp_processor  # noqa: E402
+from benchmarks.corpus import SIZES, corpus_for  # noqa: E402
+
+
+def timed(func) -> float:
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark sharded extraction")
+    parser.add_argument("--size", choices=list(SIZES), default="100-pages")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, os.cpu_count() or 1])
+    parser.add_argument("--shard-chars", dest="shard_chars", type=int, default=20_000)
+    parser.add_argument("--fintech", action="store_true")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    text = corpus_for(args.size, fintech=args.fintech, seed=0)
+    project_type = "fintech" if args.fintech else None
+    nlp = nlp_processor.load_models()
+
+    single = timed(lambda: nlp_processor.process_text(text, project_type, nlp, seed=0))
+    results = [{"workers": 1, "seconds": round(single, 3), "speedup": 1.0}]
+    for workers in sorted(set(args.workers)):
+        seconds = timed(lambda: nlp_processor.process_sharded(
+            text, project_type, workers=workers, shard_chars=args.shard_chars, seed=0
+        ))
+        results.append({"workers": workers, "seconds": round(seconds, 3), "speedup": round(single / seconds, 2)})
+
+    print(json.dumps({
+        "size": args.size,
+        "chars": len(text),
+        "shard_chars": args.shard_chars,
+        "cpus": os.cpu_count(),
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
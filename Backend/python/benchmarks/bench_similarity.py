@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+"""
+Benchmark the pairwise similarity engine
+----------------------------------------
+Times the diversity check in utils.confidence_score three ways on synthetic
+action lists: the original calculate_similarity double loop, the bitmask
+fallback used without NumPy, and similarity.SimilarityMatrix. Every method
+must agree on the similar-pair count; results are reported as JSON.
+
+Usage:
+  python python/benchmarks/bench_similarity.py --sizes 50 200 1000 --repeat 3
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import similarity  # noqa: E402
+from benchmarks.corpus import ACTIONS, FINTECH_ACTIONS  # noqa: E402
+from utils import calculate_similarity  # noqa: E402
+
+THRESHOLD = 0.7
+
+
+def make_actions(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    words = " ".join(ACTIONS + FINTECH_ACTIONS).split()
+    return [" ".join(rng.sample(words, rng.randint(2, 5))).title() for _ in range(count)]
+
+
+def loop_count(actions: list) -> tuple:
+    similar = total = 0
+    for i in range(len(actions)):
+        for j in range(i + 1, len(actions)):
+            if calculate_similarity(actions[i], actions[j]) > THRESHOLD:
+                similar += 1
+            total += 1
+    return similar, total
+
+
+def bitmask_count(actions: list) -> tuple:
+    numpy = similarity.np
+    similarity.np = None
+    try:
+        return similarity.similar_pair_count(actions, THRESHOLD)
+    finally:
+        similarity.np = numpy
+
+
+def matrix_count(actions: list) -> tuple:
+    return similarity.SimilarityMatrix(actions).similar_pair_count(THRESHOLD)
+
+
+def timed(func, actions: list, repeat: int) -> tuple:
+    runs, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(actions)
+        runs.append(time.perf_counter() - started)
+    return result, statistics.median(runs)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark pairwise action similarity")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200, 1000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    methods = {"loop": loop_count, "bitmask": bitmask_count}
+    if similarity.np is not None:
+        methods["numpy"] = matrix_count
+
+    rows = []
+    for size in args.sizes:
+        actions = make_actions(size, args.seed)
+        row = {"actions": size}
+        counts = set()
+        for name, func in methods.items():
+            result, seconds = timed(func, actions, args.repeat)
+            counts.add(result)
+            row[f"{name}_ms"] = round(seconds * 1000, 3)
+        if len(counts) != 1:
+            raise SystemExit(f"Methods disagree for {size} actions: {counts}")
+        row["similar_pairs"], row["total_pairs"] = counts.pop()
+        for name in methods:
+            if name != "loop" and row[f"{name}_ms"]:
+                row[f"{name}_speedup"] = round(row["loop_ms"] / row[f"{name}_ms"], 2)
+        rows.append(row)
+
+    print(json.dumps({"threshold": THRESHOLD, "numpy": similarity.np is not None, "results": rows}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
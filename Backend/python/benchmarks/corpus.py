@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+"""
+Synthetic requirement corpora for the NLP benchmarks
+----------------------------------------------------
+Generates deterministic requirement documents of a given size so benchmark
+runs are comparable across commits. A "page" is roughly 40 sentences.
+"""
+
+import random
+from typing import Dict
+
+ROLES = [
+    "user", "customer", "admin", "manager", "reviewer", "analyst",
+    "operator", "support agent", "team lead", "auditor",
+]
+
+ACTIONS = [
+    "create a new project", "upload supporting documents", "review the submission",
+    "approve the pending request", "export monthly reports", "assign tasks to members",
+    "track project progress", "update the profile details", "delete archived records",
+    "receive email notifications", "search previous requests", "schedule a review meeting",
+]
+
+FINTECH_ACTIONS = [
+    "login with 2FA", "complete KYC verification", "transfer money via UPI",
+    "view the account balance", "download the account statement", "add a beneficiary",
+    "request a refund for a transaction", "authorize the payment", "verify the OTP",
+    "dispute a chargeback",
+]
+
+BENEFITS = [
+    "I can save time", "the team stays informed", "errors are caught early",
+    "compliance requirements are met", "I can make better decisions",
+    "customers get faster responses", "data stays consistent",
+]
+
+TEMPLATES = [
+    "As a {role}, I want to {action} so that {benefit}.",
+    "The {role} must be able to {action}.",
+    "The system should allow the {role} to {action} in order to ensure {benefit}.",
+    "When the {role} tries to {action}, the system must validate the request and notify the {other}.",
+    "A {role} needs to {action} before the {other} can continue.",
+]
+
+# Corpus sizes in sentences
+SIZES: Dict[str, int] = {
+    "sentence": 1,
+    "paragraph": 8,
+    "page": 40,
+    "10-pages": 400,
+    "100-pages": 4000,
+    "300-pages": 12000,
+}
+
+
+def generate_corpus(sentences: int, fintech: bool = False, seed: int = 0) -> str:
+    """Build a requirements document with the given number of sentences.
+
+    Sentences are grouped into paragraphs of eight, separated by blank lines
+    like the text textExtractor.js produces from uploaded specs.
+    """
+    rng = random.Random(seed)
+    actions = ACTIONS + FINTECH_ACTIONS if fintech else ACTIONS
+    paragraphs, current = [], []
+    for _ in range(sentences):
+        role, other = rng.sample(ROLES, 2)
+        current.append(rng.choice(TEMPLATES).format(
+            role=role,
+            other=other,
+            action=rng.choice(actions),
+            benefit=rng.choice(BENEFITS),
+        ))
+        if len(current) == 8:
+            paragraphs.append(" ".join(current))
+            current = []
+    if current:
+        paragraphs.append(" ".join(current))
+    return "\n\n".join(paragraphs)
+
+
+def corpus_for(size: str, fintech: bool = False, seed: int = 0) -> str:
+    if size not in SIZES:
+        raise ValueError(f"Unknown corpus size '{size}'. Choose from: {', '.join(SIZES)}")
+    return generate_corpus(SIZES[size], fintech=fintech, seed=seed)
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+"""
+Parsed-Doc store for the SmartReq AI NLP processor
+--------------------------------------------------
+Parsing dominates a generation, and the same texts are parsed again by
+process_text, by the low-confidence retry, by RequirementExtractor
+(nlp_script.py) and by refinement passes. DocStore keeps each parsed Doc
+serialized with spaCy's DocBin, keyed by a hash of the exact text and the
+pipeline key (pipelines.pipeline_key: model, spaCy and pipeline versions,
+enabled components), in two tiers:
+
+  - an in-memory LRU bounded by the bytes of the serialized Docs
+  - an optional SQLite file shared by every process using the same path,
+    with least recently used rows evicted beyond a byte budget
+
+Entry points call parse()/pipe() instead of nlp()/nlp.pipe(). Restoring a
+Doc from DocBin skips the whole pipeline, so it is much cheaper than a
+parse, most of all for long PDF-derived inputs.
+
+The process-wide store (get_doc_store) is off by default: a one-shot
+process exits before it could reuse a parse. SMARTREQ_DOC_CACHE_DIR adds the
+disk tier plus a DEFAULT_MEMORY_BYTES memory tier, SMARTREQ_DOC_CACHE_MEMORY
+sets the memory budget in bytes, or use configure() (nlp_processor turns the
+memory tier on for its long-running workers).
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from pipelines import pipeline_key
+
+
+logger = logging.getLogger("smartreq.nlp.docs")
+
+DEFAULT_MEMORY_BYTES = 64 * 1024 * 1024
+DEFAULT_DISK_BYTES = 1024 * 1024 * 1024
+
+
+def doc_key(text: str, pipeline: str) -> str:
+    """Key of a parse: the exact text (Doc offsets depend on it) and the pipeline."""
+    material = f"{pipeline}\0{text}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def doc_to_bytes(doc) -> bytes:
+    from spacy.tokens import DocBin
+
+    docs = DocBin(store_user_data=False)
+    docs.add(doc)
+    return docs.to_bytes()
+
+
+def doc_from_bytes(data: bytes, vocab):
+    from spacy.tokens import DocBin
+
+    return next(iter(DocBin().from_bytes(data).get_docs(vocab)))
+
+
+class DocStore:
+    """Two-tier (memory LRU + SQLite) store of DocBin-serialized Docs."""
+
+    def __init__(
+        self,
+        path: str | None = None,
+        max_memory_bytes: int = DEFAULT_MEMORY_BYTES,
+        max_disk_bytes: int = DEFAULT_DISK_BYTES,
+    ):
+        self.path = path
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS docs ("
+                " key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS docs_accessed_at ON docs(accessed_at)")
+
+    @classmethod
+    def from_env(cls) -> "DocStore":
+        directory = os.environ.get("SMARTREQ_DOC_CACHE_DIR")
+        memory = os.environ.get("SMARTREQ_DOC_CACHE_MEMORY")
+        return cls(
+            path=os.path.join(directory, "docs.sqlite3") if directory else None,
+            max_memory_bytes=int(memory) if memory is not None else (DEFAULT_MEMORY_BYTES if directory else 0),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_memory_bytes > 0 or self._db is not None
+
+    def parse(self, nlp, text: str):
+        """nlp(text), restored from the store when this pipeline parsed text before."""
+        if not self.enabled:
+            return nlp(text)
+        key = doc_key(text, pipeline_key(nlp))
+        doc = self.get(key, nlp.vocab)
+        if doc is None:
+            doc = nlp(text)
+            self.put(key, doc)
+        return doc
+
+    def pipe(self, nlp, texts: Iterable[str], **pipe_kwargs: Any) -> Iterator[Any]:
+        """nlp.pipe(texts) in order, parsing only texts missing from the store."""
+        if not self.enabled:
+            yield from nlp.pipe(texts, **pipe_kwargs)
+            return
+        texts = list(texts)
+        pipeline = pipeline_key(nlp)
+        keys = [doc_key(text, pipeline) for text in texts]
+        found = [self.get(key, nlp.vocab) for key in keys]
+        missing = [text for text, doc in zip(texts, found) if doc is None]
+        parsed = nlp.pipe(missing, **pipe_kwargs) if missing else iter(())
+        for key, doc in zip(keys, found):
+            if doc is None:
+                doc = next(parsed)
+                self.put(key, doc)
+            yield doc
+
+    def get(self, key: str, vocab):
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+            elif self._db is not None:
+                row = self._db.execute("SELECT value FROM docs WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    data = bytes(row[0])
+                    self._db.execute("UPDATE docs SET accessed_at = ? WHERE key = ?", (time.time(), key))
+                    self._remember(key, data)
+                    self._counters["disk_hits"] += 1
+            if data is None:
+                self._counters["misses"] += 1
+                return None
+        return doc_from_bytes(data, vocab)
+
+    def put(self, key: str, doc) -> None:
+        data = doc_to_bytes(doc)
+        with self._lock:
+            self._remember(key, data)
+            if self._db is not None:
+                now = time.time()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO docs (key, value, size, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, data, len(data), now),
+                )
+                self._evict_disk()
+
+    def _remember(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_memory_bytes:
+            return  # would evict everything else; the disk tier still has it
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self._counters["evictions"] += 1
+
+    def _evict_disk(self) -> None:
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM docs").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        # Drop least recently used rows until we are back under budget
+        excess = total - self.max_disk_bytes
+        freed = 0
+        for key, size in self._db.execute("SELECT key, size FROM docs ORDER BY accessed_at").fetchall():
+            self._db.execute("DELETE FROM docs WHERE key = ?", (key,))
+            self._counters["evictions"] += 1
+            freed += size
+            if freed >= excess:
+                break
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+            stats["hits"] = stats["memory_hits"] + stats["disk_hits"]
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+            stats["memory_entries"] = len(self._memory)
+            stats["memory_bytes"] = self._memory_bytes
+            if self._db is not None:
+                stats["disk_entries"] = self._db.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+            return stats
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+_store: Optional[DocStore] = None
+_store_lock = threading.Lock()
+
+
+def get_doc_store() -> DocStore:
+    """The process-wide store (created from the environment on first use)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = DocStore.from_env()
+        return _store
+
+
+def configure(store: DocStore) -> None:
+    """Replace the process-wide store."""
+    global _store
+    with _store_lock:
+        _store = store
+
+
+def parse(nlp, text: str):
+    """nlp(text) through the process-wide store."""
+    return get_doc_store().parse(nlp, text)
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+"""
+Compact flow graph model for SmartReq AI swimlane flows
+-------------------------------------------------------
+utils.build_swimlane_flow assembles the flow as __slots__ records with
+interned actor/shape strings instead of nested dicts. The React Flow JSON
+(with its per-node description and position dicts and per-edge
+"smoothstep" type) and the Mermaid diagram are only produced when
+serialized, so callers that need a single output format skip the other.
+"""
+
+import random
+import sys
+from typing import Any, Dict, Iterable, List
+
+
+REACT_FLOW = "react_flow"
+MERMAID = "mermaid"
+ALL_FORMATS = (REACT_FLOW, MERMAID)
+
+
+class FlowNode:
+    __slots__ = ("id", "label", "shape", "actor", "x", "y")
+
+    def __init__(self, node_id: str, label: str, shape: str, actor: str, x: int, y: int):
+        self.id = node_id
+        self.label = label
+        self.shape = shape
+        self.actor = actor
+        self.x = x
+        self.y = y
+
+    def to_react_flow(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "type": "custom",
+            "data": {
+                "label": self.label,
+                "type": self.shape,
+                "actor": self.actor,
+                "description": f"AI generated: {self.label}",
+            },
+            "position": {"x": self.x, "y": self.y},
+        }
+
+
+class FlowEdge:
+    __slots__ = ("source", "target", "label", "alt")
+
+    def __init__(self, source: str, target: str, label: str | None = None, alt: bool = False):
+        self.source = source
+        self.target = target
+        self.label = label or None
+        self.alt = alt
+
+    @property
+    def id(self) -> str:
+        return f"e-{self.source}-{self.target}-alt" if self.alt else f"e-{self.source}-{self.target}"
+
+    def to_react_flow(self) -> Dict[str, Any]:
+        edge = {"id": self.id, "source": self.source, "target": self.target, "type": "smoothstep"}
+        if self.label:
+            edge["label"] = self.label
+        return edge
+
+
+class FlowGraph:
+    """Swimlane flow: nodes laid out in one horizontal lane per actor."""
+
+    __slots__ = ("actors", "nodes", "edges", "_lane_index", "_lane_height")
+
+    def __init__(self, actors: List[str], lane_height: int = 150):
+        self.actors = [sys.intern(actor) for actor in actors]
+        self.nodes: List[FlowNode] = []
+        self.edges: List[FlowEdge] = []
+        self._lane_index = {}
+        for i, actor in enumerate(self.actors):
+            self._lane_index.setdefault(actor, i)
+        self._lane_height = lane_height
+
+    def add_node(self, node_id: str, label: str, actor: str, shape: str, x_pos: int) -> FlowNode:
+        # y position follows the actor's lane
+        y_pos = self._lane_index.get(actor, 0) * self._lane_height + 50
+        node = FlowNode(node_id, label, sys.intern(shape), sys.intern(actor), x_pos, y_pos)
+        self.nodes.append(node)
+        return node
+
+    def add_edge(self, source: str, target: str, label: str | None = None, alt: bool = False) -> FlowEdge:
+        edge = FlowEdge(source, target, label, alt)
+        self.edges.append(edge)
+        return edge
+
+    def to_react_flow(self) -> Dict[str, List[Dict[str, Any]]]:
+        return {
+            "nodes": [node.to_react_flow() for node in self.nodes],
+            "edges": [edge.to_react_flow() for edge in self.edges],
+        }
+
+    def to_mermaid(self, timestamp: int, rng: random.Random | None = None) -> str:
+        from mermaid_renderer import MermaidRenderer
+
+        return MermaidRenderer(self, timestamp=timestamp, rng=rng).render()
+
+    def serialize(
+        self,
+        formats: Iterable[str] = ALL_FORMATS,
+        timestamp: int = 0,
+        rng: random.Random | None = None,
+    ) -> Dict[str, Any]:
+        """Serialize to the requested formats only.
+
+        Returns the build_swimlane_flow shape: nodes/edges for React Flow,
+        actors, and mermaid when requested.
+        """
+        formats = set(formats)
+        unknown = formats - set(ALL_FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown flow formats: {sorted(unknown)}")
+
+        result: Dict[str, Any] = {}
+        if REACT_FLOW in formats:
+            result.update(self.to_react_flow())
+        result["actors"] = self.actors
+        if MERMAID in formats:
+            result["mermaid"] = self.to_mermaid(timestamp, rng=rng)
+        return result
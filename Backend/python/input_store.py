@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+"""
+Per-input candidate store for incremental project generation
+------------------------------------------------------------
+A project is a list of inputs (notes, uploads, transcripts). Instead of
+re-parsing the joined text of all of them whenever one changes,
+nlp_processor.process_inputs keeps each input's raw extraction output here:
+
+  (input id, pipeline key) -> content hash, RawCandidates, sentence raws
+
+and parses only inputs whose content hash changed or that were never seen.
+The content hash is taken over whitespace-normalized text (as in
+result_cache), and the pipeline key (pipelines.pipeline_key) invalidates
+entries when the model or extraction code changes. A changed input replaces
+its previous row, so the store grows with the number of inputs, not edits.
+
+Rows live in SQLite: a file shared by every process using the same path, or
+a private in-memory database when no path is given (long-running workers).
+The least recently used rows are dropped beyond max_entries.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from result_cache import normalize_text
+from utils import RawCandidates
+
+
+logger = logging.getLogger("smartreq.nlp.inputs")
+
+
+def content_hash(text: str) -> str:
+    """sha256 of an input's whitespace-normalized content."""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class InputStore:
+    """Extraction output per project input, reused while its content is unchanged."""
+
+    def __init__(self, path: str | None = None, max_entries: int = 10_000):
+        self.path = path
+        self.max_entries = max_entries
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path or ":memory:", timeout=10, check_same_thread=False, isolation_level=None)
+        if path:
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS inputs ("
+            " input_id TEXT NOT NULL, pipeline TEXT NOT NULL, content_hash TEXT NOT NULL,"
+            " value TEXT NOT NULL, accessed_at REAL NOT NULL,"
+            " PRIMARY KEY (input_id, pipeline))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS inputs_accessed_at ON inputs(accessed_at)")
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0}
+
+    def get(self, input_id: str, pipeline: str, digest: str) -> Optional[Tuple[RawCandidates, List[RawCandidates]]]:
+        """Stored (raw, sentence raws) of an input, or None if missing or changed."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM inputs WHERE input_id = ? AND pipeline = ? AND content_hash = ?",
+                (input_id, pipeline, digest),
+            ).fetchone()
+            if row is None:
+                self._counters["misses"] += 1
+                return None
+            self._db.execute(
+                "UPDATE inputs SET accessed_at = ? WHERE input_id = ? AND pipeline = ?",
+                (time.time(), input_id, pipeline),
+            )
+            self._counters["hits"] += 1
+        value = json.loads(row[0])
+        return RawCandidates(**value["raw"]), [RawCandidates(**s) for s in value["sentences"]]
+
+    def put(self, input_id: str, pipeline: str, digest: str, raw: RawCandidates, sentences: List[RawCandidates]) -> None:
+        value = {"raw": asdict(raw), "sentences": [asdict(s) for s in sentences]}
+        encoded = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO inputs (input_id, pipeline, content_hash, value, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (input_id, pipeline, digest, encoded, time.time()),
+            )
+            self._db.execute(
+                "DELETE FROM inputs WHERE rowid IN ("
+                " SELECT rowid FROM inputs ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM inputs").fetchone()[0]
+            return {"entries": entries, "path": self.path, **self._counters}
+
+    def close(self) -> None:
+        self._db.close()
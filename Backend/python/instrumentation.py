@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+"""
+Per-stage instrumentation for SmartReq AI generations
+-----------------------------------------------------
+Opt-in hot-path timings for nlp_processor.process_text and the utils
+builders. Code under measurement asks for the active recorder:
+
+  with current_timings().stage("parse"):
+      doc = nlp(text)
+
+By default the active recorder is NULL_TIMINGS, whose methods do nothing
+and whose stage() returns a shared no-op context manager, so disabled
+instrumentation costs one ContextVar lookup per stage. recording(timings)
+activates a real Timings recorder for the current request (per thread /
+task, via contextvars).
+
+Timings.as_dict() is the "timings" block of a result. MetricsRegistry
+aggregates those blocks into Prometheus histograms and counters for the
+long-running workers (the "metrics" message in worker.py).
+"""
+
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Tuple
+
+
+class Timings:
+    """Wall time per stage (ms), candidate counts and path flags of one request."""
+
+    __slots__ = ("stages", "counts", "flags")
+
+    enabled = True
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.flags: Dict[str, bool] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            # Stages entered more than once (e.g. per sentence) accumulate
+            self.stages[name] = self.stages.get(name, 0.0) + (time.perf_counter() - started) * 1000
+
+    def count(self, name: str, value: int) -> None:
+        self.counts[name] = value
+
+    def flag(self, name: str, value: bool = True) -> None:
+        self.flags[name] = value
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "stages_ms": {name: round(ms, 3) for name, ms in self.stages.items()},
+            "counts": dict(self.counts),
+            "flags": dict(self.flags),
+        }
+
+
+class _NullTimings:
+    """Disabled recorder: every call is a no-op."""
+
+    __slots__ = ()
+
+    enabled = False
+    _context = nullcontext()
+
+    def stage(self, name: str):
+        return self._context
+
+    def count(self, name: str, value: int) -> None:
+        pass
+
+    def flag(self, name: str, value: bool = True) -> None:
+        pass
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {}
+
+
+NULL_TIMINGS = _NullTimings()
+
+_active: ContextVar = ContextVar("smartreq_timings", default=NULL_TIMINGS)
+
+
+def current_timings():
+    """The recorder for the current request (NULL_TIMINGS when disabled)."""
+    return _active.get()
+
+
+@contextmanager
+def recording(timings: Timings | None) -> Iterator[Any]:
+    """Make timings the active recorder inside the block (None keeps it disabled)."""
+    if timings is None:
+        yield NULL_TIMINGS
+        return
+    token = _active.set(timings)
+    try:
+        yield timings
+    finally:
+        _active.reset(token)
+
+
+# Histogram buckets in seconds, from sub-millisecond builders to long parses
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+# Prometheus summary (and kind label) of Timings counts that do not count
+# extraction candidates; any other count is a smartreq_candidates kind
+COUNT_FAMILIES: Dict[str, Tuple[str, str]] = {
+    "flow_nodes": ("smartreq_flow_elements", "nodes"),
+    "flow_edges": ("smartreq_flow_elements", "edges"),
+    "inputs_parsed": ("smartreq_inputs", "parsed"),
+    "inputs_reused": ("smartreq_inputs", "reused"),
+}
+
+FAMILY_HELP = {
+    "smartreq_candidates": "Candidates produced per generation.",
+    "smartreq_flow_elements": "Nodes and edges of the generated flow per generation.",
+    "smartreq_inputs": "Project inputs parsed or reused per incremental generation.",
+}
+
+
+def _labels(**labels: str) -> str:
+    inner = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    return "{" + inner + "}" if inner else ""
+
+
+class MetricsRegistry:
+    """Aggregates timings blocks into Prometheus text exposition format."""
+
+    def __init__(self, buckets: Tuple[float, ...] = STAGE_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._stage_buckets: Dict[str, List[int]] = {}
+        self._stage_sum: Dict[str, float] = {}
+        self._stage_count: Dict[str, int] = {}
+        self._count_sum: Dict[str, float] = {}
+        self._count_n: Dict[str, int] = {}
+        self._flags: Dict[str, int] = {}
+        self.requests = 0
+
+    def observe(self, block: Dict[str, Any]) -> None:
+        """Add one result's timings block."""
+        with self._lock:
+            self.requests += 1
+            for stage, ms in block.get("stages_ms", {}).items():
+                seconds = ms / 1000
+                counts = self._stage_buckets.setdefault(stage, [0] * len(self.buckets))
+                for i, bound in enumerate(self.buckets):
+                    if seconds <= bound:
+                        counts[i] += 1
+                self._stage_sum[stage] = self._stage_sum.get(stage, 0.0) + seconds
+                self._stage_count[stage] = self._stage_count.get(stage, 0) + 1
+            for name, value in block.get("counts", {}).items():
+                self._count_sum[name] = self._count_sum.get(name, 0) + value
+                self._count_n[name] = self._count_n.get(name, 0) + 1
+            for name, value in block.get("flags", {}).items():
+                if value:
+                    self._flags[name] = self._flags.get(name, 0) + 1
+
+    def render(self) -> str:
+        with self._lock:
+            lines = [
+                "# HELP smartreq_stage_seconds Wall time per generation stage.",
+                "# TYPE smartreq_stage_seconds histogram",
+            ]
+            for stage in sorted(self._stage_count):
+                for bound, count in zip(self.buckets, self._stage_buckets[stage]):
+                    lines.append(f"smartreq_stage_seconds_bucket{_labels(stage=stage, le=repr(bound))} {count}")
+                lines.append(f"smartreq_stage_seconds_bucket{_labels(stage=stage, le='+Inf')} {self._stage_count[stage]}")
+                lines.append(f"smartreq_stage_seconds_sum{_labels(stage=stage)} {self._stage_sum[stage]:.6f}")
+                lines.append(f"smartreq_stage_seconds_count{_labels(stage=stage)} {self._stage_count[stage]}")
+
+            families: Dict[str, List[Tuple[str, str]]] = {family: [] for family in FAMILY_HELP}
+            for name in sorted(self._count_n):
+                family, kind = COUNT_FAMILIES.get(name, ("smartreq_candidates", name))
+                families[family].append((name, kind))
+            for family, members in families.items():
+                if family != "smartreq_candidates" and not members:
+                    continue
+                lines += [f"# HELP {family} {FAMILY_HELP[family]}", f"# TYPE {family} summary"]
+                for name, kind in members:
+                    lines.append(f"{family}_sum{_labels(kind=kind)} {self._count_sum[name]}")
+                    lines.append(f"{family}_count{_labels(kind=kind)} {self._count_n[name]}")
+
+            lines += [
+                "# HELP smartreq_path_total Generations that took an optional path (e.g. the fallback re-parse).",
+                "# TYPE smartreq_path_total counter",
+            ]
+            for name in sorted(self._flags):
+                lines.append(f"smartreq_path_total{_labels(path=name)} {self._flags[name]}")
+
+            lines += [
+                "# HELP smartreq_instrumented_requests_total Generations with timings recorded.",
+                "# TYPE smartreq_instrumented_requests_total counter",
+                f"smartreq_instrumented_requests_total {self.requests}",
+            ]
+            return "\n".join(lines) + "\n"
+
+
+# Process-wide registry used by the workers
+REGISTRY = MetricsRegistry()
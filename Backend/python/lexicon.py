@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+"""
+Domain lexicons for SmartReq AI domain boosting
+-----------------------------------------------
+Each project type is a JSON file in lexicons/ named after the domain:
+
+  {
+    "variants_per_term": [min, max],   # random variants added per matched term
+    "priority_terms": ["login", ...],  # actions containing these sort first
+    "expansions": {"login": ["Authenticate User", ...], ...}
+  }
+
+The terms of every loaded domain are compiled once into a single
+Aho-Corasick automaton. One pass over an action returns every term it
+contains (substring semantics, like `term in action.lower()`), so adding a
+domain costs nothing per request beyond its own matches.
+
+Set SMARTREQ_LEXICON_DIR to load lexicons from another directory.
+"""
+
+import json
+import logging
+import os
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
+
+
+logger = logging.getLogger("smartreq.nlp.lexicon")
+
+LEXICON_DIR = Path(__file__).resolve().with_name("lexicons")
+
+
+class TermAutomaton:
+    """Aho-Corasick automaton over lower-cased terms."""
+
+    def __init__(self, terms: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[str, ...]] = [()]
+        for term in terms:
+            if term:
+                self._insert(term.lower())
+        self._link()
+
+    def _insert(self, term: str) -> None:
+        state = 0
+        for ch in term:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+        if term not in self._out[state]:
+            self._out[state] += (term,)
+
+    def _link(self) -> None:
+        # Breadth-first so every failure target is finished before it is used
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(ch, 0)
+                self._out[nxt] += self._out[self._fail[nxt]]
+                queue.append(nxt)
+
+    def find(self, text: str) -> Set[str]:
+        """Every term occurring in text (case-insensitive)."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Set[str] = set()
+        state = 0
+        for ch in text.lower():
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+@dataclass
+class DomainLexicon:
+    name: str
+    expansions: Dict[str, List[str]]
+    priority_terms: FrozenSet[str] = frozenset()
+    variants_per_term: Tuple[int, int] = (1, 2)
+    _rank: Dict[str, int] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._rank = {term: i for i, term in enumerate(self.expansions)}
+
+    def expansion_terms(self, matched: Iterable[str]) -> List[str]:
+        """Matched terms that have expansions, in lexicon file order."""
+        return sorted((term for term in matched if term in self._rank), key=self._rank.__getitem__)
+
+    def is_priority(self, matched: Set[str]) -> bool:
+        return not self.priority_terms.isdisjoint(matched)
+
+
+class LexiconSet:
+    """All domain lexicons plus the shared term automaton."""
+
+    def __init__(self, lexicons: Dict[str, DomainLexicon]):
+        self.domains = lexicons
+        terms: Set[str] = set()
+        for lexicon in lexicons.values():
+            terms.update(lexicon.expansions)
+            terms.update(lexicon.priority_terms)
+        self.automaton = TermAutomaton(sorted(terms))
+
+    def get(self, domain: str) -> DomainLexicon | None:
+        return self.domains.get(domain)
+
+    def find(self, text: str) -> Set[str]:
+        return self.automaton.find(text)
+
+
+def load_lexicon(path: Path) -> DomainLexicon:
+    """Load and validate one domain lexicon file."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    expansions = data.get("expansions", {})
+    if not isinstance(expansions, dict) or not all(
+        isinstance(variants, list) and all(isinstance(v, str) for v in variants) for variants in expansions.values()
+    ):
+        raise ValueError(f"{path}: expansions must map terms to lists of strings")
+    low, high = data.get("variants_per_term", (1, 2))
+    if not 0 <= low <= high:
+        raise ValueError(f"{path}: variants_per_term must be [min, max] with 0 <= min <= max")
+
+    return DomainLexicon(
+        name=path.stem,
+        expansions={term.lower(): list(variants) for term, variants in expansions.items()},
+        priority_terms=frozenset(term.lower() for term in data.get("priority_terms", ())),
+        variants_per_term=(int(low), int(high)),
+    )
+
+
+@lru_cache(maxsize=None)
+def _compile(directory: str) -> LexiconSet:
+    lexicons = {path.stem.lower(): load_lexicon(path) for path in sorted(Path(directory).glob("*.json"))}
+    logger.info(f"Compiled {len(lexicons)} domain lexicons from {directory}")
+    return LexiconSet(lexicons)
+
+
+def load_lexicons(directory: str | None = None) -> LexiconSet:
+    """Compiled lexicons for directory (cached per directory)."""
+    return _compile(str(directory or os.environ.get("SMARTREQ_LEXICON_DIR") or LEXICON_DIR))
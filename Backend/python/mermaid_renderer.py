@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+"""
+Mermaid renderer for SmartReq AI swimlane flows
+-----------------------------------------------
+Turns the flow_graph.FlowGraph built by utils.build_swimlane_flow into a
+Mermaid flowchart with one subgraph per actor.
+
+The node-id -> actor index and the per-lane / cross-lane edge lists are built
+once, so rendering is linear in the size of the flow instead of scanning all
+nodes for every edge of every lane. Lines can be streamed to any writer.
+"""
+
+import random
+from typing import TYPE_CHECKING, Dict, Iterator, List, TextIO
+
+if TYPE_CHECKING:
+    from flow_graph import FlowEdge, FlowGraph, FlowNode
+
+
+# EXPANDED icon pool with dynamic selection
+ACTOR_ICON_POOL: Dict[str, List[str]] = {
+    "Initiator": ["👤", "🙋", "👨‍💼", "👩‍💼"],
+    "User": ["👤", "🧑", "👨", "👩"],
+    "Manager": ["👨‍💼", "👩‍💼", "🎯", "📊"],
+    "Admin": ["🛠️", "⚙️", "🔧", "👨‍💻"],
+    "System": ["🤖", "💻", "🖥️", "⚡"],
+    "Client": ["💼", "🤝", "👔", "📋"],
+}
+FALLBACK_ICONS = ["📋", "🔷", "⭐", "🎯"]
+
+# Connectors for unlabeled in-lane edges: solid, dotted, thick
+CONNECTOR_STYLES = [" --> ", " -.-> ", " ==> "]
+
+
+class MermaidRenderer:
+    """Single-pass Mermaid renderer over indexed swimlane nodes and edges."""
+
+    def __init__(self, graph: "FlowGraph", timestamp: int, rng: random.Random | None = None):
+        self.actors = graph.actors
+        self.timestamp = timestamp
+        self.rng = rng or random
+
+        # Node ID mapping with timestamp for uniqueness, plus id -> actor
+        self.node_ids = {node.id: f"N{i}_{timestamp % 1000}" for i, node in enumerate(graph.nodes)}
+        node_actor: Dict[str, str] = {}
+        self.lane_nodes: Dict[str, List["FlowNode"]] = {}
+        for node in graph.nodes:
+            node_actor.setdefault(node.id, node.actor)
+            self.lane_nodes.setdefault(node.actor, []).append(node)
+
+        # Partition edges once into per-lane and cross-lane lists (edge order kept)
+        self.lane_edges: Dict[str, List["FlowEdge"]] = {}
+        self.cross_edges: List["FlowEdge"] = []
+        for edge in graph.edges:
+            from_actor = node_actor.get(edge.source)
+            to_actor = node_actor.get(edge.target)
+            if from_actor is None or to_actor is None:
+                continue
+            if from_actor == to_actor:
+                self.lane_edges.setdefault(from_actor, []).append(edge)
+            else:
+                self.cross_edges.append(edge)
+
+    def _node_line(self, node: "FlowNode") -> str:
+        node_id = self.node_ids[node.id]
+        label = node.label
+        shape_type = node.shape
+        if shape_type == "start" or shape_type == "end":
+            return f"    {node_id}([{label}])"
+        if shape_type == "decision":
+            return f"    {node_id}{{{label}}}"
+        return f"    {node_id}[{label}]"
+
+    def _lane_edge_line(self, edge: "FlowEdge") -> str:
+        label = edge.label
+        # Vary connector style (50% chance for alternative style)
+        if label and self.rng.random() < 0.5:
+            connector = f' -- "{label}" --> '
+        elif label:
+            connector = f" -- {label} --> "
+        else:
+            connector = self.rng.choice(CONNECTOR_STYLES)
+        return f"    {self.node_ids[edge.source]}{connector}{self.node_ids[edge.target]}"
+
+    def _cross_edge_line(self, edge: "FlowEdge") -> str:
+        label = edge.label
+        # Use thick arrows for cross-lane connections
+        connector = f' == "{label}" ==> ' if label else " ==> "
+        return f"{self.node_ids[edge.source]}{connector}{self.node_ids[edge.target]}"
+
+    def lines(self) -> Iterator[str]:
+        """Yield the diagram line by line."""
+        yield "flowchart LR"
+        yield f"%% === Generated at {self.timestamp} ==="
+
+        # Select icons dynamically
+        actor_icons = {}
+        for actor in self.actors:
+            actor_icons[actor] = self.rng.choice(ACTOR_ICON_POOL.get(actor, FALLBACK_ICONS))
+
+        # Randomize subgraph order for uniqueness
+        actor_items = list(self.lane_nodes.items())
+        if self.rng.random() < 0.5:  # 50% chance to shuffle
+            self.rng.shuffle(actor_items)
+
+        for actor, lane_nodes in actor_items:
+            icon = actor_icons.get(actor, "📋")
+            yield f"\n%% === Swimlane: {actor} ==="
+            yield f'subgraph {actor.replace(" ", "_")}["{icon} {actor}"]'
+            for node in lane_nodes:
+                yield self._node_line(node)
+            for edge in self.lane_edges.get(actor, ()):
+                yield self._lane_edge_line(edge)
+            yield "end"
+
+        # Add cross-swimlane connections with comments
+        yield "\n%% === Cross-Lane Connections ==="
+        for edge in self.cross_edges:
+            yield self._cross_edge_line(edge)
+        if self.cross_edges:
+            yield f"%% Total cross-lane connections: {len(self.cross_edges)}"
+
+    def render(self) -> str:
+        return "\n".join(self.lines())
+
+    def write(self, writer: TextIO) -> None:
+        """Stream the diagram to writer without building the full string."""
+        for i, line in enumerate(self.lines()):
+            if i:
+                writer.write("\n")
+            writer.write(line)
@@ -9,10 +9,22 @@ user stories (Gherkin-like) and a simple process flow for React Flow.
 Usage examples:
   python python/nlp_processor.py --input "User wants secure login for banking app"
   echo '{"input_text": "Process KYC and allow transaction"}' | python python/nlp_processor.py
+  echo '[{"input_text": "..."}, {"input_text": "..."}]' | python python/nlp_processor.py --batch
+  python python/nlp_processor.py --serve                      # NDJSON worker on stdin/stdout
+  python python/nlp_processor.py --serve --socket /tmp/nlp.sock
+  python python/nlp_processor.py --serve-async --socket /tmp/nlp.sock --workers 4
+  python python/nlp_processor.py --serve-async --socket /tmp/nlp.sock --executor prefork --workers 4 --max-worker-rss 1073741824
+  python python/nlp_processor.py --profile-startup            # cold-start cost per phase as JSON
+  python python/nlp_processor.py --stream < spec.txt          # NDJSON partials per window, then the result
+  python python/nlp_processor.py --stdin --shards 8 < spec.json  # parse a long document on 8 cores
+  python python/nlp_processor.py --input "..." --profile --profile-dir /tmp/profiles  # cProfile + allocations
+  echo '{"inputs": [{"id": "1", "content": "..."}]}' | python python/nlp_processor.py --stdin --input-store inputs.sqlite3
+  python python/nlp_processor.py --input "..." --format msgpack   # length-prefixed msgpack frame (see serialization)
 
 Dependencies:
   - spaCy (en_core_web_sm)
-  - transformers (optional for future summarization/classification)
+  - transformers (optional for future summarization/classification; only
+    imported when --enable-transformers is set)
   - torch (for transformers)
 
 Note: Ensure the model is available locally:
@@ -23,22 +35,28 @@ import argparse
 import asyncio
 import json
 import logging
+import os
+import random
 import sys
-from typing import Any, Dict
-
-import spacy
-
-try:
-    # Optional import for future advanced features
-    from transformers import AutoModel, AutoTokenizer  # noqa: F401
-except Exception:  # pragma: no cover
-    AutoModel = None
-    AutoTokenizer = None
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
+# spaCy and transformers are imported lazily: importing them dominates the
+# cold start of every spawned process (see --profile-startup)
+from doc_store import get_doc_store
+from instrumentation import REGISTRY, Timings, current_timings, recording
+from pipelines import PIPELINE_PROFILES, load_pipeline, pipeline_key, required_components, select_profile
+from profiling import RequestProfiler, request_hash
+from serialization import FORMATS, JsonSerializer, available, get_serializer
+from uniqueness import get_tracker
 from utils import (
+    CandidateAccumulator,
+    RawCandidates,
     apply_domain_boost,
     build_gherkin_stories,
     build_swimlane_flow,
+    collect_candidates,
     confidence_score,
     extract_candidates_spacy,
     validate_response_uniqueness,
@@ -57,7 +75,55 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--input", dest="input_text", type=str, help="Input text to process")
     parser.add_argument("--project_type", dest="project_type", type=str, default=None, help="Project type e.g., fintech")
     parser.add_argument("--stdin", action="store_true", help="Read JSON from stdin {input_text, project_type}")
-    return parser.parse_args()
+    parser.add_argument("--batch", action="store_true", help="Read a JSON array of {input_text, project_type} from stdin")
+    parser.add_argument("--batch-size", dest="batch_size", type=int, default=32, help="nlp.pipe batch size for --batch")
+    parser.add_argument("--n-process", dest="n_process", type=int, default=1, help="nlp.pipe worker processes for --batch")
+    parser.add_argument("--pipeline-profile", dest="pipeline_profile", choices=list(PIPELINE_PROFILES), default=None, help="Override the spaCy pipeline profile (default: smallest that extraction needs)")
+    parser.add_argument("--seed", type=int, default=None, help="Seed the generators for reproducible output")
+    parser.add_argument("--timestamp", type=int, default=None, help="Fixed timestamp for Mermaid node IDs (defaults to 0 with --seed)")
+    parser.add_argument("--cache", action="store_true", help="Cache extracted candidates in memory (useful with --serve)")
+    parser.add_argument("--cache-dir", dest="cache_dir", type=str, default=os.environ.get("SMARTREQ_CACHE_DIR"), help="Persist the result cache in this directory (implies --cache; env SMARTREQ_CACHE_DIR)")
+    parser.add_argument("--cache-size", dest="cache_size", type=int, default=256, help="Max entries in the in-memory cache tier")
+    parser.add_argument("--cache-ttl", dest="cache_ttl", type=float, default=None, help="Cache entry time-to-live in seconds")
+    parser.add_argument("--exact-replay", dest="exact_replay", action="store_true", help="Return cached results verbatim instead of re-running the randomized builders")
+    parser.add_argument("--doc-cache-dir", dest="doc_cache_dir", type=str, default=os.environ.get("SMARTREQ_DOC_CACHE_DIR"), help="Persist parsed Docs (DocBin) in this directory, shared by workers (env SMARTREQ_DOC_CACHE_DIR)")
+    parser.add_argument("--doc-cache-memory", dest="doc_cache_memory", type=int, default=os.environ.get("SMARTREQ_DOC_CACHE_MEMORY"), help="Byte budget of the in-memory parsed-Doc tier (default: 64 MiB with --serve, --serve-async or --doc-cache-dir, else 0; 0 with no --doc-cache-dir disables the store; env SMARTREQ_DOC_CACHE_MEMORY)")
+    parser.add_argument("--input-store", dest="input_store", type=str, default=os.environ.get("SMARTREQ_INPUT_STORE"), help="SQLite file keeping per-input candidates so \"inputs\" requests only parse changed inputs (default: in memory; env SMARTREQ_INPUT_STORE)")
+    parser.add_argument("--uniqueness", choices=["lru", "bloom", "sqlite"], default=os.environ.get("SMARTREQ_UNIQUENESS", "lru"), help="Store for the duplicate-response check (env SMARTREQ_UNIQUENESS)")
+    parser.add_argument("--uniqueness-size", dest="uniqueness_size", type=int, default=int(os.environ.get("SMARTREQ_UNIQUENESS_SIZE", "1000")), help="Fingerprints remembered by the duplicate-response check")
+    parser.add_argument("--uniqueness-window", dest="uniqueness_window", type=float, default=float(os.environ.get("SMARTREQ_UNIQUENESS_WINDOW") or 0) or None, help="Only flag duplicates seen within this many seconds")
+    parser.add_argument("--uniqueness-path", dest="uniqueness_path", type=str, default=os.environ.get("SMARTREQ_UNIQUENESS_PATH"), help="SQLite file shared by workers for --uniqueness sqlite")
+    parser.add_argument("--timings", action="store_true", help="Add per-stage timings to results (requests can also send \"timings\": true)")
+    parser.add_argument("--metrics", action="store_true", help="Record timings of every request for the worker \"metrics\" message (Prometheus text)")
+    parser.add_argument("--profile", action="store_true", help="Profile requests with cProfile and tracemalloc (1 in --profile-sample; requests can also send \"profile\": true)")
+    parser.add_argument("--profile-dir", dest="profile_dir", type=str, default=os.environ.get("SMARTREQ_PROFILE_DIR", "profiles"), help="Directory for <request hash>.pstats and .alloc.txt reports (env SMARTREQ_PROFILE_DIR)")
+    parser.add_argument("--profile-sample", dest="profile_sample", type=int, default=1, help="With --profile, profile 1 in N requests")
+    parser.add_argument("--profile-top", dest="profile_top", type=int, default=25, help="Allocation sites and functions listed per profile report")
+    parser.add_argument("--enable-transformers", dest="enable_transformers", action="store_true", help="Load transformers/torch for features that need them")
+    parser.add_argument("--profile-startup", dest="profile_startup", action="store_true", help="Report import/model load time and RSS per phase as JSON")
+    parser.add_argument("--stream", action="store_true", help="Read raw text from stdin in bounded windows and emit NDJSON partial results")
+    parser.add_argument("--window-chars", dest="window_chars", type=int, default=50_000, help="Max characters per --stream window (capped at the model max_length)")
+    parser.add_argument("--shards", type=int, default=1, help="Worker processes for sharded extraction of long documents (1 disables)")
+    parser.add_argument("--shard-chars", dest="shard_chars", type=int, default=20_000, help="Max characters per shard for --shards")
+    parser.add_argument("--format", dest="output_format", choices=list(FORMATS), default=os.environ.get("SMARTREQ_OUTPUT_FORMAT", "json"), help="Encoding of CLI, --batch and --stream output: compact json, orjson (falls back to json) or length-prefixed msgpack frames (env SMARTREQ_OUTPUT_FORMAT)")
+    parser.add_argument("--serve", action="store_true", help="Run as a long-lived worker answering NDJSON requests")
+    parser.add_argument("--socket", dest="socket_path", type=str, default=None, help="Unix socket path for --serve (default: stdin/stdout) or --serve-async")
+    parser.add_argument("--serve-async", dest="serve_async", action="store_true", help="Run the asyncio server on --socket, answering concurrent requests")
+    parser.add_argument("--executor", choices=["thread", "process", "prefork"], default="thread", help="Where --serve-async runs spaCy work (prefork: forked children sharing the loaded model)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Executor workers for --serve-async")
+    parser.add_argument("--max-worker-rss", dest="max_worker_rss", type=int, default=None, help="Recycle a prefork worker once its RSS exceeds this many bytes")
+    parser.add_argument("--max-inflight", dest="max_inflight", type=int, default=None, help="Max concurrently processed requests for --serve-async (default: --workers)")
+    parser.add_argument("--max-queue", dest="max_queue", type=int, default=64, help="Requests allowed to wait for a slot before new ones are rejected")
+    args = parser.parse_args()
+    if not available(args.output_format):
+        parser.error(f"--format {args.output_format} is not available (pip install {args.output_format})")
+    if args.profile_sample < 1:
+        parser.error("--profile-sample must be >= 1")
+    if args.max_worker_rss is not None and args.executor != "prefork":
+        parser.error("--max-worker-rss requires --executor prefork")
+    if args.uniqueness == "sqlite" and not args.uniqueness_path:
+        parser.error("--uniqueness sqlite requires --uniqueness-path (or SMARTREQ_UNIQUENESS_PATH)")
+    return args
 
 
 def read_input(args: argparse.Namespace) -> Dict[str, Any]:
@@ -66,86 +132,440 @@ def read_input(args: argparse.Namespace) -> Dict[str, Any]:
             payload = json.loads(sys.stdin.read())
             return {
                 "input_text": payload.get("input_text", ""),
+                "inputs": payload.get("inputs"),
                 "project_type": payload.get("project_type"),
+                "seed": payload.get("seed", args.seed),
+                "timestamp": payload.get("timestamp", args.timestamp),
+                "timings": payload.get("timings", args.timings),
+                "profile": payload.get("profile", args.profile),
             }
         except Exception as e:
             raise ValueError(f"Invalid JSON from stdin: {e}")
     if not args.input_text:
         raise ValueError("No input provided. Use --input or --stdin with JSON.")
-    return {"input_text": args.input_text, "project_type": args.project_type}
+    return {
+        "input_text": args.input_text,
+        "project_type": args.project_type,
+        "seed": args.seed,
+        "timestamp": args.timestamp,
+        "timings": args.timings,
+        "profile": args.profile,
+    }
 
 
-def load_models():
+def load_models(profile: str | None = None):
+    """Load the smallest spaCy pipeline profile extract_candidates_spacy needs."""
+    profile = profile or select_profile(required_components(extract_candidates_spacy))
     try:
-        nlp = spacy.load("en_core_web_sm")
+        nlp = load_pipeline(profile)
     except Exception as e:
         logger.error("spaCy model 'en_core_web_sm' not found. Install with: python -m spacy download en_core_web_sm")
         raise e
     return nlp
 
 
-def process_text(input_text: str, project_type: str | None, nlp) -> Dict[str, Any]:
+def model_info(nlp) -> str:
+    """Identify the loaded pipeline, e.g. 'en_core_web_sm-3.7.1'."""
+    meta = nlp.meta
+    return f"{meta.get('lang', 'xx')}_{meta.get('name', 'unknown')}-{meta.get('version', 'unknown')}"
+
+
+@lru_cache(maxsize=1)
+def load_transformers():
+    """Import transformers on first use (pulls in torch, seconds of import time).
+
+    Returns (AutoModel, AutoTokenizer), or (None, None) when unavailable.
+    """
+    try:
+        from transformers import AutoModel, AutoTokenizer
+    except Exception as e:  # pragma: no cover
+        logger.warning(f"transformers unavailable, advanced features disabled: {e}")
+        return None, None
+    return AutoModel, AutoTokenizer
+
+
+def profile_startup(enable_transformers: bool = False, pipeline_profile: str | None = None) -> Dict[str, Any]:
+    """Measure the cold-start phases of a worker process."""
+    from profiling import StartupProfile
+
+    startup = StartupProfile()
+    with startup.phase("spacy_import"):
+        import spacy  # noqa: F401
+    if enable_transformers:
+        with startup.phase("transformers_import"):
+            load_transformers()
+    with startup.phase("model_load"):
+        nlp = load_models(pipeline_profile)
+    with startup.phase("first_parse"):
+        process_text("As a user I want to login so that I can view my balance.", None, nlp)
+    transformers_loaded = enable_transformers and load_transformers()[0] is not None
+    return startup.report(model=model_info(nlp), pipeline=nlp.pipe_names, transformers=transformers_loaded)
+
+
+@dataclass
+class Candidates:
+    """Extraction output that the randomized story/flow builders consume."""
+    roles: List[str]
+    actions: List[str]
+    benefits: List[str]
+    confidence: float
+
+
+def configure_uniqueness(args: argparse.Namespace) -> None:
+    """Set up the process-wide uniqueness tracker from the command line."""
+    from uniqueness import UniquenessTracker, configure
+
+    configure(UniquenessTracker(
+        store=args.uniqueness,
+        max_entries=args.uniqueness_size,
+        window_seconds=args.uniqueness_window,
+        path=args.uniqueness_path,
+    ))
+
+
+def configure_doc_store(args: argparse.Namespace) -> None:
+    """Set up the process-wide parsed-Doc store from the command line.
+
+    Without an explicit --doc-cache-memory the memory tier is only on for
+    processes that can reuse a parse: the workers and servers, or with a
+    shared --doc-cache-dir. A one-shot run exits before any reuse, so
+    storing its Docs would only add a DocBin serialization per parse.
+    """
+    from doc_store import DEFAULT_MEMORY_BYTES, DocStore, configure
+
+    path = os.path.join(args.doc_cache_dir, "docs.sqlite3") if args.doc_cache_dir else None
+    memory = args.doc_cache_memory
+    if memory is None:
+        memory = DEFAULT_MEMORY_BYTES if (args.serve or args.serve_async or path) else 0
+    configure(DocStore(path=path, max_memory_bytes=memory))
+
+
+def build_result_cache(args: argparse.Namespace):
+    """Create the ResultCache requested on the command line (or None)."""
+    if not (args.cache or args.cache_dir):
+        return None
+    from result_cache import ResultCache
+
+    path = os.path.join(args.cache_dir, "results.sqlite3") if args.cache_dir else None
+    return ResultCache(max_entries=args.cache_size, ttl_seconds=args.cache_ttl, path=path)
+
+
+def build_input_store(args: argparse.Namespace):
+    """Per-input candidate store for "inputs" requests (in memory unless --input-store)."""
+    from input_store import InputStore
+
+    return InputStore(args.input_store)
+
+
+def stage_rngs(seed: int | str | None) -> Tuple[Optional[random.Random], Optional[random.Random]]:
+    """Independent random streams for extraction and for the builders.
+
+    Separate streams keep seeded output identical whether candidates were
+    freshly extracted or served from the cache. Without a seed both are None
+    and the builders use the global random module.
+    """
+    if seed is None:
+        return None, None
+    return random.Random(f"{seed}:extract"), random.Random(f"{seed}:build")
+
+
+def process_text(
+    input_text: str,
+    project_type: str | None,
+    nlp,
+    cache=None,
+    exact_replay: bool = False,
+    seed: int | str | None = None,
+    timestamp: int | None = None,
+    timings: Timings | None = None,
+) -> Dict[str, Any]:
     """Process text with enhanced extraction and validation.
     
     Includes:
     - Re-extraction if confidence < 0.7
     - Uniqueness validation
     - Alternative parsing strategies
+    - Optional result cache: extracted candidates are reused and only the
+      cheap randomized builders re-run, unless exact_replay is requested
+    - Optional seed (and timestamp) for byte-identical, reproducible output
+    - Optional per-stage timings (instrumentation.Timings), returned as a
+      "timings" block
     """
-    doc = nlp(input_text)
-    roles, actions, benefits = extract_candidates_spacy(doc)
-    actions = apply_domain_boost(project_type, actions)
+    def parse_and_select(extract_rng: random.Random | None) -> Candidates:
+        with current_timings().stage("parse"):
+            doc = get_doc_store().parse(nlp, input_text)
+        return select_candidates(doc, project_type, rng=extract_rng)
 
-    # Use roles as actors for swimlanes, fallback to default
-    actors = roles[:5] if len(roles) >= 2 else None
+    return _timed(timings, lambda: _process_text(input_text, project_type, nlp, cache, exact_replay, seed, timestamp, parse_and_select))
+
+
+def _timed(timings: Timings | None, run: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    """Run under a "total" stage, adding the "timings" block when timings are recorded."""
+    with recording(timings):
+        with current_timings().stage("total"):
+            result = run()
+    if timings is not None:
+        # Never mutate a result that may be held by the cache
+        result = {**result, "timings": timings.as_dict()}
+    return result
+
+
+def _process_text(input_text, project_type, nlp, cache, exact_replay, seed, timestamp, select, variant="") -> Dict[str, Any]:
+    """Candidates from select(extract_rng), or the cache, through build_result.
+
+    variant tells apart cache entries of extraction paths whose candidates
+    differ for the same text (e.g. sharded extraction).
+    """
+    if seed is not None and timestamp is None:
+        timestamp = 0
+    extract_rng, build_rng = stage_rngs(seed)
+    timings = current_timings()
+
+    if cache is None:
+        return build_result(select(extract_rng), rng=build_rng, timestamp=timestamp)
+
+    from result_cache import cache_key
+
+    pipeline = pipeline_key(nlp)
+    seeded = variant if seed is None else f"{variant}:seed={seed}"
+    if exact_replay:
+        replay_key = cache_key(input_text, project_type, pipeline, namespace=f"result{seeded}:ts={timestamp}")
+        with timings.stage("cache_lookup"):
+            cached_result = cache.get(replay_key)
+        if cached_result is not None:
+            timings.flag("cache_hit")
+            # A replay emits the same stories and diagram again, so it goes
+            # through the tracker like a fresh build (on a copy of the entry)
+            return mark_uniqueness(dict(cached_result))
+
+    key = cache_key(input_text, project_type, pipeline, namespace=f"candidates{seeded}")
+    with timings.stage("cache_lookup"):
+        cached = cache.get(key)
+    if cached is not None:
+        timings.flag("cache_hit")
+        candidates = Candidates(**cached)
+    else:
+        candidates = select(extract_rng)
+        cache.set(key, asdict(candidates))
 
-    stories = build_gherkin_stories(roles, actions, benefits, max_stories=5)
-    flow = build_swimlane_flow(actions, min_steps=20, actors=actors)
-    conf = confidence_score(roles, actions, benefits)
+    result = build_result(candidates, rng=build_rng, timestamp=timestamp)
+    if exact_replay:
+        cache.set(replay_key, dict(result))  # the caller owns result; the memory tier keeps its own
+    return result
+
+
+def process_doc(
+    doc,
+    project_type: str | None,
+    seed: int | str | None = None,
+    timestamp: int | None = None,
+) -> Dict[str, Any]:
+    """Run extraction and artifact builders on an already parsed Doc."""
+    if seed is not None and timestamp is None:
+        timestamp = 0
+    extract_rng, build_rng = stage_rngs(seed)
+    candidates = select_candidates(doc, project_type, rng=extract_rng)
+    return build_result(candidates, rng=build_rng, timestamp=timestamp)
+
+
+def validate_inputs(inputs: Any) -> List[Tuple[str, str]]:
+    """(id, content) of each input of an "inputs" request, skipping empty ones."""
+    if not isinstance(inputs, list) or not inputs:
+        raise ValueError("'inputs' must be a non-empty list of {id, content}")
+    found: List[Tuple[str, str]] = []
+    seen = set()
+    for item in inputs:
+        if not isinstance(item, dict) or item.get("id") is None or isinstance(item.get("id"), bool):
+            raise ValueError("every input needs an 'id'")
+        input_id = str(item["id"])
+        if input_id in seen:
+            raise ValueError(f"duplicate input id '{input_id}'")
+        seen.add(input_id)
+        content = item.get("content") or ""
+        if not isinstance(content, str):
+            raise ValueError(f"'content' of input '{input_id}' must be a string")
+        if content.strip():
+            found.append((input_id, content.strip()))
+    if not found:
+        raise ValueError("'inputs' contain no text content")
+    return found
+
+
+def process_inputs(
+    inputs: List[Tuple[str, str]],
+    project_type: str | None,
+    nlp,
+    store,
+    seed: int | str | None = None,
+    timestamp: int | None = None,
+    timings: Timings | None = None,
+) -> Dict[str, Any]:
+    """Generate from a project's inputs, parsing only new or changed ones.
+
+    Each input's raw candidates come from the InputStore when its content
+    hash is unchanged; the rest are parsed in one nlp.pipe call and stored.
+    Per-input candidates are merged in input order through a
+    CandidateAccumulator (as sharded extraction does) before selection and
+    the builders run, so the cost of a re-generation follows the size of
+    the change. The result carries an "inputs" block with parsed/reused
+    counts.
+    """
+    with recording(timings):
+        with current_timings().stage("total"):
+            result = _process_inputs(inputs, project_type, nlp, store, seed, timestamp)
+    if timings is not None:
+        result = {**result, "timings": timings.as_dict()}
+    return result
+
+
+def _process_inputs(inputs, project_type, nlp, store, seed, timestamp) -> Dict[str, Any]:
+    from input_store import content_hash
+
+    if seed is not None and timestamp is None:
+        timestamp = 0
+    extract_rng, build_rng = stage_rngs(seed)
+    timings = current_timings()
+    pipeline = pipeline_key(nlp)
+
+    digests = [content_hash(content) for _, content in inputs]
+    extracted: List[Optional[Tuple[RawCandidates, List[RawCandidates]]]] = [
+        store.get(input_id, pipeline, digest) for (input_id, _), digest in zip(inputs, digests)
+    ]
+    changed = [i for i, found in enumerate(extracted) if found is None]
+    if changed:
+        with timings.stage("parse"):
+            docs = list(get_doc_store().pipe(nlp, (inputs[i][1] for i in changed)))
+        with timings.stage("extract"):
+            for i, doc in zip(changed, docs):
+                extracted[i] = (collect_candidates(doc), sentence_candidates(doc))
+                store.put(inputs[i][0], pipeline, digests[i], *extracted[i])
+    timings.count("inputs_parsed", len(changed))
+    timings.count("inputs_reused", len(inputs) - len(changed))
+
+    accumulator = CandidateAccumulator()
+    sentence_raws: List[RawCandidates] = []
+    with timings.stage("extract"):
+        for raw, sentences in extracted:
+            accumulator.add(raw)
+            sentence_raws.extend(sentences[: 5 - len(sentence_raws)])
+
+    text_length = sum(len(content) for _, content in inputs)
+    candidates = choose_candidates(accumulator, project_type, text_length, lambda: sentence_raws, rng=extract_rng)
+    result = build_result(candidates, rng=build_rng, timestamp=timestamp)
+    result["inputs"] = {"total": len(inputs), "parsed": len(changed), "reused": len(inputs) - len(changed)}
+    return result
+
+
+def select_candidates(doc, project_type: str | None, rng: random.Random | None = None) -> Candidates:
+    """Extract candidates, retrying sentence by sentence when confidence is low."""
+    accumulator = CandidateAccumulator()
+    with current_timings().stage("extract"):
+        accumulator.add(collect_candidates(doc))
+    return choose_candidates(accumulator, project_type, len(doc.text), lambda: sentence_candidates(doc), rng=rng)
+
+
+def sentence_candidates(doc, limit: int = 5) -> List[RawCandidates]:
+    """Raw candidates of the first `limit` sentences used by the low-confidence retry."""
+    # Reuse the sentence spans of the existing parse; span.as_doc() copies
+    # the annotations without running the pipeline again
+    found = []
+    for sent in doc.sents:
+        if len(sent.text.strip()) > 10:
+            found.append(collect_candidates(sent.as_doc()))
+            if len(found) >= limit:
+                break
+    return found
+
+
+def choose_candidates(
+    accumulator: CandidateAccumulator,
+    project_type: str | None,
+    text_length: int,
+    sentences: Callable[[], List[RawCandidates]],
+    rng: random.Random | None = None,
+) -> Candidates:
+    """Pick between the merged candidates and a sentence-by-sentence re-extraction.
+
+    sentences is only called when confidence is low; it returns the raw
+    candidates of up to 5 sentences of the document.
+    """
+    timings = current_timings()
+    with timings.stage("extract"):
+        roles, actions, benefits = accumulator.finalize(rng=rng)
+    with timings.stage("domain_boost"):
+        actions = apply_domain_boost(project_type, actions, rng=rng)
+    with timings.stage("confidence"):
+        conf = confidence_score(roles, actions, benefits)
     
     # If confidence is low, try alternative parsing (sentence-based chunking)
-    if conf < 0.7 and len(input_text) > 50:
+    if conf < 0.7 and text_length > 50:
         logger.warning(f"Low confidence ({conf}), attempting alternative parsing")
+        timings.flag("fallback_ran")
         
-        # Split into sentences and re-process
-        sentences = [sent.text.strip() for sent in doc.sents if len(sent.text.strip()) > 10]
+        with timings.stage("fallback"):
+            sentence_raws = sentences()
+        timings.count("fallback_sentences", min(len(sentence_raws), 5))
         
-        if len(sentences) > 1:
-            # Re-extract from individual sentences
-            alt_roles, alt_actions, alt_benefits = [], [], []
-            
-            for sentence in sentences[:5]:  # Process up to 5 sentences
-                sent_doc = nlp(sentence)
-                r, a, b = extract_candidates_spacy(sent_doc)
-                alt_roles.extend(r)
-                alt_actions.extend(a)
-                alt_benefits.extend(b)
-            
-            # Deduplicate
-            alt_roles = list(dict.fromkeys(alt_roles))
-            alt_actions = list(dict.fromkeys(alt_actions))
-            alt_benefits = list(dict.fromkeys(alt_benefits))
-            
-            # Check if alternative extraction is better
-            alt_conf = confidence_score(alt_roles, alt_actions, alt_benefits)
-            
-            if alt_conf > conf:
-                logger.info(f"Alternative parsing improved confidence: {conf} -> {alt_conf}")
-                roles, actions, benefits = alt_roles, alt_actions, alt_benefits
-                actions = apply_domain_boost(project_type, actions)
-                actors = roles[:5] if len(roles) >= 2 else None
-                stories = build_gherkin_stories(roles, actions, benefits, max_stories=5)
-                flow = build_swimlane_flow(actions, min_steps=20, actors=actors)
-                conf = alt_conf
+        if len(sentence_raws) > 1:
+            with timings.stage("fallback"):
+                # Re-extract from individual sentences
+                alt_roles, alt_actions, alt_benefits = [], [], []
+                
+                for raw in sentence_raws[:5]:  # Process up to 5 sentences
+                    sentence = CandidateAccumulator()
+                    sentence.add(raw)
+                    r, a, b = sentence.finalize(rng=rng)
+                    alt_roles.extend(r)
+                    alt_actions.extend(a)
+                    alt_benefits.extend(b)
+                
+                # Deduplicate
+                alt_roles = list(dict.fromkeys(alt_roles))
+                alt_actions = list(dict.fromkeys(alt_actions))
+                alt_benefits = list(dict.fromkeys(alt_benefits))
+                
+                # Check if alternative extraction is better
+                alt_conf = confidence_score(alt_roles, alt_actions, alt_benefits)
+                
+                if alt_conf > conf:
+                    logger.info(f"Alternative parsing improved confidence: {conf} -> {alt_conf}")
+                    timings.flag("fallback_used")
+                    roles, actions, benefits = alt_roles, alt_actions, alt_benefits
+                    actions = apply_domain_boost(project_type, actions, rng=rng)
+                    conf = alt_conf
+    
+    timings.count("roles", len(roles))
+    timings.count("actions", len(actions))
+    timings.count("benefits", len(benefits))
+    return Candidates(roles, actions, benefits, conf)
+
+
+def build_result(
+    candidates: Candidates,
+    rng: random.Random | None = None,
+    timestamp: int | None = None,
+) -> Dict[str, Any]:
+    """Build stories and flow once, from the winning candidate set."""
+    roles, actions, benefits = candidates.roles, candidates.actions, candidates.benefits
+    actors = roles[:5] if len(roles) >= 2 else None
+    timings = current_timings()
+    with timings.stage("stories"):
+        stories = build_gherkin_stories(roles, actions, benefits, max_stories=5, rng=rng)
+    with timings.stage("flow"):
+        flow = build_swimlane_flow(actions, min_steps=20, actors=actors, rng=rng, timestamp=timestamp)
     
     result = {
         "stories": stories,
         "flow": flow,
-        "confidence": conf,
+        "confidence": candidates.confidence,
     }
-    
-    # Validate uniqueness
-    is_unique = validate_response_uniqueness(result)
+    return mark_uniqueness(result)
+
+
+def mark_uniqueness(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Record the result's stories and diagram with the uniqueness tracker and set is_unique."""
+    with current_timings().stage("uniqueness"):
+        is_unique = validate_response_uniqueness(result)
     result["is_unique"] = is_unique
     
     if not is_unique:
@@ -154,22 +574,569 @@ def process_text(input_text: str, project_type: str | None, nlp) -> Dict[str, An
     return result
 
 
+def handle_request(
+    payload: Dict[str, Any],
+    nlp,
+    cache=None,
+    exact_replay: bool = False,
+    timings: bool = False,
+    profiler: RequestProfiler | None = None,
+    input_store=None,
+    shards: int = 1,
+    shard_chars: int = 20_000,
+    pipeline_profile: str | None = None,
+) -> Dict[str, Any]:
+    """Validate a request payload and run it through process_text.
+
+    Requests with an "inputs" list of {id, content} instead go through
+    process_inputs, reusing per-input candidates from input_store (a
+    throwaway in-memory store if None). With shards > 1, texts longer than
+    shard_chars go through process_sharded on that many worker processes.
+
+    With timings, per-stage timings are recorded and returned as a
+    "timings" block (see finish_timings). With a profiler, sampled requests
+    and those sending "profile": true are profiled and get a "profile" block
+    with the report paths.
+    """
+    project_type = payload.get("project_type")
+    seed, timestamp = generation_options(payload)
+    forced = request_flag(payload, "profile")
+    if payload.get("inputs") is not None:
+        from input_store import InputStore
+
+        inputs = validate_inputs(payload["inputs"])
+        input_text = "\n\n".join(content for _, content in inputs)  # only names profiles
+        store = input_store if input_store is not None else InputStore()
+
+        def run() -> Dict[str, Any]:
+            return process_inputs(
+                inputs,
+                project_type,
+                nlp,
+                store,
+                seed=seed,
+                timestamp=timestamp,
+                timings=Timings() if timings else None,
+            )
+    else:
+        input_text = (payload.get("input_text") or "").strip()
+        if not input_text:
+            raise ValueError("'input_text' must be a non-empty string")
+        exact_replay = bool(payload.get("exact_replay", exact_replay))
+
+        def run() -> Dict[str, Any]:
+            if shards > 1 and len(input_text) > shard_chars:
+                return process_sharded(
+                    input_text,
+                    project_type,
+                    workers=shards,
+                    shard_chars=shard_chars,
+                    pipeline_profile=pipeline_profile,
+                    cache=cache,
+                    exact_replay=exact_replay,
+                    seed=seed,
+                    timestamp=timestamp,
+                    timings=Timings() if timings else None,
+                )
+            return process_text(
+                input_text,
+                project_type,
+                nlp,
+                cache=cache,
+                exact_replay=exact_replay,
+                seed=seed,
+                timestamp=timestamp,
+                timings=Timings() if timings else None,
+            )
+
+    if profiler is None or not profiler.should_sample(force=forced):
+        return run()
+    with profiler.profile(request_hash(input_text, project_type)) as report:
+        result = run()
+    return {**result, "profile": report} if report is not None else result
+
+
+def request_flag(payload: Dict[str, Any], name: str, default: bool = False) -> bool:
+    """A boolean request option such as "timings" or "profile"."""
+    value = payload.get(name, default)
+    if not isinstance(value, bool):
+        raise ValueError(f"'{name}' must be a boolean")
+    return value
+
+
+def request_timings(payload: Dict[str, Any], default: bool = False) -> bool:
+    """Whether a request asked for the "timings" block in its result."""
+    return request_flag(payload, "timings", default)
+
+
+def build_profiler(args: argparse.Namespace) -> RequestProfiler:
+    """Request profiler for --profile; without it only requests sending "profile": true are profiled."""
+    return RequestProfiler(
+        args.profile_dir,
+        sample_every=args.profile_sample if args.profile else 0,
+        top_n=args.profile_top,
+    )
+
+
+def finish_timings(result: Dict[str, Any], keep: bool, observe: bool) -> Dict[str, Any]:
+    """Feed a result's timings into the metrics registry; drop the block unless requested.
+
+    Runs in the process that owns REGISTRY, so process-executor workers can
+    record timings for the parent's metrics.
+    """
+    if observe and "timings" in result:
+        REGISTRY.observe(result["timings"])
+    if not keep:
+        result.pop("timings", None)
+    return result
+
+
+def generation_options(payload: Dict[str, Any]) -> Tuple[int | str | None, int | None]:
+    """Validate the optional seed/timestamp fields of a request payload."""
+    seed = payload.get("seed")
+    timestamp = payload.get("timestamp")
+    if seed is not None and (isinstance(seed, bool) or not isinstance(seed, (int, str))):
+        raise ValueError("'seed' must be an integer or string")
+    if timestamp is not None and (isinstance(timestamp, bool) or not isinstance(timestamp, int)):
+        raise ValueError("'timestamp' must be an integer")
+    return seed, timestamp
+
+
+def serve(args: argparse.Namespace) -> None:
+    """Load the model once and answer requests until shutdown."""
+    from worker import WorkerState, install_signal_handlers, serve_stream, serve_unix_socket
+
+    nlp = load_models(args.pipeline_profile)
+    cache = build_result_cache(args)
+    state = WorkerState(model=model_info(nlp))
+    if cache is not None:
+        state.health_providers["cache"] = cache.stats
+    state.health_providers["uniqueness"] = get_tracker().stats
+    input_store = build_input_store(args)
+    state.health_providers["inputs"] = input_store.stats
+    state.health_providers["docs"] = get_doc_store().stats
+    if args.metrics:
+        state.metrics_providers.append(REGISTRY.render)
+    profiler = build_profiler(args)
+    install_signal_handlers(state)
+
+    def handler(payload: Dict[str, Any]) -> Dict[str, Any]:
+        wanted = request_timings(payload, args.timings)
+        result = handle_request(
+            payload,
+            nlp,
+            cache=cache,
+            exact_replay=args.exact_replay,
+            timings=wanted or args.metrics,
+            profiler=profiler,
+            input_store=input_store,
+        )
+        return finish_timings(result, keep=wanted, observe=args.metrics)
+
+    if args.socket_path:
+        serve_unix_socket(handler, args.socket_path, sys.stdout, state)
+    else:
+        serve_stream(handler, sys.stdin, sys.stdout, state)
+
+
+# Request handler of a --serve-async process-executor worker (_init_process_handler)
+_process_handler = None
+
+
+def _worker_handler(args: argparse.Namespace) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """Request handler of a process or prefork worker, built after the fork."""
+    configure_uniqueness(args)  # never share the parent's SQLite connections across fork
+    configure_doc_store(args)
+    nlp = load_models(args.pipeline_profile)
+    cache = build_result_cache(args)
+    profiler = build_profiler(args)  # sampling counts per worker process
+    input_store = build_input_store(args)  # per worker unless --input-store shares a file
+
+    def handler(payload: Dict[str, Any]) -> Dict[str, Any]:
+        timings = request_timings(payload, args.timings) or args.metrics
+        return handle_request(
+            payload,
+            nlp,
+            cache=cache,
+            exact_replay=args.exact_replay,
+            timings=timings,
+            profiler=profiler,
+            input_store=input_store,
+        )
+
+    return handler
+
+
+def _init_process_handler(args: argparse.Namespace) -> None:
+    global _process_handler
+    _process_handler = _worker_handler(args)
+
+
+def _call_process_handler(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return _process_handler(payload)
+
+
+async def serve_async(args: argparse.Namespace) -> None:
+    """Answer concurrent requests on a Unix socket, offloading spaCy to an executor."""
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    from async_server import AsyncServer
+    from worker import WorkerState
+
+    if not args.socket_path:
+        raise ValueError("--serve-async requires --socket")
+
+    # Loaded in this process either way: thread workers share it, and forked
+    # process and prefork workers inherit the already loaded pipeline
+    nlp = load_models(args.pipeline_profile)
+    state = WorkerState(model=model_info(nlp))
+    pool = None
+    if args.executor == "prefork":
+        from prefork import PreforkPool
+
+        pool = PreforkPool(
+            lambda: _worker_handler(args),
+            workers=args.workers,
+            max_rss_bytes=args.max_worker_rss,
+            model=state.model,
+        )
+        await pool.start()
+        state.health_providers["prefork"] = pool.stats
+        state.metrics_providers.append(pool.render_metrics)
+        executor, call = None, pool.call
+    elif args.executor == "process":
+        executor = ProcessPoolExecutor(max_workers=args.workers, initializer=_init_process_handler, initargs=(args,))
+        call = _call_process_handler
+    else:
+        cache = build_result_cache(args)
+        if cache is not None:
+            state.health_providers["cache"] = cache.stats
+        state.health_providers["uniqueness"] = get_tracker().stats
+        input_store = build_input_store(args)
+        state.health_providers["inputs"] = input_store.stats
+        state.health_providers["docs"] = get_doc_store().stats
+        executor = ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="nlp")
+        profiler = build_profiler(args)
+
+        def call(payload: Dict[str, Any]) -> Dict[str, Any]:
+            timings = request_timings(payload, args.timings) or args.metrics
+            return handle_request(
+                payload,
+                nlp,
+                cache=cache,
+                exact_replay=args.exact_replay,
+                timings=timings,
+                profiler=profiler,
+                input_store=input_store,
+            )
+
+    def on_result(payload: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+        return finish_timings(result, keep=request_timings(payload, args.timings), observe=args.metrics)
+
+    if args.metrics:
+        state.metrics_providers.append(REGISTRY.render)
+    server = AsyncServer(
+        call,
+        executor,
+        state,
+        max_inflight=args.max_inflight or args.workers,
+        max_queue=args.max_queue,
+        on_result=on_result,
+    )
+    try:
+        await server.serve_unix(args.socket_path, sys.stdout)
+    finally:
+        if pool is not None:
+            await pool.stop()
+        else:
+            executor.shutdown(wait=True)
+
+
+def process_batch(
+    items: List[Dict[str, Any]],
+    nlp,
+    batch_size: int = 32,
+    n_process: int = 1,
+) -> List[Dict[str, Any]]:
+    """Process many texts with a single nlp.pipe pass.
+
+    Results come back in input order. Each result carries an ``error`` field
+    (None on success) so one bad item does not fail the whole batch.
+    """
+    results: List[Dict[str, Any] | None] = [None] * len(items)
+    pending = []  # (index, item_id, text, item)
+
+    for index, item in enumerate(items):
+        item_id = item.get("id") if isinstance(item, dict) else None
+        try:
+            if not isinstance(item, dict):
+                raise ValueError("batch item must be a JSON object")
+            text = (item.get("input_text") or "").strip()
+            if not text:
+                raise ValueError("'input_text' must be a non-empty string")
+            if len(text) > nlp.max_length:
+                raise ValueError(f"'input_text' exceeds the model max_length ({nlp.max_length} characters)")
+            generation_options(item)
+            pending.append((index, item_id, text, item))
+        except Exception as e:
+            results[index] = {"id": item_id, "error": str(e)}
+
+    docs = get_doc_store().pipe(nlp, (text for _, _, text, _ in pending), batch_size=batch_size, n_process=n_process)
+    done = 0
+    try:
+        for (index, item_id, _, item), doc in zip(pending, docs):
+            results[index] = _process_batch_item(item_id, doc, item)
+            done += 1
+    except Exception:
+        # A pipe failure leaves the generator unusable; parse the rest one by one
+        logger.exception("nlp.pipe failed mid-batch, falling back to per-item parsing")
+        for index, item_id, text, item in pending[done:]:
+            try:
+                doc = get_doc_store().parse(nlp, text)
+            except Exception as e:
+                results[index] = {"id": item_id, "error": str(e)}
+                continue
+            results[index] = _process_batch_item(item_id, doc, item)
+
+    return results
+
+
+def _process_batch_item(item_id: Any, doc, item: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        seed, timestamp = generation_options(item)
+        return {"id": item_id, "error": None, **process_doc(doc, item.get("project_type"), seed=seed, timestamp=timestamp)}
+    except Exception as e:
+        logger.exception("Failed to process batch item")
+        return {"id": item_id, "error": str(e)}
+
+
+def process_stream(
+    chunks: Iterable[str],
+    nlp,
+    project_type: str | None,
+    emit: Callable[[Dict[str, Any]], None],
+    window_chars: int = 50_000,
+    seed: int | str | None = None,
+    timestamp: int | None = None,
+) -> Dict[str, Any]:
+    """Process a large document window by window with bounded memory.
+
+    Each window is parsed on its own and its raw candidates are merged into
+    one CandidateAccumulator, so at most one window's Doc is alive at a time.
+    A {"type": "partial"} record with the newly accepted candidates and
+    stories built from them is emitted as each window completes; the final
+    merged {"type": "result"} record is emitted and returned at the end.
+
+    The low-confidence sentence retry of select_candidates is skipped: it
+    needs the whole Doc, and windows are already small.
+    """
+    from text_windows import iter_windows
+
+    if seed is not None and timestamp is None:
+        timestamp = 0
+    extract_rng, build_rng = stage_rngs(seed)
+    partial_rng = None if seed is None else random.Random(f"{seed}:partial")
+
+    accumulator = CandidateAccumulator()
+    roles: List[str] = []
+    benefits: List[str] = []
+    windows = chars = 0
+    for window in iter_windows(chunks, min(window_chars, nlp.max_length)):
+        accepted = accumulator.add(collect_candidates(get_doc_store().parse(nlp, window)))
+        roles.extend(accepted["roles"])
+        benefits.extend(accepted["benefits"])
+        windows += 1
+        chars += len(window)
+        emit({
+            "type": "partial",
+            "window": windows,
+            "chars": len(window),
+            **accepted,
+            "stories": build_gherkin_stories(roles, accepted["actions"], benefits, max_stories=5, rng=partial_rng),
+        })
+
+    if not windows:
+        raise ValueError("'input_text' must be a non-empty string")
+
+    roles, actions, benefits = accumulator.finalize(rng=extract_rng)
+    actions = apply_domain_boost(project_type, actions, rng=extract_rng)
+    candidates = Candidates(roles, actions, benefits, confidence_score(roles, actions, benefits))
+    result = {"type": "result", "windows": windows, "chars": chars, **build_result(candidates, rng=build_rng, timestamp=timestamp)}
+    emit(result)
+    return result
+
+
+def write_record(record: Any, serializer: JsonSerializer | None = None) -> None:
+    """Write one record (an NDJSON line or a msgpack frame) to stdout and flush it."""
+    sys.stdout.flush()  # keep anything printed earlier ahead of the binary write
+    (serializer or JsonSerializer()).write(sys.stdout.buffer, record)
+
+
+# Pipeline loaded once per shard worker process by _init_shard_worker
+_shard_nlp = None
+
+
+def _init_shard_worker(profile: str | None) -> None:
+    global _shard_nlp
+    _shard_nlp = load_models(profile)
+
+
+def _parse_shard(text: str) -> Tuple[RawCandidates, List[RawCandidates]]:
+    """Parse one shard in a worker: its raw candidates plus its first sentences'."""
+    doc = _shard_nlp(text)
+    return collect_candidates(doc), sentence_candidates(doc)
+
+
+def process_sharded(
+    input_text: str,
+    project_type: str | None,
+    workers: int,
+    shard_chars: int = 20_000,
+    pipeline_profile: str | None = None,
+    cache=None,
+    exact_replay: bool = False,
+    seed: int | str | None = None,
+    timestamp: int | None = None,
+    timings: Timings | None = None,
+) -> Dict[str, Any]:
+    """Parse a long document in parallel shards and merge the candidates.
+
+    The text is cut at paragraph/sentence boundaries (text_windows) and each
+    shard is parsed in a process pool whose workers load the model once.
+    Shard candidates are merged in shard order through a
+    CandidateAccumulator (incremental near-duplicate removal) before
+    selection and the story/flow builders run in this process. Short texts
+    that fit in one shard take the regular single-Doc path.
+
+    cache, exact_replay and timings work as in process_text; merged
+    candidates are cached apart from single-Doc ones, per shard size.
+
+    The merge is close to, not identical with, extracting from one Doc:
+    collect_candidates orders each Doc's candidates by kind (entity roles
+    before keyword roles, verbs before noun-chunk actions), so a different
+    member of a near-duplicate pair can survive; tokens at shard edges are
+    tagged without their neighbours; and every shard contributes its own
+    "so that" / "in order to" benefit.
+    """
+    from text_windows import split_text
+
+    shards = split_text(input_text, shard_chars)
+    if len(shards) <= 1 or workers <= 1:
+        return process_text(
+            input_text,
+            project_type,
+            load_models(pipeline_profile),
+            cache=cache,
+            exact_replay=exact_replay,
+            seed=seed,
+            timestamp=timestamp,
+            timings=timings,
+        )
+
+    def parse_shards_and_select(extract_rng: random.Random | None) -> Candidates:
+        from concurrent.futures import ProcessPoolExecutor
+
+        accumulator = CandidateAccumulator()
+        sentence_raws: List[RawCandidates] = []
+        with current_timings().stage("parse"), ProcessPoolExecutor(
+            max_workers=min(workers, len(shards)),
+            initializer=_init_shard_worker,
+            initargs=(pipeline_profile,),
+        ) as pool:
+            # map keeps shard order, so merged candidates follow the document
+            for raw, sentences in pool.map(_parse_shard, shards):
+                accumulator.add(raw)
+                sentence_raws.extend(sentences[: 5 - len(sentence_raws)])
+
+        logger.info(f"Merged candidates from {len(shards)} shards")
+        return choose_candidates(accumulator, project_type, len(input_text), lambda: sentence_raws, rng=extract_rng)
+
+    # Cache keys name the pipeline; without a cache the model stays in the workers
+    nlp = load_models(pipeline_profile) if cache is not None else None
+    return _timed(timings, lambda: _process_text(
+        input_text,
+        project_type,
+        nlp,
+        cache,
+        exact_replay,
+        seed,
+        timestamp,
+        parse_shards_and_select,
+        variant=f":shards={shard_chars}",
+    ))
+
+
+def read_batch(stdin) -> List[Dict[str, Any]]:
+    try:
+        items = json.loads(stdin.read())
+    except Exception as e:
+        raise ValueError(f"Invalid JSON from stdin: {e}")
+    if not isinstance(items, list):
+        raise ValueError("--batch expects a JSON array of {input_text, project_type}")
+    return items
+
+
 async def main_async():
     args = parse_args()
+    configure_uniqueness(args)
+    configure_doc_store(args)
+    serializer = get_serializer(args.output_format)
+    if args.profile_startup:
+        write_record(profile_startup(args.enable_transformers, args.pipeline_profile), serializer)
+        return
+    if args.enable_transformers:
+        load_transformers()
+    if args.serve_async:
+        await serve_async(args)
+        return
+    if args.serve:
+        serve(args)
+        return
     try:
+        if args.stream:
+            from text_windows import read_chunks
+
+            nlp = load_models(args.pipeline_profile)
+            chunks = [args.input_text] if args.input_text else read_chunks(sys.stdin)
+            process_stream(
+                chunks,
+                nlp,
+                args.project_type,
+                emit=lambda record: write_record(record, serializer),
+                window_chars=args.window_chars,
+                seed=args.seed,
+                timestamp=args.timestamp,
+            )
+            return
+
+        if args.batch:
+            items = read_batch(sys.stdin)
+            nlp = load_models(args.pipeline_profile)
+            results = process_batch(items, nlp, batch_size=args.batch_size, n_process=args.n_process)
+            write_record(results, serializer)
+            return
+
         payload = read_input(args)
-        input_text = (payload.get("input_text") or "").strip()
-        project_type = payload.get("project_type")
-        if not input_text:
+        if payload.get("inputs") is None and not (payload.get("input_text") or "").strip():
             raise ValueError("'input_text' must be a non-empty string")
 
-        nlp = load_models()
-        result = process_text(input_text, project_type, nlp)
-        print(json.dumps(result, ensure_ascii=False))
+        nlp = load_models(args.pipeline_profile)
+        result = handle_request(
+            payload,
+            nlp,
+            cache=build_result_cache(args),
+            exact_replay=args.exact_replay,
+            timings=request_timings(payload),
+            profiler=build_profiler(args),
+            input_store=build_input_store(args),
+            shards=args.shards,
+            shard_chars=args.shard_chars,
+            pipeline_profile=args.pipeline_profile,
+        )
+        write_record(result, serializer)
     except Exception as e:
         logger.exception("Failed to process NLP input")
         err = {"error": str(e)}
-        print(json.dumps(err))
+        write_record(err, serializer)
         sys.exit(1)
 
 
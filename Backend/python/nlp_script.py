@@ -10,27 +10,80 @@ SmartReq AI - NLP Processing Script
 Uses spaCy for requirement extraction and artifact generation
 """
 
-import sys
-import json
 import re
-import spacy
-from typing import List, Dict, Any
-import argparse
+from functools import cached_property
+from typing import List, Dict, Any, FrozenSet, Union
+
+from doc_store import parse
+from rules import RuleMatches, match as match_rules
+from pipelines import PIPELINE_PROFILES, load_pipeline, profile_provides, required_components, requires, select_profile
+
+# Pipelines are loaded lazily per profile (you may need to install the model:
+# python -m spacy download en_core_web_sm)
+FULL_PIPELINE: FrozenSet[str] = PIPELINE_PROFILES["full"]["provides"]
+
+class DocContext:
+    """Parse-once view of a text shared by every extractor.
+
+    Holds a single spaCy Doc and lazily computes (and caches) the views the
+    extractors need, so one request costs one parse.
+    """
+
+    def __init__(self, text: str, nlp_model, provides: FrozenSet[str] = FULL_PIPELINE):
+        self.text = text
+        self.doc = parse(nlp_model, text)  # restored from the parsed-Doc store when seen before
+        self.provides = provides
+
+    @cached_property
+    def entities(self) -> List[Any]:
+        return list(self.doc.ents)
+
+    @cached_property
+    def verb_lemmas(self) -> List[str]:
+        return [token.lemma_.lower() for token in self.doc if token.pos_ == "VERB" and not token.is_stop]
+
+    @cached_property
+    def noun_lemmas(self) -> List[str]:
+        return [token.lemma_.lower() for token in self.doc if token.pos_ in ["NOUN", "PROPN"] and not token.is_stop]
+
+    @cached_property
+    def rule_matches(self) -> RuleMatches:
+        return match_rules(self.doc)
+
+    @cached_property
+    def sentence_spans(self) -> List[Any]:
+        return list(self.doc.sents)
+
+    @cached_property
+    def sentences(self) -> List[str]:
+        return [sent.text.strip() for sent in self.sentence_spans]
+
+
+TextOrContext = Union[str, DocContext]
 
-# Load spaCy model (you may need to install: python -m spacy download en_core_web_sm)
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    print("Error: spaCy model 'en_core_web_sm' not found. Please install it with: python -m spacy download en_core_web_sm", file=sys.stderr)
-    sys.exit(1)
 
 class RequirementExtractor:
-    def __init__(self):
-        self.nlp = nlp
+    def __init__(self, nlp_model=None):
+        # With an explicit model every extractor uses it; otherwise each one
+        # loads the smallest pipeline profile covering what it declares
+        self.nlp = nlp_model
+
+    def context(self, text: TextOrContext, extractor=None) -> DocContext:
+        """Return a DocContext for text, reusing one passed in if it covers the extractor's needs"""
+        required = required_components(extractor) if extractor else FULL_PIPELINE
+        if isinstance(text, DocContext):
+            if required <= text.provides:
+                return text
+            text = text.text
+        if self.nlp is not None:
+            return DocContext(text, self.nlp)
+        profile = select_profile(required)
+        return DocContext(text, load_pipeline(profile), profile_provides(profile))
         
-    def extract_entities(self, text: str) -> Dict[str, List[str]]:
+    @requires("ner")
+    def extract_entities(self, text: TextOrContext) -> Dict[str, List[str]]:
         """Extract named entities from text"""
-        doc = self.nlp(text)
+        ctx = self.context(text, self.extract_entities)
         
         entities = {
             'PERSON': [],
@@ -43,80 +96,63 @@ class RequirementExtractor:
             'LANGUAGE': []
         }
         
-        for ent in doc.ents:
+        for ent in ctx.entities:
             if ent.label_ in entities:
                 entities[ent.label_].append(ent.text)
         
         return entities
     
-    def extract_verbs_and_actions(self, text: str) -> List[str]:
+    @requires("tagger", "lemmatizer")
+    def extract_verbs_and_actions(self, text: TextOrContext) -> List[str]:
         """Extract action verbs from text"""
-        doc = self.nlp(text)
-        actions = []
-        
-        for token in doc:
-            if token.pos_ == "VERB" and not token.is_stop:
-                actions.append(token.lemma_.lower())
-        
-        return list(set(actions))
+        return list(set(self.context(text, self.extract_verbs_and_actions).verb_lemmas))
     
-    def extract_nouns_and_objects(self, text: str) -> List[str]:
+    @requires("tagger", "lemmatizer")
+    def extract_nouns_and_objects(self, text: TextOrContext) -> List[str]:
         """Extract nouns and objects from text"""
-        doc = self.nlp(text)
-        objects = []
-        
-        for token in doc:
-            if token.pos_ in ["NOUN", "PROPN"] and not token.is_stop:
-                objects.append(token.lemma_.lower())
-        
-        return list(set(objects))
+        return list(set(self.context(text, self.extract_nouns_and_objects).noun_lemmas))
     
-    def identify_roles(self, text: str) -> List[str]:
+    @requires("ner")
+    def identify_roles(self, text: TextOrContext) -> List[str]:
         """Identify potential user roles from text"""
-        doc = self.nlp(text)
-        roles = []
+        ctx = self.context(text, self.identify_roles)
         
-        # Common role patterns
-        role_patterns = [
-            r'\b(?:user|admin|manager|developer|tester|analyst|stakeholder|customer|client|end.?user)\b',
-            r'\b(?:system|application|platform|service|tool|interface)\b',
-            r'\b(?:business|technical|functional|non.?functional)\b'
-        ]
-        
-        for pattern in role_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            roles.extend(matches)
+        # Role, system and requirement-type mentions (compiled in rules.py)
+        roles = [span.text for span in ctx.rule_matches.role_mentions]
         
         # Also look for entities that might be roles
-        for ent in doc.ents:
+        for ent in ctx.entities:
             if ent.label_ == "PERSON":
                 roles.append(ent.text)
         
         return list(set(roles))
     
-    def generate_user_stories(self, text: str) -> List[str]:
+    @requires("tagger", "lemmatizer", "ner", "sents")
+    def generate_user_stories(self, text: TextOrContext) -> List[str]:
         """Generate user stories from text"""
+        ctx = self.context(text, self.generate_user_stories)
         stories = []
         
         # Extract roles
-        roles = self.identify_roles(text)
+        roles = self.identify_roles(ctx)
         if not roles:
             roles = ['user', 'admin', 'stakeholder']  # Default roles
         
         # Extract actions
-        actions = self.extract_verbs_and_actions(text)
+        actions = self.extract_verbs_and_actions(ctx)
         
         # Extract objects
-        objects = self.extract_nouns_and_objects(text)
+        objects = self.extract_nouns_and_objects(ctx)
         
-        # Generate stories based on patterns found in text
-        sentences = [sent.text.strip() for sent in self.nlp(text).sents if len(sent.text.strip()) > 10]
+        # Generate stories based on patterns found in text (sentence spans are
+        # already parsed, so no per-sentence re-parse is needed)
+        sentence_spans = [
+            (sentence, span) for sentence, span in zip(ctx.sentences, ctx.sentence_spans) if len(sentence) > 10
+        ]
         
-        for sentence in sentences[:10]:  # Limit to first 10 sentences
-            doc = self.nlp(sentence)
-            
-            # Look for requirement patterns
-            if any(word in sentence.lower() for word in ['should', 'must', 'need', 'require', 'want', 'able to']):
+        for sentence, doc in sentence_spans[:10]:  # Limit to first 10 sentences
+            # Look for requirement patterns (modal keywords matched once per Doc)
+            if ctx.rule_matches.has_modal(doc.start, doc.end):
                 # Extract the main verb and object
                 verb = None
                 obj = None
@@ -147,12 +183,13 @@ class RequirementExtractor:
         
         return list(set(stories))[:10]  # Return unique stories, max 10
     
-    def generate_process_flows(self, text: str) -> List[Dict[str, Any]]:
+    @requires("sents")
+    def generate_process_flows(self, text: TextOrContext) -> List[Dict[str, Any]]:
         """Generate process flows from text"""
         flows = []
         
         # Extract sentences that might represent process steps
-        sentences = [sent.text.strip() for sent in self.nlp(text).sents if len(sent.text.strip()) > 5]
+        sentences = [sentence for sentence in self.context(text, self.generate_process_flows).sentences if len(sentence) > 5]
         
         if len(sentences) < 2:
             return flows
@@ -234,17 +271,21 @@ class RequirementExtractor:
         
         return flows
     
+    @requires("tagger", "lemmatizer", "ner", "sents")
     def process_text(self, text: str) -> Dict[str, Any]:
         """Main processing function"""
         try:
+            # Parse once; every extractor reuses the same Doc
+            ctx = self.context(text, self.process_text)
+            
             # Extract entities
-            entities = self.extract_entities(text)
+            entities = self.extract_entities(ctx)
             
             # Generate user stories
-            stories = self.generate_user_stories(text)
+            stories = self.generate_user_stories(ctx)
             
             # Generate process flows
-            flows = self.generate_process_flows(text)
+            flows = self.generate_process_flows(ctx)
             
             return {
                 "success": True,
@@ -253,7 +294,7 @@ class RequirementExtractor:
                 "entities": entities,
                 "metadata": {
                     "text_length": len(text),
-                    "sentences_count": len(list(self.nlp(text).sents)),
+                    "sentences_count": len(ctx.sentence_spans),
                     "words_count": len(text.split())
                 }
             }
@@ -266,32 +307,3 @@ class RequirementExtractor:
                 "flows": [],
                 "entities": {}
             }
-
-def main():
-    """Main function to process text from stdin"""
-    if len(sys.argv) > 1:
-        # Text provided as command line argument
-        text = sys.argv[1]
-    else:
-        # Read from stdin
-        text = sys.stdin.read()
-    
-    if not text.strip():
-        print(json.dumps({
-            "success": False,
-            "error": "No text provided",
-            "stories": [],
-            "flows": [],
-            "entities": {}
-        }))
-        sys.exit(1)
-    
-    # Process text
-    extractor = RequirementExtractor()
-    result = extractor.process_text(text)
-    
-    # Output result as JSON
-    print(json.dumps(result, indent=2))
-
-if __name__ == "__main__":
-    main()
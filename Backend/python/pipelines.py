@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+"""
+spaCy pipeline profiles for SmartReq AI
+---------------------------------------
+en_core_web_sm ships tok2vec, tagger, parser, attribute_ruler, lemmatizer
+and ner. Not every extractor needs all of them, so extractors declare the
+capabilities they use with @requires(...) and the loader picks the smallest
+named profile that provides them.
+
+Capabilities:
+  - tagger:     token.pos_ / token.tag_
+  - lemmatizer: token.lemma_
+  - parser:     token.dep_, token.children, doc.noun_chunks
+  - ner:        doc.ents
+  - sents:      doc.sents (from the parser or a sentencizer)
+
+Benchmark the profiles with: python python/benchmarks/bench_pipelines.py
+"""
+
+import logging
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, Iterable
+
+
+logger = logging.getLogger("smartreq.nlp.pipelines")
+
+MODEL_NAME = "en_core_web_sm"
+
+# Bump when extraction or artifact logic changes output for the same input;
+# persistent caches key on it.
+PIPELINE_VERSION = "1.1.0"
+
+# Ordered from cheapest to most expensive; select_profile returns the first
+# profile whose capabilities cover the request.
+PIPELINE_PROFILES: Dict[str, Dict[str, Any]] = {
+    "sentencizer": {
+        "exclude": ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "ner"],
+        "sentencizer": True,
+        "provides": frozenset({"sents"}),
+    },
+    "tagger-only+sentencizer": {
+        "exclude": ["parser", "ner"],
+        "sentencizer": True,
+        "provides": frozenset({"tagger", "lemmatizer", "sents"}),
+    },
+    "no-ner": {
+        "exclude": ["ner"],
+        "sentencizer": False,
+        "provides": frozenset({"tagger", "lemmatizer", "parser", "sents"}),
+    },
+    "full": {
+        "exclude": [],
+        "sentencizer": False,
+        "provides": frozenset({"tagger", "lemmatizer", "parser", "ner", "sents"}),
+    },
+}
+
+
+def requires(*components: str) -> Callable:
+    """Declare the pipeline capabilities an extractor needs."""
+    unknown = set(components) - PIPELINE_PROFILES["full"]["provides"]
+    if unknown:
+        raise ValueError(f"Unknown pipeline capabilities: {sorted(unknown)}")
+
+    def decorate(func: Callable) -> Callable:
+        func.required_components = frozenset(components)
+        return func
+
+    return decorate
+
+
+def required_components(*funcs: Callable) -> FrozenSet[str]:
+    """Union of the capabilities declared by funcs (undeclared means full)."""
+    required = set()
+    for func in funcs:
+        required |= getattr(func, "required_components", PIPELINE_PROFILES["full"]["provides"])
+    return frozenset(required)
+
+
+def select_profile(required: Iterable[str]) -> str:
+    """Return the smallest profile that provides every required capability."""
+    required = set(required)
+    for name, spec in PIPELINE_PROFILES.items():
+        if required <= spec["provides"]:
+            return name
+    raise ValueError(f"No pipeline profile provides {sorted(required)}")
+
+
+@lru_cache(maxsize=None)
+def load_pipeline(profile: str = "full", model: str = MODEL_NAME):
+    """Load (once per process) the model with the profile's components excluded."""
+    import spacy
+
+    if profile not in PIPELINE_PROFILES:
+        raise ValueError(f"Unknown pipeline profile '{profile}'. Choose from: {', '.join(PIPELINE_PROFILES)}")
+    spec = PIPELINE_PROFILES[profile]
+    nlp = spacy.load(model, exclude=spec["exclude"])
+    if spec["sentencizer"] and "sentencizer" not in nlp.pipe_names:
+        nlp.add_pipe("sentencizer", first=True)
+    # Compile the requirement rules (rules.py) with the model, not on the first request
+    from rules import get_rules
+
+    get_rules(nlp.vocab)
+    logger.info(f"Loaded {model} with profile '{profile}': {nlp.pipe_names}")
+    return nlp
+
+
+def profile_provides(profile: str) -> FrozenSet[str]:
+    return PIPELINE_PROFILES[profile]["provides"]
+
+
+def pipeline_key(nlp) -> str:
+    """Identify everything about a loaded pipeline that can change its output."""
+    import spacy
+
+    meta = nlp.meta
+    return (
+        f"{meta.get('lang', 'xx')}_{meta.get('name', 'unknown')}-{meta.get('version', 'unknown')}"
+        f"/spacy-{spacy.__version__}/{'+'.join(nlp.pipe_names)}/{PIPELINE_VERSION}"
+    )
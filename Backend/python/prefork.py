@@ -0,0 +1,333 @@
+from __future__ import annotations
+
+"""
+Pre-fork worker pool for the SmartReq AI NLP processor
+------------------------------------------------------
+Every thread or process executor worker of --serve-async used to pay for
+its own copy of the spaCy pipeline, either in memory (ProcessPoolExecutor
+children re-import and touch everything) or in throughput (threads share
+one GIL). PreforkPool loads the pipeline once in the parent, moves
+everything allocated so far into the GC's permanent generation
+(gc.freeze(), so collections in the children do not write to the model's
+object headers and un-share their pages), then forks N children that serve
+requests with the model they inherited copy-on-write.
+
+The parent stays single-threaded on the asyncio loop of the AsyncServer
+(pass PreforkPool.call and no executor): each child is connected by a Unix
+socketpair speaking the worker.py NDJSON protocol, and a request borrows an
+idle child, writes one line and awaits one line back. The parent:
+
+  - replaces children that exit or crash; a request whose child turns out
+    to be dead (its socketpair write or read fails) is retried once on a
+    fresh child, and answered with an error if that one dies too (the
+    request itself may be what crashes them)
+  - recycles a child once its RSS exceeds max_rss_bytes, after it answered
+  - reports per-child RSS/PSS and the memory sharing saves (see stats)
+
+Children ignore SIGINT (a Ctrl-C reaches the whole process group; the
+parent drains and then closes their sockets) and exit on EOF or SIGTERM.
+Right after the fork a child closes every socket it inherited except its
+own socketpair end and stdio: the listening socket, client connections and
+other children's pairs, which would otherwise stay open as long as it runs.
+"""
+
+import asyncio
+import gc
+import json
+import logging
+import os
+import signal
+import socket
+import stat
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from async_server import MAX_LINE_BYTES
+from profiling import process_memory
+from worker import Handler, WorkerState, encode_message, handle_line
+
+
+logger = logging.getLogger("smartreq.nlp.prefork")
+
+
+class WorkerCrashed(Exception):
+    """Raised for a request whose worker process died before answering."""
+
+
+class WorkerError(Exception):
+    """Raised for a request the worker answered with an error."""
+
+
+@dataclass
+class PoolWorker:
+    pid: int
+    sock: socket.socket
+    started_at: float
+    reader: Optional[asyncio.StreamReader] = None
+    writer: Optional[asyncio.StreamWriter] = None
+    requests: int = 0
+    retired: bool = False
+
+
+def _close_inherited_sockets(keep: int) -> None:
+    """Close the parent's sockets in a freshly forked child (stdio and keep stay open).
+
+    Only sockets: the parent's SQLite connections are still referenced by
+    objects in the child, and closing their descriptors under them would let
+    a later close hit a reused descriptor number.
+    """
+    try:
+        fds = [int(fd) for fd in os.listdir("/proc/self/fd")]
+    except OSError:
+        fds = list(range(3, os.sysconf("SC_OPEN_MAX")))
+    for fd in fds:
+        if fd <= 2 or fd == keep:
+            continue
+        try:
+            if stat.S_ISSOCK(os.fstat(fd).st_mode):
+                os.close(fd)
+        except OSError:
+            pass  # the fd listing itself, or already closed
+
+
+def _rss_bytes(pid: int) -> Optional[int]:
+    """Cheap RSS read (statm) for the per-request ceiling check."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class PreforkPool:
+    """N forked children sharing the parent's loaded model copy-on-write.
+
+    handler_factory() runs in each child after the fork and returns the
+    request handler; it should reopen per-process resources (SQLite
+    connections, profilers) rather than reuse the parent's.
+    """
+
+    def __init__(
+        self,
+        handler_factory: Callable[[], Handler],
+        workers: int,
+        max_rss_bytes: int | None = None,
+        model: str | None = None,
+        check_interval: float = 1.0,
+    ):
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        self.handler_factory = handler_factory
+        self.size = workers
+        self.max_rss_bytes = max_rss_bytes
+        self.model = model
+        self.check_interval = check_interval
+        self.restarts = {"crashed": 0, "memory": 0}
+        self._workers: Dict[int, PoolWorker] = {}
+        self._exited: List[int] = []  # retired pids still to be reaped
+        self._idle: Optional[asyncio.Queue] = None
+        self._monitor: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    async def start(self) -> None:
+        """Freeze the parent's heap and fork the children."""
+        self._idle = asyncio.Queue()
+        gc.collect()
+        gc.freeze()
+        for _ in range(self.size):
+            await self._spawn()
+        self._monitor = asyncio.create_task(self._supervise())
+        logger.info(f"Forked {self.size} workers sharing the loaded model")
+
+    async def _spawn(self) -> None:
+        parent_sock, child_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+        pid = os.fork()
+        if pid == 0:  # child: never returns to the parent's event loop
+            parent_sock.close()
+            self._run_child(child_sock)
+        child_sock.close()
+        worker = PoolWorker(pid=pid, sock=parent_sock, started_at=time.time())
+        worker.reader, worker.writer = await asyncio.open_unix_connection(sock=parent_sock, limit=MAX_LINE_BYTES)
+        self._workers[pid] = worker
+        self._idle.put_nowait(worker)
+
+    def _run_child(self, sock: socket.socket) -> None:
+        code = 0
+        try:
+            # The parent's asyncio loop routes signals through a wakeup fd this
+            # process inherited; a signal sent here must not reach the parent
+            signal.set_wakeup_fd(-1)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            _close_inherited_sockets(keep=sock.fileno())
+            handler = self.handler_factory()
+            state = WorkerState(model=self.model)
+            reader = sock.makefile("r", encoding="utf-8")
+            writer = sock.makefile("w", encoding="utf-8")
+            for line in reader:
+                response = handle_line(line, handler, state)
+                if response is not None:
+                    writer.write(encode_message(response))
+                    writer.flush()
+        except BaseException:
+            logger.exception("Prefork worker failed")
+            code = 1
+        finally:
+            # Skip the parent's atexit handlers and finalizers
+            os._exit(code)
+
+    async def call(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one process request on an idle child and return its result."""
+        message = encode_message(payload).encode("utf-8")
+        for attempt in range(2):  # one retry on a fresh child
+            worker = await self._checkout()
+            line = await self._exchange(worker, message)
+            if line:
+                break
+            await self._retire(worker, "crashed")
+            logger.warning(f"Worker {worker.pid} died before answering (attempt {attempt + 1})")
+        else:
+            raise WorkerCrashed(f"Worker {worker.pid} exited while processing the request")
+
+        worker.requests += 1
+        rss = _rss_bytes(worker.pid) if self.max_rss_bytes else None
+        if rss is not None and rss > self.max_rss_bytes:
+            logger.info(f"Recycling worker {worker.pid}: RSS {rss} bytes exceeds {self.max_rss_bytes}")
+            await self._retire(worker, "memory")
+        else:
+            self._idle.put_nowait(worker)
+
+        response = json.loads(line)
+        if response.get("type") == "error":
+            raise WorkerError(response.get("error"))
+        return {key: value for key, value in response.items() if key not in ("id", "type")}
+
+    async def _checkout(self) -> PoolWorker:
+        """Next idle child, replacing any found to have exited while idle."""
+        while True:
+            worker = await self._idle.get()
+            if worker.retired:  # retired by the supervisor; its replacement is queued
+                continue
+            if self._waitpid(worker.pid):
+                logger.warning(f"Worker {worker.pid} exited while idle, restarting it")
+                await self._retire(worker, "crashed")
+                continue
+            return worker
+
+    async def _exchange(self, worker: PoolWorker, message: bytes) -> bytes:
+        """Send one request line and read the response line (b"" if the child is gone)."""
+        try:
+            worker.writer.write(message)
+            await worker.writer.drain()
+            return await worker.reader.readline()
+        except (ConnectionError, OSError):
+            return b""
+
+    async def _retire(self, worker: PoolWorker, reason: str) -> None:
+        """Close a child's socket (it exits on EOF) and fork its replacement."""
+        if worker.retired:
+            return
+        worker.retired = True
+        self._workers.pop(worker.pid, None)
+        self._exited.append(worker.pid)
+        worker.writer.close()
+        self.restarts[reason] += 1
+        if not self._stopping:
+            await self._spawn()
+
+    async def _supervise(self) -> None:
+        while not self._stopping:
+            await asyncio.sleep(self.check_interval)
+            self._reap()
+            for worker in list(self._workers.values()):
+                if self._waitpid(worker.pid):
+                    logger.warning(f"Worker {worker.pid} exited unexpectedly, restarting it")
+                    await self._retire(worker, "crashed")
+
+    def _waitpid(self, pid: int) -> bool:
+        """Reap pid if it exited (True), without blocking."""
+        try:
+            done, _ = os.waitpid(pid, os.WNOHANG)
+        except ChildProcessError:
+            return True
+        return done == pid
+
+    def _reap(self) -> None:
+        self._exited = [pid for pid in self._exited if not self._waitpid(pid)]
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Close every child's socket and wait for them, killing stragglers."""
+        self._stopping = True
+        if self._monitor is not None:
+            self._monitor.cancel()
+        for worker in list(self._workers.values()):
+            worker.retired = True
+            worker.writer.close()
+            self._exited.append(worker.pid)
+        self._workers.clear()
+        deadline = time.monotonic() + timeout
+        while self._exited and time.monotonic() < deadline:
+            self._reap()
+            if self._exited:
+                await asyncio.sleep(0.05)
+        for pid in self._exited:
+            logger.warning(f"Worker {pid} did not exit, killing it")
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self._exited = []
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-child memory and what copy-on-write sharing saves.
+
+        memory_saved_bytes is what N independent workers would hold (the sum
+        of the children's RSS) minus what the pool holds (the children's PSS
+        plus the parent's, which is charged its share of the model).
+        """
+        parent = process_memory()
+        workers = []
+        for worker in self._workers.values():
+            memory = process_memory(worker.pid)
+            workers.append({"pid": worker.pid, "requests": worker.requests, "started_at": worker.started_at, **memory})
+        total_rss = sum(w["rss_bytes"] or 0 for w in workers)
+        known_pss = parent["pss_bytes"] is not None and all(w["pss_bytes"] is not None for w in workers)
+        total_pss = parent["pss_bytes"] + sum(w["pss_bytes"] for w in workers) if known_pss else None
+        return {
+            "workers": workers,
+            "size": self.size,
+            "idle": self._idle.qsize() if self._idle is not None else 0,
+            "restarts": dict(self.restarts),
+            "max_rss_bytes": self.max_rss_bytes,
+            "parent": {"pid": os.getpid(), **parent},
+            "workers_rss_bytes": total_rss,
+            "total_pss_bytes": total_pss,
+            "memory_saved_bytes": total_rss - total_pss if total_pss is not None else None,
+        }
+
+    def render_metrics(self) -> str:
+        stats = self.stats()
+        lines = [
+            "# HELP smartreq_prefork_worker_rss_bytes Resident memory of each prefork worker.",
+            "# TYPE smartreq_prefork_worker_rss_bytes gauge",
+        ]
+        lines += [f'smartreq_prefork_worker_rss_bytes{{pid="{w["pid"]}"}} {w["rss_bytes"] or 0}' for w in stats["workers"]]
+        lines += [
+            "# HELP smartreq_prefork_worker_pss_bytes Proportional set size of each prefork worker.",
+            "# TYPE smartreq_prefork_worker_pss_bytes gauge",
+        ]
+        lines += [f'smartreq_prefork_worker_pss_bytes{{pid="{w["pid"]}"}} {w["pss_bytes"] or 0}' for w in stats["workers"]]
+        if stats["memory_saved_bytes"] is not None:
+            lines += [
+                "# HELP smartreq_prefork_memory_saved_bytes Memory saved by sharing the model copy-on-write.",
+                "# TYPE smartreq_prefork_memory_saved_bytes gauge",
+                f"smartreq_prefork_memory_saved_bytes {stats['memory_saved_bytes']}",
+            ]
+        lines += [
+            "# HELP smartreq_prefork_restarts_total Prefork workers replaced, by reason.",
+            "# TYPE smartreq_prefork_restarts_total counter",
+        ]
+        lines += [f'smartreq_prefork_restarts_total{{reason="{reason}"}} {count}' for reason, count in stats["restarts"].items()]
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+"""
+Profiling helpers for the SmartReq AI NLP processor
+---------------------------------------------------
+Startup profiling (--profile-startup) times each cold-start phase (imports,
+model load, first parse) and records the resident memory after it, giving a
+regression signal for what every spawned worker pays before its first
+request.
+
+Request profiling (--profile, or "profile": true on a request) wraps
+process_text in cProfile and tracemalloc for 1 in N requests and writes
+<hash>.pstats plus a <hash>.alloc.txt report of the top allocation sites
+to a directory, named by a hash of the request input.
+"""
+
+import cProfile
+import io
+import itertools
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+
+logger = logging.getLogger("smartreq.nlp.profiling")
+
+
+def current_rss_bytes() -> int | None:
+    """Resident set size of this process in bytes (None if unknown).
+
+    Reads /proc on Linux; elsewhere falls back to the peak RSS reported by
+    getrusage, which is the closest portable approximation.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+_SMAPS_FIELDS = {
+    "Rss": "rss_bytes",
+    "Pss": "pss_bytes",
+    "Shared_Clean": "shared_bytes",
+    "Shared_Dirty": "shared_bytes",
+    "Private_Clean": "private_bytes",
+    "Private_Dirty": "private_bytes",
+}
+
+
+def process_memory(pid: int | None = None) -> Dict[str, Optional[int]]:
+    """RSS, PSS, shared and private bytes of a process (this one by default).
+
+    PSS (proportional set size) charges each shared page to the processes
+    mapping it in equal parts, so summing it over forked workers gives their
+    real footprint where summing RSS counts shared pages once per worker.
+    Reads /proc/<pid>/smaps_rollup (Linux 4.14+); without it only RSS is
+    known (from statm) and the other fields are None.
+    """
+    proc = f"/proc/{pid or 'self'}"
+    memory: Dict[str, Optional[int]] = {"rss_bytes": None, "pss_bytes": None, "shared_bytes": None, "private_bytes": None}
+    try:
+        with open(f"{proc}/smaps_rollup") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                field = _SMAPS_FIELDS.get(name)
+                if field is not None:
+                    memory[field] = (memory[field] or 0) + int(value.split()[0]) * 1024
+        return memory
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        with open(f"{proc}/statm") as f:
+            memory["rss_bytes"] = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        if pid is None:
+            memory["rss_bytes"] = current_rss_bytes()
+    return memory
+
+
+class StartupProfile:
+    """Collects wall time and RSS per named startup phase."""
+
+    def __init__(self):
+        self.phases: List[Dict[str, Any]] = []
+        self._started = time.perf_counter()
+        self._baseline_rss = current_rss_bytes()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        rss_before = current_rss_bytes()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            rss_after = current_rss_bytes()
+            delta = rss_after - rss_before if rss_after is not None and rss_before is not None else None
+            self.phases.append({
+                "name": name,
+                "seconds": round(elapsed, 4),
+                "rss_bytes": rss_after,
+                "rss_delta_bytes": delta,
+            })
+
+    def report(self, **extra: Any) -> Dict[str, Any]:
+        return {
+            "phases": self.phases,
+            "total_seconds": round(time.perf_counter() - self._started, 4),
+            "baseline_rss_bytes": self._baseline_rss,
+            "rss_bytes": current_rss_bytes(),
+            **extra,
+        }
+
+
+def request_hash(input_text: str, project_type: str | None) -> str:
+    """Short stable name for a request's profile files."""
+    from result_cache import cache_key
+
+    return cache_key(input_text, project_type, pipeline="", namespace="profile")[:16]
+
+
+class RequestProfiler:
+    """cProfile + tracemalloc around 1 in sample_every requests.
+
+    Only one request is profiled at a time (both tools are process-wide);
+    a sampled request that arrives while another is being profiled runs
+    unprofiled.
+    """
+
+    # tracemalloc's own bookkeeping and import machinery are noise here
+    _IGNORED = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    )
+
+    def __init__(self, directory: str, sample_every: int = 1, top_n: int = 25, frames: int = 1):
+        if sample_every < 0:
+            raise ValueError("sample_every must be >= 0")
+        self.directory = directory
+        self.sample_every = sample_every  # 0: only requests that ask for it
+        self.top_n = top_n
+        self.frames = frames
+        self._counter = itertools.count(1)
+        self._busy = threading.Lock()
+
+    def should_sample(self, force: bool = False) -> bool:
+        """Count a request and decide whether to profile it."""
+        n = next(self._counter)
+        return force or (self.sample_every > 0 and n % self.sample_every == 0)
+
+    @contextmanager
+    def profile(self, name: str) -> Iterator[Optional[Dict[str, Any]]]:
+        """Profile the block; yields the report dict (filled in on exit) or None if busy."""
+        if not self._busy.acquire(blocking=False):
+            logger.info(f"Profiler busy, not profiling request {name}")
+            yield None
+            return
+        report: Dict[str, Any] = {"request": name}
+        already_tracing = tracemalloc.is_tracing()
+        profiler = cProfile.Profile()
+        try:
+            if not already_tracing:
+                tracemalloc.start(self.frames)
+            tracemalloc.reset_peak()
+            started = time.perf_counter()
+            profiler.enable()
+            try:
+                yield report
+            finally:
+                profiler.disable()
+                report["seconds"] = round(time.perf_counter() - started, 4)
+                snapshot = tracemalloc.take_snapshot()
+                report["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+                if not already_tracing:
+                    tracemalloc.stop()
+                self._write(name, profiler, snapshot, report)
+        finally:
+            self._busy.release()
+
+    def _write(self, name: str, profiler: cProfile.Profile, snapshot: tracemalloc.Snapshot, report: Dict[str, Any]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        stats_path = os.path.join(self.directory, f"{name}.pstats")
+        alloc_path = os.path.join(self.directory, f"{name}.alloc.txt")
+        profiler.dump_stats(stats_path)
+
+        sites = snapshot.filter_traces(self._IGNORED).statistics("traceback" if self.frames > 1 else "lineno")
+        lines = [
+            f"request {name}: {report['seconds']}s, peak traced memory {report['peak_memory_bytes']} bytes",
+            f"top {self.top_n} allocation sites by size:",
+        ]
+        for stat in sites[: self.top_n]:
+            frame = stat.traceback[-1]  # most recent frame: where the allocation happened
+            lines.append(f"{stat.size:>12} B {stat.count:>8} blocks  {frame.filename}:{frame.lineno}")
+
+        hotspots = io.StringIO()
+        pstats.Stats(profiler, stream=hotspots).sort_stats("cumulative").print_stats(self.top_n)
+        lines += ["", f"top {self.top_n} functions by cumulative time:", hotspots.getvalue()]
+        with open(alloc_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+
+        report["pstats"] = stats_path
+        report["allocations"] = alloc_path
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+"""
+Content-addressed result cache for the SmartReq AI NLP processor
+----------------------------------------------------------------
+Repeated "generate" clicks on unchanged project inputs should not pay for a
+full parse and extraction again. Entries are keyed by a hash of the
+normalized input text, project type, spaCy model/version, enabled
+components and pipeline version, and live in two tiers:
+
+  - a bounded in-memory LRU (per process)
+  - an optional SQLite file shared by every process using the same path
+
+Both tiers honour a TTL; the disk tier also evicts least recently used rows
+once it exceeds its byte budget. Values must be JSON-serializable.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+logger = logging.getLogger("smartreq.nlp.cache")
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so formatting-only edits hit the same entry."""
+    return " ".join(text.split())
+
+
+def cache_key(input_text: str, project_type: str | None, pipeline: str, namespace: str = "candidates") -> str:
+    """Hash everything that can change the extraction output.
+
+    pipeline identifies the model, spaCy and pipeline versions (see
+    pipelines.pipeline_key).
+    """
+    material = json.dumps(
+        [namespace, normalize_text(input_text), (project_type or "").strip().lower(), pipeline],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Two-tier (memory LRU + SQLite) cache with TTL and size-based eviction."""
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: float | None = None,
+        path: str | None = None,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "sets": 0, "evictions": 0}
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._db = self._open(path)
+
+    @staticmethod
+    def _open(path: str) -> sqlite3.Connection:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS results_accessed_at ON results(accessed_at)")
+        return db
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def get(self, key: str) -> Any | None:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute("SELECT value, created_at FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    if self._expired(row[1], now):
+                        self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+                    else:
+                        self._db.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+                        value = json.loads(row[0])
+                        self._remember(key, row[1], value)
+                        self._counters["disk_hits"] += 1
+                        return value
+
+            self._counters["misses"] += 1
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            self._counters["sets"] += 1
+            if self._db is not None:
+                encoded = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, encoded, len(encoded), now, now),
+                )
+                self._evict_disk(now)
+
+    def _remember(self, key: str, created_at: float, value: Any) -> None:
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _evict_disk(self, now: float) -> None:
+        if self.ttl_seconds is not None:
+            self._db.execute("DELETE FROM results WHERE created_at < ?", (now - self.ttl_seconds,))
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        # Drop least recently used rows until we are back under budget
+        excess = total - self.max_disk_bytes
+        freed = 0
+        for key, size in self._db.execute("SELECT key, size FROM results ORDER BY accessed_at").fetchall():
+            self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+            self._counters["evictions"] += 1
+            freed += size
+            if freed >= excess:
+                break
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+            stats["hits"] = stats["memory_hits"] + stats["disk_hits"]
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+            stats["memory_entries"] = len(self._memory)
+            if self._db is not None:
+                stats["disk_entries"] = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            return stats
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+"""
+Compiled rule layer for requirement signals
+-------------------------------------------
+Role keywords, role mentions, modal (requirement) keywords and action nouns
+used to be keyword lists and regexes re-evaluated by each extractor. They
+are compiled here into one spaCy PhraseMatcher (on LOWER) per Vocab, built
+when a pipeline is loaded (pipelines.load_pipeline) and run at most once per
+Doc:
+
+  - ROLE          role keywords (utils.collect_candidates keeps the
+                  NOUN/PROPN ones)
+  - ROLE_MENTION  roles, system and requirement-type words, incl. "end user"
+                  and "non-functional" (RequirementExtractor.identify_roles);
+                  overlapping mentions resolve to the longest
+  - MODAL         should / must / need / require / want / "able to", also
+                  inside inflected forms such as "needs" or "required"
+                  (RequirementExtractor.generate_user_stories)
+  - ACTION_NOUN   tokens containing request / approval / review / ...
+                  (noun chunks that are actions in collect_candidates)
+
+Keyword lists are fixed phrases. Rules about the text of a word (MODAL,
+ACTION_NOUN, "end_user") are regexes evaluated per distinct lowercase form
+rather than per token, as Matcher REGEX/IN patterns would be. The forms
+already in the Vocab's StringStore are classified when the RuleSet is
+compiled and the matching ones become phrases, so the per-token work stays
+in the PhraseMatcher's hash lookup. The matcher is never changed after
+that: forms first seen in a request are classified through a bounded cache
+(word_rules, WORD_RULES_CACHE_SIZE forms) and located in the Doc directly,
+so a long-running worker's RuleSet stays the same size and matching needs
+no lock. Matching needs no annotations, so it works on Docs from every
+pipeline profile (POS filters are applied by the consumers). match(doc)
+caches its RuleMatches in doc.user_data.
+"""
+
+import re
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Set, Tuple
+
+
+ROLE_KEYWORDS = (
+    "user", "admin", "manager", "developer", "customer", "client",
+    "employee", "team", "system", "reviewer", "approver", "validator",
+    "executor", "stakeholder", "member", "owner", "lead", "analyst",
+    "designer", "tester", "qa", "operator", "supervisor", "coordinator",
+)
+
+ROLE_MENTIONS = (
+    "user", "admin", "manager", "developer", "tester", "analyst", "stakeholder", "customer", "client",
+    "system", "application", "platform", "service", "tool", "interface",
+    "business", "technical", "functional",
+)
+
+MODAL_KEYWORDS = ("should", "must", "need", "require", "want")
+
+ACTION_NOUNS = (
+    "request", "approval", "review", "validation", "execution",
+    "verification", "authorization", "confirmation", "notification",
+    "submission", "processing", "assignment", "allocation",
+)
+
+# Fixed phrases per label, matched on LOWER by a PhraseMatcher
+PHRASES: Dict[str, List[Tuple[str, ...]]] = {
+    "ROLE": [(word,) for word in ROLE_KEYWORDS],
+    "ROLE_MENTION": [(word,) for word in ROLE_MENTIONS] + [
+        (first, *joiner, second)
+        for first, second in (("end", "user"), ("non", "functional"))
+        for joiner in ((), ("-",), ("/",), ("_",))
+    ],
+}
+
+# Rules over the text of a word rather than the whole word: (label, regex
+# searched in the lowercase form, words that must follow). Forms in the
+# Vocab at compile time that match become phrases; later ones go through
+# word_rules.
+WORD_RULES: List[Tuple[str, "re.Pattern[str]", Tuple[str, ...]]] = [
+    ("ROLE_MENTION", re.compile(r"^(?:end.?user|non.?functional)$"), ()),
+    ("MODAL", re.compile("|".join(MODAL_KEYWORDS)), ()),
+    ("MODAL", re.compile(r"able$"), ("to",)),
+    ("ACTION_NOUN", re.compile("|".join(ACTION_NOUNS)), ()),
+]
+
+# Rejects most forms with one search instead of one per rule
+_ANY_WORD_RULE = re.compile("|".join(f"(?:{pattern.pattern})" for _, pattern, _ in WORD_RULES))
+
+# Distinct forms seen after compilation whose classification is kept
+WORD_RULES_CACHE_SIZE = 16_384
+
+LABELS = ("ROLE", "ROLE_MENTION", "MODAL", "ACTION_NOUN")
+
+_USER_DATA_KEY = "smartreq_rules"
+
+
+@dataclass
+class RuleMatches:
+    """Matched spans of one Doc by label, in document order."""
+
+    roles: List[Any]
+    role_mentions: List[Any]
+    modals: List[Any]
+    action_nouns: List[Any]
+
+    @property
+    def action_noun_tokens(self) -> Set[int]:
+        return {span.start for span in self.action_nouns}
+
+    def has_modal(self, start: int, end: int) -> bool:
+        """Whether a modal keyword starts within token range [start, end)."""
+        return any(start <= span.start < end for span in self.modals)
+
+
+@lru_cache(maxsize=WORD_RULES_CACHE_SIZE)
+def word_rules(text: str) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+    """(label, words that must follow) of every WORD_RULE matching a lowercase form."""
+    if not _ANY_WORD_RULE.search(text):
+        return ()
+    return tuple((label, following) for label, pattern, following in WORD_RULES if pattern.search(text))
+
+
+class RuleSet:
+    """The compiled PhraseMatcher for one Vocab."""
+
+    def __init__(self, vocab):
+        from spacy.matcher import PhraseMatcher
+
+        self.vocab = vocab
+        self.matcher = PhraseMatcher(vocab, attr="LOWER")
+        for label, phrases in PHRASES.items():
+            self._add(label, phrases)
+        self._labels = {vocab.strings[label]: label for label in LABELS}
+        self._label_ids = {label: match_id for match_id, label in self._labels.items()}
+        self._compiled = self._compile_forms()
+
+    def _add(self, label: str, phrases: List[Tuple[str, ...]]) -> None:
+        from spacy.tokens import Doc
+
+        self.matcher.add(label, [Doc(self.vocab, words=list(words)) for words in phrases])
+
+    def _compile_forms(self) -> FrozenSet[int]:
+        """Add the Vocab's lowercase forms matching a WORD_RULE as phrases; returns the forms seen."""
+        strings = self.vocab.strings
+        forms = [text for text in strings if text == text.lower()]
+        for text in forms:
+            # Uncached: these forms never reach word_rules again
+            for label, following in word_rules.__wrapped__(text):
+                self._add(label, [(text, *following)])
+        return frozenset(strings[text] for text in forms)
+
+    def _new_form_matches(self, doc) -> List[Tuple[int, int, int]]:
+        """WORD_RULE matches of the doc's forms that were not in the Vocab at compile time."""
+        from spacy.attrs import LOWER
+
+        lowers = doc.to_array([LOWER]).ravel().tolist()
+        forms = set(lowers) - self._compiled
+        if not forms:
+            return []
+        strings = self.vocab.strings
+        rules = {form: word_rules(strings[form]) for form in forms}
+        rules = {form: matched for form, matched in rules.items() if matched}
+        if not rules:
+            return []
+        found = []
+        for start, form in enumerate(lowers):
+            for label, following in rules.get(form, ()):
+                end = start + 1 + len(following)
+                if tuple(token.lower_ for token in doc[start + 1:end]) == following:
+                    found.append((self._label_ids[label], start, end))
+        return found
+
+    def __call__(self, doc) -> RuleMatches:
+        from spacy.util import filter_spans
+
+        found_matches = sorted(self.matcher(doc) + self._new_form_matches(doc), key=lambda m: (m[1], m[2]))
+        found: Dict[str, List[Any]] = {label: [] for label in LABELS}
+        for match_id, start, end in found_matches:
+            found[self._labels[match_id]].append(doc[start:end])
+        return RuleMatches(
+            roles=found["ROLE"],
+            role_mentions=filter_spans(found["ROLE_MENTION"]),
+            modals=found["MODAL"],
+            action_nouns=found["ACTION_NOUN"],
+        )
+
+
+# One RuleSet per Vocab (each RuleSet holds its Vocab, so the id stays unique)
+_rule_sets: Dict[int, RuleSet] = {}
+_rule_sets_lock = threading.Lock()
+
+
+def get_rules(vocab) -> RuleSet:
+    """The RuleSet compiled for vocab (built on first use)."""
+    with _rule_sets_lock:
+        rule_set = _rule_sets.get(id(vocab))
+        if rule_set is None:
+            rule_set = _rule_sets[id(vocab)] = RuleSet(vocab)
+        return rule_set
+
+
+def match(doc) -> RuleMatches:
+    """Rule matches of doc, computed once and cached on the Doc."""
+    matches = doc.user_data.get(_USER_DATA_KEY)
+    if matches is None:
+        matches = doc.user_data[_USER_DATA_KEY] = get_rules(doc.vocab)(doc)
+    return matches
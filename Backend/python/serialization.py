@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+"""
+Output serialization for the SmartReq AI NLP processor
+------------------------------------------------------
+Results are large nested dicts (flow nodes, edges, the Mermaid string), and
+for big flows encoding plus pipe transfer is a visible part of a request.
+The CLI output (--format) goes through one of:
+
+  - "json"     compact stdlib JSON, one document per line (default)
+  - "orjson"   the same bytes-on-the-wire format encoded by orjson; falls
+               back to "json" when orjson is not installed
+  - "msgpack"  length-prefixed frames: a 4-byte big-endian payload length,
+               then the msgpack payload (needs the msgpack package; there
+               is no wire-compatible stdlib fallback)
+
+JSON formats stay newline-delimited, so --stream output is NDJSON for both;
+read_frames decodes a msgpack stream.
+"""
+
+import json
+import logging
+import struct
+from typing import IO, Any, Iterator
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json is used instead
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional: only needed for --format msgpack
+    msgpack = None
+
+
+logger = logging.getLogger("smartreq.nlp.serialization")
+
+FORMATS = ("json", "orjson", "msgpack")
+
+FRAME_HEADER = struct.Struct(">I")
+
+
+class JsonSerializer:
+    """Compact stdlib JSON, newline-terminated."""
+
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+    def write(self, stream: IO[bytes], obj: Any) -> int:
+        data = self.dumps(obj)
+        stream.write(data)
+        stream.flush()
+        return len(data)
+
+
+class OrjsonSerializer(JsonSerializer):
+    """orjson encoding of the same newline-terminated JSON."""
+
+    name = "orjson"
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+
+    def loads(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+class MsgpackSerializer(JsonSerializer):
+    """msgpack payloads in length-prefixed frames."""
+
+    name = "msgpack"
+
+    def dumps(self, obj: Any) -> bytes:
+        payload = msgpack.packb(obj, use_bin_type=True)
+        return FRAME_HEADER.pack(len(payload)) + payload
+
+    def loads(self, data: bytes) -> Any:
+        (length,) = FRAME_HEADER.unpack_from(data)
+        return msgpack.unpackb(data[FRAME_HEADER.size:FRAME_HEADER.size + length], raw=False)
+
+
+def available(name: str) -> bool:
+    """Whether format name can be produced here (orjson always can, via json)."""
+    if name not in FORMATS:
+        return False
+    return name != "msgpack" or msgpack is not None
+
+
+def get_serializer(name: str = "json") -> JsonSerializer:
+    """Serializer for an output format, falling back to stdlib JSON for orjson."""
+    if name not in FORMATS:
+        raise ValueError(f"Unknown output format '{name}'. Choose from: {', '.join(FORMATS)}")
+    if name == "msgpack":
+        if msgpack is None:
+            raise ValueError("--format msgpack needs the msgpack package (pip install msgpack)")
+        return MsgpackSerializer()
+    if name == "orjson":
+        if orjson is None:
+            logger.info("orjson is not installed, writing output with the stdlib json module")
+            return JsonSerializer()
+        return OrjsonSerializer()
+    return JsonSerializer()
+
+
+def read_frames(stream: IO[bytes]) -> Iterator[Any]:
+    """Decode a stream of length-prefixed msgpack frames."""
+    while True:
+        header = stream.read(FRAME_HEADER.size)
+        if not header:
+            return
+        if len(header) < FRAME_HEADER.size:
+            raise ValueError("truncated frame header")
+        (length,) = FRAME_HEADER.unpack(header)
+        payload = stream.read(length)
+        if len(payload) < length:
+            raise ValueError("truncated frame payload")
+        yield msgpack.unpackb(payload, raw=False)
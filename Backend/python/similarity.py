@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+"""
+Character-overlap similarity for SmartReq AI candidates
+-------------------------------------------------------
+utils.calculate_similarity scores two strings by the overlap of their
+lower-cased character sets: |A & B| / max(|A|, |B|) (1.0 when equal).
+
+NearDuplicateIndex answers "is this item more than `threshold` similar to
+anything accepted so far?" without comparing against every accepted item:
+
+  - each item's character set is computed once and kept as a bitmask, so
+    verifying a pair is an AND plus two popcounts
+  - accepted items are bucketed by the characters in their prefix under a
+    fixed global character order (prefix filtering). Two sets whose overlap
+    can exceed the threshold must share a character in those prefixes, so
+    only items sharing a bucket are ever verified.
+
+The result is exactly the same as the all-pairs check with
+calculate_similarity, just without the quadratic scan.
+
+SimilarityMatrix covers the cases that genuinely need every pair (the
+diversity check in utils.confidence_score): each string becomes a
+fixed-width character-presence vector and NumPy computes the whole overlap
+ratio matrix at once. Without NumPy the same counts come from a bitmask
+loop.
+"""
+
+import math
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+# Rough English letter frequency, most common first. Prefixes are taken in
+# rarest-first order so buckets stay small; space is the most common of all.
+_COMMON_CHARS = " etaoinshrdlcumwfgypbvkjxqz"
+_CHAR_RANK = {ch: len(_COMMON_CHARS) - i for i, ch in enumerate(_COMMON_CHARS)}
+
+
+def _char_order(ch: str) -> Tuple[int, str]:
+    # Characters outside the table (digits, punctuation, non-ASCII) are rare
+    return (_CHAR_RANK.get(ch, 0), ch)
+
+
+def char_set(text: str) -> FrozenSet[str]:
+    """The character signature calculate_similarity compares."""
+    return frozenset(text.lower())
+
+
+def _popcount(value: int) -> int:
+    return bin(value).count("1")
+
+
+if hasattr(int, "bit_count"):  # Python 3.10+
+    _popcount = int.bit_count  # noqa: F811
+
+
+def _min_overlap(size: int, threshold: float) -> int:
+    """Smallest integer overlap o with o > threshold * size."""
+    return math.floor(threshold * size) + 1
+
+
+class NearDuplicateIndex:
+    """Incremental near-duplicate filter with calculate_similarity semantics."""
+
+    def __init__(self, threshold: float):
+        if threshold < 0:
+            raise ValueError("threshold must be >= 0")
+        self.threshold = threshold
+        self.items: List[str] = []
+        self._char_bits: Dict[str, int] = {}
+        self._masks: List[int] = []
+        self._sizes: List[int] = []
+        self._buckets: Dict[str, List[int]] = {}
+        self._exact: Set[str] = set()
+
+    def _signature(self, text: str) -> Tuple[List[str], int]:
+        chars = sorted(char_set(text), key=_char_order)
+        mask = 0
+        for ch in chars:
+            bit = self._char_bits.get(ch)
+            if bit is None:
+                bit = self._char_bits[ch] = len(self._char_bits)
+            mask |= 1 << bit
+        return chars, mask
+
+    def _prefix(self, chars: List[str]) -> List[str]:
+        # A pair can only exceed the threshold if it shares at least
+        # _min_overlap(size) characters, which forces a shared character
+        # within the first size - _min_overlap(size) + 1 characters
+        return chars[: max(0, len(chars) - _min_overlap(len(chars), self.threshold) + 1)]
+
+    def is_duplicate(self, text: str) -> bool:
+        """True if text is more than threshold similar to an accepted item."""
+        return self._find_duplicate(text)[0]
+
+    def _find_duplicate(self, text: str) -> Tuple[bool, List[str], int]:
+        chars, mask = self._signature(text)
+        if not chars:
+            return False, chars, mask  # empty strings are never similar
+        lowered = text.lower()
+        if lowered in self._exact and self.threshold < 1.0:
+            return True, chars, mask
+
+        size = len(chars)
+        seen = set()
+        for ch in self._prefix(chars):
+            for idx in self._buckets.get(ch, ()):
+                if idx in seen:
+                    continue
+                seen.add(idx)
+                overlap = _popcount(mask & self._masks[idx])
+                if overlap / max(size, self._sizes[idx]) > self.threshold:
+                    return True, chars, mask
+        return False, chars, mask
+
+    def add(self, text: str) -> bool:
+        """Accept text unless it is a near-duplicate; return whether it was added."""
+        duplicate, chars, mask = self._find_duplicate(text)
+        if duplicate:
+            return False
+        idx = len(self.items)
+        self.items.append(text)
+        self._masks.append(mask)
+        self._sizes.append(len(chars))
+        self._exact.add(text.lower())
+        for ch in self._prefix(chars):
+            self._buckets.setdefault(ch, []).append(idx)
+        return True
+
+
+def unique_by_similarity(items: List[str], threshold: float, method: str = "index") -> List[str]:
+    """Keep items in order, dropping any more than threshold similar to an earlier kept one.
+
+    method "index" uses NearDuplicateIndex; "matrix" scores all pairs with
+    SimilarityMatrix (needs NumPy), which wins for small dense lists.
+    """
+    if method == "matrix":
+        return SimilarityMatrix(items).greedy_unique(threshold)
+    if method != "index":
+        raise ValueError(f"Unknown dedupe method: {method}")
+    index = NearDuplicateIndex(threshold)
+    for item in items:
+        index.add(item)
+    return index.items
+
+
+class SimilarityMatrix:
+    """Vectorized pairwise calculate_similarity scores for a list of strings."""
+
+    # Rows per block when reducing over the n x n matrix, bounding memory
+    BLOCK_ROWS = 1024
+
+    def __init__(self, items: Iterable[str]):
+        if np is None:
+            raise ImportError("SimilarityMatrix requires numpy")
+        self.items = list(items)
+        sets = [char_set(item) for item in self.items]
+        vocabulary: Dict[str, int] = {}
+        for chars in sets:
+            for ch in chars:
+                vocabulary.setdefault(ch, len(vocabulary))
+
+        # Character-presence vectors; counts stay exact in float32 (< 2**24)
+        self._presence = np.zeros((len(self.items), max(len(vocabulary), 1)), dtype=np.float32)
+        for row, chars in enumerate(sets):
+            self._presence[row, [vocabulary[ch] for ch in chars]] = 1.0
+        self._sizes = self._presence.sum(axis=1).astype(np.float64)
+
+    def _ratio_rows(self, start: int, stop: int):
+        overlap = (self._presence[start:stop] @ self._presence.T).astype(np.float64)
+        denominator = np.maximum(self._sizes[start:stop, None], self._sizes[None, :])
+        ratios = np.zeros_like(overlap)
+        np.divide(overlap, denominator, out=ratios, where=denominator > 0)
+        return ratios
+
+    def ratios(self):
+        """Full n x n matrix of |A & B| / max(|A|, |B|) (0 for empty strings)."""
+        return self._ratio_rows(0, len(self.items))
+
+    def similar_pair_count(self, threshold: float) -> Tuple[int, int]:
+        """Return (pairs i < j scoring above threshold, total pairs)."""
+        n = len(self.items)
+        similar = 0
+        for start in range(0, n, self.BLOCK_ROWS):
+            stop = min(start + self.BLOCK_ROWS, n)
+            above = self._ratio_rows(start, stop) > threshold
+            # Keep only the upper triangle (column index > row index)
+            rows = np.arange(start, stop)[:, None]
+            similar += int(np.count_nonzero(above & (np.arange(n)[None, :] > rows)))
+        return similar, n * (n - 1) // 2
+
+    def greedy_unique(self, threshold: float) -> List[str]:
+        """Same result as unique_by_similarity, computed from the ratio matrix."""
+        ratios = self.ratios()
+        kept: List[int] = []
+        for i in range(len(self.items)):
+            if not kept or not np.any(ratios[i, kept] > threshold):
+                kept.append(i)
+        return [self.items[i] for i in kept]
+
+
+# Below this many items the bitmask loop beats the NumPy setup cost
+MATRIX_MIN_ITEMS = 32
+
+
+def similar_pair_count(items: List[str], threshold: float) -> Tuple[int, int]:
+    """Count pairs (i < j) with calculate_similarity above threshold.
+
+    Uses SimilarityMatrix when NumPy is installed and the list is large
+    enough to pay for it, otherwise a bitmask loop.
+    Returns (similar pairs, total pairs).
+    """
+    n = len(items)
+    if n < 2:
+        return 0, 0
+    if np is not None and n >= MATRIX_MIN_ITEMS:
+        return SimilarityMatrix(items).similar_pair_count(threshold)
+
+    char_bits: Dict[str, int] = {}
+    masks, sizes = [], []
+    for item in items:
+        mask = 0
+        chars = char_set(item)
+        for ch in chars:
+            mask |= 1 << char_bits.setdefault(ch, len(char_bits))
+        masks.append(mask)
+        sizes.append(len(chars))
+
+    similar = 0
+    for i in range(n):
+        for j in range(i + 1, n):
+            denominator = max(sizes[i], sizes[j])
+            if denominator and _popcount(masks[i] & masks[j]) / denominator > threshold:
+                similar += 1
+    return similar, n * (n - 1) // 2
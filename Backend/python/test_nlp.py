@@ -19,3 +19,598 @@ def test_basic_output():
   assert 'flow' in out and isinstance(out['flow'], dict)
   assert 'nodes' in out['flow'] and 'edges' in out['flow']
   assert 'confidence' in out and isinstance(out['confidence'], (int, float))
+
+
+def test_serve_mode_answers_tagged_requests():
+  requests = [
+    {"id": "r1", "input_text": "As a user I want to login so that I can view balance", "project_type": "fintech"},
+    {"id": "h1", "type": "health"},
+    {"id": "r2", "input_text": ""},
+    {"type": "shutdown"},
+  ]
+  proc = subprocess.run(
+    [sys.executable, 'python/nlp_processor.py', '--serve'],
+    input="".join(json.dumps(r) + "\n" for r in requests).encode('utf-8'),
+    capture_output=True
+  )
+  assert proc.returncode == 0, proc.stderr.decode()
+  lines = [json.loads(line) for line in proc.stdout.decode().splitlines()]
+  assert lines[0]['type'] == 'ready'
+  assert lines[1]['id'] == 'r1' and lines[1]['type'] == 'result' and 'flow' in lines[1]
+  assert lines[2]['id'] == 'h1' and lines[2]['status'] == 'ok' and lines[2]['processed'] == 1
+  assert lines[3]['id'] == 'r2' and lines[3]['type'] == 'error'
+  assert lines[4]['type'] == 'shutdown'
+
+
+def test_requirement_extractor_parses_each_request_once(monkeypatch):
+  import doc_store
+  import nlp_processor
+  import nlp_script
+
+  class CountingNlp:
+    def __init__(self, nlp):
+      self.nlp, self.calls = nlp, 0
+
+    def __call__(self, text):
+      self.calls += 1
+      return self.nlp(text)
+
+    def __getattr__(self, name):
+      return getattr(self.nlp, name)
+
+  monkeypatch.setattr(doc_store, "_store", doc_store.DocStore(max_memory_bytes=0))  # every parse reaches the pipeline
+  text = "As a manager I want to approve requests so that work moves. The system must notify the user."
+  counting = CountingNlp(nlp_processor.load_models())
+  result = nlp_script.RequirementExtractor(counting).process_text(text)
+  assert result['success'] and counting.calls == 1
+
+  # Without an explicit model the profile pipeline is loaded, and still parses once
+  loaded = []
+
+  def load_counting(profile):
+    loaded.append(CountingNlp(nlp_processor.load_models(profile)))
+    return loaded[-1]
+
+  monkeypatch.setattr(nlp_script, "load_pipeline", load_counting)
+  assert nlp_script.RequirementExtractor().process_text(text)['success']
+  assert sum(nlp.calls for nlp in loaded) == 1
+
+
+def test_batch_mode_keeps_order_and_isolates_errors():
+  items = [
+    {"id": "a", "input_text": "As a user I want to login so that I can view balance", "project_type": "fintech"},
+    {"id": "b", "input_text": ""},
+    {"id": "c", "input_text": "The manager should approve transfer requests"},
+  ]
+  proc = subprocess.run(
+    [sys.executable, 'python/nlp_processor.py', '--batch', '--batch-size', '2'],
+    input=json.dumps(items).encode('utf-8'),
+    capture_output=True
+  )
+  assert proc.returncode == 0, proc.stderr.decode()
+  out = json.loads(proc.stdout.decode())
+  assert [r['id'] for r in out] == ['a', 'b', 'c']
+  assert out[0]['error'] is None and 'flow' in out[0]
+  assert out[1]['error']
+  assert out[2]['error'] is None and isinstance(out[2]['stories'], list)
+
+
+def test_result_cache_memory_and_disk_tiers(tmp_path):
+  from result_cache import ResultCache, cache_key
+
+  key = cache_key("As a  user I want to login", "Fintech", "en_core_web_sm-3.7.1")
+  assert key == cache_key("As a user I want to login ", "fintech", "en_core_web_sm-3.7.1")
+
+  path = str(tmp_path / "results.sqlite3")
+  cache = ResultCache(max_entries=1, path=path)
+  cache.set(key, {"roles": ["User"]})
+  cache.set("other", {"roles": []})  # evicts key from the memory tier
+  assert cache.get(key) == {"roles": ["User"]}
+  assert cache.get("missing") is None
+  stats = cache.stats()
+  assert stats["disk_hits"] == 1 and stats["misses"] == 1 and stats["disk_entries"] == 2
+
+  # A second process sharing the file sees the entry
+  assert ResultCache(path=path).get("other") == {"roles": []}
+
+
+def test_exact_replay_goes_through_uniqueness_tracker():
+  import nlp_processor
+  from result_cache import ResultCache
+  from uniqueness import UniquenessTracker, configure
+
+  tracker = UniquenessTracker()
+  configure(tracker)
+  nlp = nlp_processor.load_models()
+  cache = ResultCache()
+  text = "As a user I want to login so that I can view balance"
+  first = nlp_processor.process_text(text, "fintech", nlp, cache=cache, exact_replay=True, seed=7)
+  stories = first.pop('stories')  # changing a returned result leaves the cached entry intact
+  replay = nlp_processor.process_text(text, "fintech", nlp, cache=cache, exact_replay=True, seed=7)
+  assert first['is_unique'] and not replay['is_unique']
+  assert replay['stories'] == stories and cache.stats()['hits'] >= 1
+  assert tracker.stats()['checked'] == 2 and tracker.stats()['duplicates'] == 1
+
+
+def test_seeded_output_is_reproducible():
+  payload = {
+    "input_text": "As a user I want to login so that I can view balance. The manager should approve transfer requests.",
+    "project_type": "fintech",
+    "seed": 42,
+  }
+  first = run_script(payload)
+  second = run_script(payload)
+  assert first == second
+  assert "Generated at 0" in first['flow']['mermaid']
+
+
+def test_mermaid_renderer_output_is_byte_identical():
+  import io
+  import random
+  from flow_graph import FlowGraph
+  from mermaid_renderer import MermaidRenderer
+  from utils import build_swimlane_flow
+
+  # Diagram of the string-concatenating renderer this one replaced, same seed
+  expected = "\n".join([
+    "flowchart LR",
+    "%% === Generated at 0 ===",
+    "",
+    "%% === Swimlane: Manager ===",
+    'subgraph Manager["🎯 Manager"]',
+    "    N1_0[Submit request]",
+    "    N5_0([End])",
+    "end",
+    "",
+    "%% === Swimlane: Customer ===",
+    'subgraph Customer["🔷 Customer"]',
+    "    N0_0([Start])",
+    "    N2_0{Approve request}",
+    "    N3_0[Notify user]",
+    "    N4_0[Initialize Submit request]",
+    "    N2_0 -- Invalid --> N3_0",
+    "    N2_0 ==> N3_0",
+    "    N3_0 -.-> N4_0",
+    "end",
+    "",
+    "%% === Cross-Lane Connections ===",
+    'N0_0 == "Proceed" ==> N1_0',
+    'N1_0 == "Proceed" ==> N2_0',
+    "N4_0 ==> N5_0",
+    "%% Total cross-lane connections: 3",
+  ])
+  flow = build_swimlane_flow(["Submit request", "Approve request", "Notify user"], min_steps=4, actors=["Customer", "Manager"], rng=random.Random(0), timestamp=0)
+  assert flow["mermaid"] == expected
+
+  graph = FlowGraph(["Customer", "Manager"])
+  for i, (actor, shape) in enumerate([("Customer", "start"), ("Customer", "decision"), ("Manager", "process"), ("Manager", "end")]):
+    graph.add_node(f"n{i}", f"Step {i}", actor, shape, i * 100)
+  graph.add_edge("n0", "n1", "Yes")
+  graph.add_edge("n1", "n2")
+  graph.add_edge("n2", "n3")
+  graph.add_edge("n2", "n3", "Retry", alt=True)
+  streamed = io.StringIO()
+  MermaidRenderer(graph, timestamp=1234, rng=random.Random(5)).write(streamed)
+  assert streamed.getvalue() == "\n".join(MermaidRenderer(graph, timestamp=1234, rng=random.Random(5)).lines())
+  assert streamed.getvalue() == graph.to_mermaid(1234, rng=random.Random(5))
+
+
+def test_flow_serialize_builds_only_requested_formats():
+  import random
+  import pytest
+  from flow_graph import ALL_FORMATS, FlowGraph, MERMAID, REACT_FLOW
+  from utils import build_swimlane_flow
+
+  actions = ["Submit request", "Approve request", "Notify user"]
+  full = build_swimlane_flow(actions, min_steps=4, actors=["Customer", "Manager"], rng=random.Random(3), timestamp=0)
+  assert full == build_swimlane_flow(actions, min_steps=4, actors=["Customer", "Manager"], rng=random.Random(3), timestamp=0, formats=ALL_FORMATS)
+  assert set(full) == {"nodes", "edges", "actors", "mermaid"}
+
+  mermaid_only = build_swimlane_flow(actions, min_steps=4, actors=["Customer", "Manager"], rng=random.Random(3), timestamp=0, formats=(MERMAID,))
+  assert "nodes" not in mermaid_only and "edges" not in mermaid_only
+  assert mermaid_only["actors"] == full["actors"]
+  assert mermaid_only["mermaid"] == full["mermaid"]
+
+  graph = FlowGraph(["Customer"])
+  graph.add_node("n0", "Start", "Customer", "start", 0)
+  graph.add_node("n1", "End", "Customer", "end", 100)
+  graph.add_edge("n0", "n1")
+  assert graph.serialize(rng=random.Random(1)) == graph.serialize((REACT_FLOW, MERMAID), rng=random.Random(1))
+  assert "mermaid" not in graph.serialize((REACT_FLOW,))
+  with pytest.raises(ValueError):
+    graph.serialize(("svg",))
+
+
+def test_near_duplicate_index_matches_pairwise_similarity():
+  import random
+  from similarity import unique_by_similarity
+  from utils import calculate_similarity
+
+  rng = random.Random(0)
+  words = "approve request review transfer account payment verify submit user manager export".split()
+  items = [" ".join(rng.sample(words, rng.randint(1, 3))).title() for _ in range(300)]
+  for threshold in (0.7, 0.75, 0.8):
+    expected = []
+    for item in items:
+      if not any(calculate_similarity(item, kept) > threshold for kept in expected):
+        expected.append(item)
+    assert unique_by_similarity(items, threshold) == expected
+
+
+def test_similarity_matrix_matches_pairwise_loop():
+  import random
+  from similarity import similar_pair_count, unique_by_similarity
+  from utils import calculate_similarity
+
+  rng = random.Random(1)
+  words = "approve request review transfer account payment verify submit user manager export".split()
+  items = [" ".join(rng.sample(words, rng.randint(1, 3))).title() for _ in range(120)] + [""]
+  expected = sum(
+    calculate_similarity(items[i], items[j]) > 0.7
+    for i in range(len(items)) for j in range(i + 1, len(items))
+  )
+  assert similar_pair_count(items, 0.7) == (expected, len(items) * (len(items) - 1) // 2)
+  assert unique_by_similarity(items, 0.75, method="matrix") == unique_by_similarity(items, 0.75)
+
+
+def test_lexicon_automaton_matches_substring_scan():
+  import random
+  from lexicon import TermAutomaton, load_lexicons
+
+  lexicons = load_lexicons()
+  assert {"fintech", "default"} <= set(lexicons.domains)
+  terms = ["he", "she", "his", "hers", "2fa", "upi", "payment", "pay"]
+  automaton = TermAutomaton(terms)
+  rng = random.Random(2)
+  for _ in range(200):
+    text = "".join(rng.choice("hesirupay2fa ment") for _ in range(rng.randint(0, 30)))
+    assert automaton.find(text) == {t for t in terms if t in text.lower()}
+
+
+def test_stream_mode_emits_partials_then_result():
+  from text_windows import split_text
+
+  paragraph = "As a user I want to submit a request so that the manager can approve it. The system must verify the payment."
+  text = "\n\n".join([paragraph] * 40)
+  windows = split_text(text, 1000)
+  assert len(windows) > 1 and all(len(w) <= 1000 for w in windows)
+  assert " ".join(" ".join(windows).split()) == " ".join(text.split())
+
+  proc = subprocess.run(
+    [sys.executable, 'python/nlp_processor.py', '--stream', '--window-chars', '1000', '--seed', '3'],
+    input=text.encode('utf-8'),
+    capture_output=True
+  )
+  assert proc.returncode == 0, proc.stderr.decode()
+  records = [json.loads(line) for line in proc.stdout.decode().splitlines()]
+  assert [r['type'] for r in records] == ['partial'] * len(windows) + ['result']
+  assert records[-1]['windows'] == len(windows) and 'flow' in records[-1] and 'stories' in records[-1]
+
+
+def test_sharded_extraction_merges_without_near_duplicates():
+  import random
+  import nlp_processor
+  from benchmarks.corpus import generate_corpus
+  from text_windows import split_text
+  from utils import CandidateAccumulator, calculate_similarity, collect_candidates
+
+  text = generate_corpus(48, fintech=True, seed=5)
+  nlp = nlp_processor.load_models()
+  whole, merged = CandidateAccumulator(), CandidateAccumulator()
+  whole.add(collect_candidates(nlp(text)))
+  shard_raws = [collect_candidates(nlp(shard)) for shard in split_text(text, 1500)]
+  for raw in shard_raws:
+    merged.add(raw)
+
+  names = ("roles", "actions", "benefits")
+  whole_kept = dict(zip(names, whole.finalize(rng=random.Random(0))))
+  merged_kept = dict(zip(names, merged.finalize(rng=random.Random(0))))
+  for name, threshold in CandidateAccumulator.THRESHOLDS.items():
+    kept = merged_kept[name]
+    assert kept and len(set(kept)) == len(kept)
+    assert not any(calculate_similarity(a, b) > threshold for i, a in enumerate(kept) for b in kept[i + 1:])
+    # Whatever the shards also found is kept, or represented by a near-duplicate
+    found = {item.strip().title() for raw in shard_raws for item in getattr(raw, name)}
+    for item in whole_kept[name]:
+      if item in found:
+        assert item in kept or any(calculate_similarity(item, k) > threshold for k in kept), (name, item)
+
+  sharded = nlp_processor.process_sharded(text, "fintech", workers=2, shard_chars=1500, seed=0)
+  assert sharded["stories"] and sharded["flow"]["nodes"]
+
+
+def test_sharded_requests_honor_cache_timings_and_profile(tmp_path):
+  import nlp_processor
+  from benchmarks.corpus import generate_corpus
+  from profiling import RequestProfiler
+  from result_cache import ResultCache
+
+  text = generate_corpus(24, fintech=True, seed=5)
+  payload = {"input_text": text, "project_type": "fintech", "seed": 0, "timings": True, "profile": True}
+  options = dict(
+    cache=ResultCache(),
+    timings=True,
+    profiler=RequestProfiler(str(tmp_path), sample_every=0),
+    shards=2,
+    shard_chars=1500,
+  )
+  nlp = nlp_processor.load_models()
+  first = nlp_processor.handle_request(payload, nlp, **options)
+  again = nlp_processor.handle_request(payload, nlp, **options)
+
+  assert "parse" in first["timings"]["stages_ms"] and "total" in first["timings"]["stages_ms"]
+  assert not first["timings"]["flags"].get("cache_hit")
+  assert again["timings"]["flags"]["cache_hit"] and "parse" not in again["timings"]["stages_ms"]
+  assert (tmp_path / f"{first['profile']['request']}.pstats").exists()
+  sharded = nlp_processor.process_sharded(text, "fintech", workers=2, shard_chars=1500, seed=0)
+  for result in (first, again):
+    assert {k: v for k, v in result.items() if k not in ("timings", "profile", "is_unique")} == {k: v for k, v in sharded.items() if k != "is_unique"}
+
+
+def test_async_server_answers_concurrent_requests():
+  import os
+  import socket
+  import tempfile
+
+  path = os.path.join(tempfile.mkdtemp(), 'nlp.sock')
+  proc = subprocess.Popen(
+    [sys.executable, 'python/nlp_processor.py', '--serve-async', '--socket', path, '--workers', '2', '--max-queue', '8'],
+    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+  )
+  try:
+    assert json.loads(proc.stdout.readline())['type'] == 'ready'
+    client = socket.socket(socket.AF_UNIX)
+    client.connect(path)
+    stream = client.makefile('rw')
+    for i in range(4):
+      stream.write(json.dumps({"id": i, "input_text": "As a manager I want to approve requests so that work moves", "seed": i}) + "\n")
+    stream.write(json.dumps({"id": "bad", "input_text": ""}) + "\n")
+    stream.flush()
+    responses = {r['id']: r for r in (json.loads(stream.readline()) for _ in range(5))}
+    assert all(responses[i]['type'] == 'result' for i in range(4))
+    assert responses['bad']['type'] == 'error'
+
+    stream.write(json.dumps({"id": "h", "type": "health"}) + "\n")
+    stream.flush()
+    health = json.loads(stream.readline())
+    assert health['processed'] == 4 and health['queue']['max_inflight'] == 2
+    stream.write(json.dumps({"type": "shutdown"}) + "\n")
+    stream.flush()
+    assert json.loads(stream.readline())['status'] == 'stopping'
+    assert proc.wait(timeout=30) == 0
+  finally:
+    proc.kill()
+
+
+def test_prefork_pool_restarts_crashed_workers():
+  import os
+  import signal
+  import socket
+  import tempfile
+  import time
+
+  path = os.path.join(tempfile.mkdtemp(), 'nlp.sock')
+  proc = subprocess.Popen(
+    [sys.executable, 'python/nlp_processor.py', '--serve-async', '--socket', path, '--executor', 'prefork', '--workers', '2'],
+    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+  )
+  try:
+    assert json.loads(proc.stdout.readline())['type'] == 'ready'
+    client = socket.socket(socket.AF_UNIX)
+    client.connect(path)
+    stream = client.makefile('rw')
+
+    def send(*messages):
+      for message in messages:
+        stream.write(json.dumps(message) + "\n")
+      stream.flush()
+      return [json.loads(stream.readline()) for _ in messages]
+
+    results = send(*({"id": i, "input_text": "As a manager I want to approve requests so that work moves", "seed": i} for i in range(4)))
+    assert all(r['type'] == 'result' and r['stories'] for r in results)
+    pool = send({"id": "h", "type": "health"})[0]['prefork']
+    assert len(pool['workers']) == 2 and all(w['rss_bytes'] > 0 for w in pool['workers'])
+    assert pool['parent']['pid'] == proc.pid
+
+    # Requests right after a crash go to a live child (retried once on a fresh one)
+    os.kill(pool['workers'][0]['pid'], signal.SIGKILL)
+    assert all(r['type'] == 'result' for r in send(*({"id": i, "input_text": "User logs in", "seed": i} for i in range(4))))
+    time.sleep(1.5)
+    pool = send({"id": "h", "type": "health"})[0]['prefork']
+    assert pool['restarts']['crashed'] == 1 and len(pool['workers']) == 2
+
+    # A replacement forked while serving keeps no socket but its own (and stdio)
+    replacement = max(w['pid'] for w in pool['workers'])
+    fd_dir = f"/proc/{replacement}/fd"
+    sockets = [fd for fd in os.listdir(fd_dir) if int(fd) > 2 and os.readlink(f"{fd_dir}/{fd}").startswith("socket:")]
+    assert len(sockets) == 1
+    send({"type": "shutdown"})
+    assert proc.wait(timeout=30) == 0
+  finally:
+    proc.kill()
+
+
+def test_uniqueness_tracker_stores():
+  import os
+  import tempfile
+  from uniqueness import UniquenessTracker, response_fingerprint
+
+  response = {"stories": ["As a user, I want to log in"], "flow": {"mermaid": "flowchart LR"}}
+  assert response_fingerprint(response) == response_fingerprint({"flow": {"mermaid": "flowchart LR", "nodes": []}, "stories": ["As a user, I want to log in"]})
+
+  path = os.path.join(tempfile.mkdtemp(), 'seen.sqlite3')
+  for store in ("lru", "bloom", "sqlite"):
+    tracker = UniquenessTracker(store=store, max_entries=3, path=path)
+    assert tracker.check(response) is True
+    assert tracker.check(response) is False
+    for i in range(10):
+      tracker.check({"stories": [str(i)]})
+    assert tracker.stats()["entries"] <= 6
+
+  # A second tracker on the same file (e.g. another worker) shares the history
+  shared = UniquenessTracker(store="sqlite", max_entries=3, path=path)
+  assert shared.check({"stories": ["9"]}) is False
+
+
+def test_timings_block_and_prometheus_metrics():
+  requests = [
+    {"id": "plain", "input_text": "As a user I want to login so that I can view balance"},
+    {"id": "timed", "input_text": "The manager approves the transfer request", "timings": True},
+    {"id": "m", "type": "metrics"},
+    {"type": "shutdown"},
+  ]
+  proc = subprocess.run(
+    [sys.executable, 'python/nlp_processor.py', '--serve', '--metrics'],
+    input="".join(json.dumps(r) + "\n" for r in requests).encode('utf-8'),
+    capture_output=True
+  )
+  assert proc.returncode == 0, proc.stderr.decode()
+  lines = {r.get('id'): r for r in (json.loads(line) for line in proc.stdout.decode().splitlines())}
+  assert 'timings' not in lines['plain']
+  timings = lines['timed']['timings']
+  assert {'parse', 'extract', 'flow', 'total'} <= set(timings['stages_ms'])
+  assert timings['counts']['actions'] >= 0
+  content = lines['m']['content']
+  assert 'smartreq_stage_seconds_count{stage="parse"} 2' in content
+  assert 'smartreq_candidates_count{kind="actions"} 2' in content
+  assert 'smartreq_flow_elements_count{kind="nodes"} 2' in content
+  assert 'kind="flow_nodes"' not in content
+  assert 'smartreq_worker_requests_total{outcome="processed"} 2' in content
+
+
+def test_profile_sampling_writes_reports(tmp_path):
+  import pstats
+  requests = [
+    {"id": "first", "input_text": "As a user I want to login so that I can view balance"},
+    {"id": "sampled", "input_text": "The manager approves the transfer request"},
+    {"id": "forced", "input_text": "The customer uploads KYC documents", "profile": True},
+  ]
+  proc = subprocess.run(
+    [sys.executable, 'python/nlp_processor.py', '--serve', '--profile', '--profile-sample', '2', '--profile-dir', str(tmp_path)],
+    input="".join(json.dumps(r) + "\n" for r in requests).encode('utf-8'),
+    capture_output=True
+  )
+  assert proc.returncode == 0, proc.stderr.decode()
+  lines = {r.get('id'): r for r in (json.loads(line) for line in proc.stdout.decode().splitlines())}
+  assert 'profile' not in lines['first']
+  for request_id in ('sampled', 'forced'):
+    report = lines[request_id]['profile']
+    assert report['peak_memory_bytes'] > 0
+    assert pstats.Stats(report['pstats']).total_calls > 0
+    assert 'allocation sites' in open(report['allocations']).read()
+  assert len(list(tmp_path.glob('*.pstats'))) == 2
+
+
+def test_inputs_request_reparses_only_changed_inputs(tmp_path):
+  store = str(tmp_path / "inputs.sqlite3")
+  inputs = [
+    {"id": 1, "content": "As a customer I want to transfer money so that I can pay bills"},
+    {"id": 2, "content": "The manager approves the loan request and notifies the customer"},
+  ]
+
+  def generate(items):
+    proc = subprocess.run(
+      [sys.executable, 'python/nlp_processor.py', '--stdin', '--input-store', store],
+      input=json.dumps({"inputs": items, "project_type": "fintech", "seed": 7}).encode('utf-8'),
+      capture_output=True
+    )
+    assert proc.returncode == 0, proc.stderr.decode()
+    return json.loads(proc.stdout.decode())
+
+  cold = generate(inputs)
+  assert cold['inputs'] == {"total": 2, "parsed": 2, "reused": 0}
+  warm = generate(inputs)
+  assert warm['inputs'] == {"total": 2, "parsed": 0, "reused": 2}
+  assert warm['stories'] == cold['stories'] and warm['flow'] == cold['flow']
+  edited = generate(inputs + [{"id": 3, "content": "Auditors export the KYC report"}])
+  assert edited['inputs'] == {"total": 3, "parsed": 1, "reused": 2}
+
+
+def test_doc_store_restores_parses_from_memory_and_disk(tmp_path, monkeypatch):
+  import nlp_processor
+  from doc_store import DocStore
+  from utils import collect_candidates
+
+  # Off for one-shot processes unless a directory or budget is configured
+  monkeypatch.delenv("SMARTREQ_DOC_CACHE_DIR", raising=False)
+  monkeypatch.delenv("SMARTREQ_DOC_CACHE_MEMORY", raising=False)
+  assert not DocStore.from_env().enabled
+  monkeypatch.setenv("SMARTREQ_DOC_CACHE_MEMORY", "1024")
+  assert DocStore.from_env().max_memory_bytes == 1024
+
+  nlp = nlp_processor.load_models()
+  text = "As a customer I want to transfer money so that I can pay bills. The manager approves the loan."
+  path = str(tmp_path / "docs.sqlite3")
+  store = DocStore(path=path)
+  parsed = store.parse(nlp, text)
+  restored = store.parse(nlp, text)
+  assert store.stats()['memory_hits'] == 1
+  from_disk = DocStore(path=path, max_memory_bytes=0).parse(nlp, text)
+  for doc in (restored, from_disk):
+    assert [t.text for t in doc] == [t.text for t in parsed]
+    assert [s.text for s in doc.sents] == [s.text for s in parsed.sents]
+    assert collect_candidates(doc) == collect_candidates(parsed)
+
+
+def test_output_formats_round_trip():
+  import io
+  from serialization import FORMATS, available, get_serializer, read_frames
+
+  result = run_script({"input_text": "As a user I want to login so that I can view balance", "seed": 3})
+  for name in FORMATS:
+    if not available(name):
+      continue
+    serializer = get_serializer(name)
+    data = serializer.dumps(result)
+    assert serializer.loads(data) == result
+    if name == "msgpack":
+      assert list(read_frames(io.BytesIO(data * 2))) == [result, result]
+    else:
+      assert data.endswith(b"\n") and data.count(b"\n") == 1
+
+  proc = subprocess.run(
+    [sys.executable, 'python/nlp_processor.py', '--stdin', '--format', 'orjson'],
+    input=json.dumps({"input_text": "As a user I want to login so that I can view balance", "seed": 3}).encode('utf-8'),
+    capture_output=True
+  )
+  assert proc.returncode == 0, proc.stderr.decode()
+  assert json.loads(proc.stdout)['stories'] == result['stories']
+
+
+def test_rule_layer_matches_roles_modals_and_action_nouns():
+  import nlp_processor
+  import rules
+  from nlp_script import RequirementExtractor
+
+  nlp = nlp_processor.load_models()
+  doc = nlp("The end-user must be able to submit a loan request. The table together holds non-functional notes.")
+  matches = rules.match(doc)
+  assert rules.match(doc) is matches  # computed once per Doc
+  assert {span.text for span in matches.role_mentions} == {"end-user", "non-functional"}
+  sentences = list(doc.sents)
+  assert matches.has_modal(sentences[0].start, sentences[0].end)
+  assert not matches.has_modal(sentences[1].start, sentences[1].end)
+  assert "request" in {span.text for span in matches.action_nouns}
+  assert set(RequirementExtractor(nlp).identify_roles(doc.text)) >= {"end-user", "non-functional"}
+
+
+def test_rule_set_stops_growing_on_new_word_forms(monkeypatch):
+  import nlp_processor
+  import rules
+
+  nlp = nlp_processor.load_models()
+  rule_set = rules.RuleSet(nlp.vocab)
+  compiled = rule_set._compiled
+
+  def no_more_phrases(self, label, phrases):
+    raise AssertionError(f"matcher grew after compilation: {label} {phrases}")
+
+  monkeypatch.setattr(rules.RuleSet, "_add", no_more_phrases)
+  for _ in range(3):
+    # Forms the Vocab did not hold when the RuleSet was compiled
+    doc = nlp("The zorbmanager needs blargapprovals and is qwableable to flimrequest them.")
+    matches = rule_set(doc)
+    assert {span.text for span in matches.modals} == {"needs", "qwableable to"}
+    assert {span.text for span in matches.action_nouns} == {"blargapprovals", "flimrequest"}
+  assert rule_set._compiled is compiled
+  assert rules.word_rules.cache_info().currsize <= rules.WORD_RULES_CACHE_SIZE
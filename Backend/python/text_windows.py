@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+"""
+Bounded text windows for SmartReq AI
+------------------------------------
+Multi-megabyte requirement documents (e.g. PDF specs extracted by
+textExtractor.js) are processed in windows of at most max_chars characters
+instead of one Doc. Cuts are made at the last paragraph break (blank line)
+in the second half of the window, else at the last sentence end, else at
+whitespace; a window is only cut mid-word if it contains no whitespace at
+all.
+
+iter_windows consumes any iterable of text chunks (e.g. fixed-size reads
+from read_chunks), so only the current window is ever held in memory.
+"""
+
+import re
+from typing import IO, Iterable, Iterator, List
+
+
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n")
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _last_match_end(pattern: re.Pattern, text: str, minimum: int) -> int:
+    end = 0
+    for match in pattern.finditer(text, minimum):
+        end = match.end()
+    return end
+
+
+def cut_point(text: str, max_chars: int) -> int:
+    """Length of the first window of text (text must be longer than max_chars)."""
+    head = text[: max_chars]
+    half = max_chars // 2
+    for pattern in (_PARAGRAPH_BREAK, _SENTENCE_END):
+        end = _last_match_end(pattern, head, half)
+        if end:
+            return end
+    return _last_match_end(_WHITESPACE, head, 1) or max_chars
+
+
+def iter_windows(chunks: Iterable[str], max_chars: int) -> Iterator[str]:
+    """Yield stripped, non-empty windows of at most max_chars characters."""
+    if max_chars < 1:
+        raise ValueError("max_chars must be >= 1")
+    parts: List[str] = []
+    size = 0
+    for chunk in chunks:
+        parts.append(chunk)
+        size += len(chunk)
+        if size <= max_chars:
+            continue
+        # Join only once the buffer overflows, then carry the remainder over
+        pending = "".join(parts)
+        while len(pending) > max_chars:
+            cut = cut_point(pending, max_chars)
+            window = pending[:cut].strip()
+            if window:
+                yield window
+            pending = pending[cut:]
+        parts, size = [pending], len(pending)
+
+    window = "".join(parts).strip()
+    if window:
+        yield window
+
+
+def read_chunks(stream: IO[str], size: int = 64 * 1024) -> Iterator[str]:
+    """Read stream in fixed-size chunks (a PDF dump may be one huge line)."""
+    return iter(lambda: stream.read(size), "")
+
+
+def split_text(text: str, max_chars: int) -> List[str]:
+    """Split text into windows of at most max_chars characters."""
+    return list(iter_windows([text], max_chars))
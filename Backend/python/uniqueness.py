@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+"""
+Response uniqueness tracking for SmartReq AI
+-------------------------------------------
+utils.validate_response_uniqueness flags a generation whose stories and
+Mermaid diagram repeat an earlier one. Responses are fingerprinted with
+sha256 over a canonical JSON serialization and remembered by one of three
+stores:
+
+  - "lru"    exact, in memory: the most recent max_entries fingerprints,
+             optionally only those seen within window_seconds
+  - "bloom"  approximate, fixed memory for a large history: two rotating
+             Bloom filter generations of max_entries each (a rare false
+             positive reports a unique response as a duplicate)
+  - "sqlite" exact, shared by every process using the same file, with the
+             same size/window eviction as "lru"
+
+The process-wide tracker is configured from SMARTREQ_UNIQUENESS (store),
+SMARTREQ_UNIQUENESS_SIZE, SMARTREQ_UNIQUENESS_WINDOW (seconds) and
+SMARTREQ_UNIQUENESS_PATH, or with configure().
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+logger = logging.getLogger("smartreq.nlp.uniqueness")
+
+STORES = ("lru", "bloom", "sqlite")
+
+
+def response_fingerprint(response_data: Dict[str, Any]) -> str:
+    """sha256 of the canonical JSON of a response's stories and Mermaid diagram."""
+    material = {
+        "stories": response_data.get("stories", []),
+        "mermaid": (response_data.get("flow") or {}).get("mermaid", ""),
+    }
+    encoded = json.dumps(material, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class LruStore:
+    """Most recent fingerprints in memory, optionally within a time window."""
+
+    def __init__(self, max_entries: int = 1000, window_seconds: float | None = None):
+        self.max_entries = max_entries
+        self.window_seconds = window_seconds
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+
+    def add(self, fingerprint: str, now: float) -> bool:
+        if self.window_seconds is not None:
+            # Entries are kept in last-seen order, so expired ones are at the front
+            cutoff = now - self.window_seconds
+            while self._seen and next(iter(self._seen.values())) < cutoff:
+                self._seen.popitem(last=False)
+        new = fingerprint not in self._seen
+        self._seen[fingerprint] = now
+        self._seen.move_to_end(fingerprint)
+        while len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+        return new
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def clear(self) -> None:
+        self._seen.clear()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over hex sha256 fingerprints."""
+
+    def __init__(self, capacity: int, false_positive_rate: float = 0.001):
+        self.num_bits = max(8, int(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, fingerprint: str):
+        # Double hashing from two independent halves of the digest
+        h1 = int(fingerprint[:16], 16)
+        h2 = int(fingerprint[16:32], 16) | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, fingerprint: str) -> bool:
+        return all(self._bits[p >> 3] & (1 << (p & 7)) for p in self._positions(fingerprint))
+
+    def add(self, fingerprint: str) -> None:
+        for p in self._positions(fingerprint):
+            self._bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self._bits)
+
+
+class BloomStore:
+    """Two rotating Bloom filter generations in fixed memory.
+
+    The current generation is retired once it holds max_entries fingerprints
+    (or is older than window_seconds), so between one and two generations of
+    history are remembered.
+    """
+
+    def __init__(self, max_entries: int = 100_000, window_seconds: float | None = None, false_positive_rate: float = 0.001):
+        self.max_entries = max_entries
+        self.window_seconds = window_seconds
+        self.false_positive_rate = false_positive_rate
+        self._current = BloomFilter(max_entries, false_positive_rate)
+        self._previous: Optional[BloomFilter] = None
+        self._started_at = time.time()
+
+    def _rotate(self, now: float) -> None:
+        self._previous = self._current
+        self._current = BloomFilter(self.max_entries, self.false_positive_rate)
+        self._started_at = now
+
+    def add(self, fingerprint: str, now: float) -> bool:
+        if self.window_seconds is not None and now - self._started_at > self.window_seconds:
+            # Both generations are older than the window once this one is
+            if now - self._started_at > 2 * self.window_seconds:
+                self._current = BloomFilter(self.max_entries, self.false_positive_rate)
+            self._rotate(now)
+        if fingerprint in self._current or (self._previous is not None and fingerprint in self._previous):
+            return False
+        if self._current.count >= self.max_entries:
+            self._rotate(now)
+        self._current.add(fingerprint)
+        return True
+
+    def __len__(self) -> int:
+        return self._current.count + (self._previous.count if self._previous is not None else 0)
+
+    def clear(self) -> None:
+        self._current = BloomFilter(self.max_entries, self.false_positive_rate)
+        self._previous = None
+        self._started_at = time.time()
+
+
+class SqliteStore:
+    """Fingerprints in a SQLite file shared by several worker processes."""
+
+    def __init__(self, path: str, max_entries: int = 100_000, window_seconds: float | None = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.window_seconds = window_seconds
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS fingerprints (fingerprint TEXT PRIMARY KEY, seen_at REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS fingerprints_seen_at ON fingerprints(seen_at)")
+
+    def add(self, fingerprint: str, now: float) -> bool:
+        # One write transaction, so concurrent processes agree on who saw it first
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            if self.window_seconds is not None:
+                self._db.execute("DELETE FROM fingerprints WHERE seen_at < ?", (now - self.window_seconds,))
+            new = self._db.execute(
+                "INSERT OR IGNORE INTO fingerprints (fingerprint, seen_at) VALUES (?, ?)", (fingerprint, now)
+            ).rowcount == 1
+            if new:
+                self._db.execute(
+                    "DELETE FROM fingerprints WHERE fingerprint IN ("
+                    " SELECT fingerprint FROM fingerprints ORDER BY seen_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+            else:
+                self._db.execute("UPDATE fingerprints SET seen_at = ? WHERE fingerprint = ?", (now, fingerprint))
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+        return new
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+
+    def clear(self) -> None:
+        self._db.execute("DELETE FROM fingerprints")
+
+    def close(self) -> None:
+        self._db.close()
+
+
+class UniquenessTracker:
+    """Thread-safe front end over one fingerprint store."""
+
+    def __init__(self, store: str = "lru", max_entries: int = 1000, window_seconds: float | None = None, path: str | None = None):
+        if store not in STORES:
+            raise ValueError(f"Unknown uniqueness store '{store}'. Choose from: {', '.join(STORES)}")
+        if max_entries < 1:
+            raise ValueError("max_entries must be >= 1")
+        if store == "sqlite":
+            if not path:
+                raise ValueError("the sqlite uniqueness store needs a path")
+            self._store = SqliteStore(path, max_entries, window_seconds)
+        elif store == "bloom":
+            self._store = BloomStore(max_entries, window_seconds)
+        else:
+            self._store = LruStore(max_entries, window_seconds)
+        self.store = store
+        self._lock = threading.Lock()
+        self._counters = {"checked": 0, "duplicates": 0}
+
+    @classmethod
+    def from_env(cls) -> "UniquenessTracker":
+        window = os.environ.get("SMARTREQ_UNIQUENESS_WINDOW")
+        return cls(
+            store=os.environ.get("SMARTREQ_UNIQUENESS", "lru"),
+            max_entries=int(os.environ.get("SMARTREQ_UNIQUENESS_SIZE", "1000")),
+            window_seconds=float(window) if window else None,
+            path=os.environ.get("SMARTREQ_UNIQUENESS_PATH"),
+        )
+
+    def check(self, response_data: Dict[str, Any]) -> bool:
+        """Record the response; True unless it was seen before."""
+        return self.check_fingerprint(response_fingerprint(response_data))
+
+    def check_fingerprint(self, fingerprint: str) -> bool:
+        with self._lock:
+            unique = self._store.add(fingerprint, time.time())
+            self._counters["checked"] += 1
+            if not unique:
+                self._counters["duplicates"] += 1
+            return unique
+
+    def clear(self) -> None:
+        with self._lock:
+            self._store.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"store": self.store, "entries": len(self._store), **self._counters}
+
+
+_tracker: Optional[UniquenessTracker] = None
+_tracker_lock = threading.Lock()
+
+
+def get_tracker() -> UniquenessTracker:
+    """The process-wide tracker (created from the environment on first use)."""
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = UniquenessTracker.from_env()
+        return _tracker
+
+
+def configure(tracker: UniquenessTracker) -> None:
+    """Replace the process-wide tracker."""
+    global _tracker
+    with _tracker_lock:
+        _tracker = tracker
@@ -1,44 +1,28 @@
 from __future__ import annotations
 
-import hashlib
 import json
 import logging
 import random
 import re
 import time
 from dataclasses import dataclass
-from typing import Dict, List, Set, Tuple
-
-
-# Domain terms for quick matching/boosting with expanded synonyms
-FINTECH_TERMS = {
-    "login", "signup", "register", "otp", "mfa", "transaction",
-    "transfer", "balance", "statement", "account", "kye", "kyc",
-    "upi", "payment", "refund", "chargeback", "beneficiary",
-    "authenticate", "verify", "authorize", "validate", "2fa"
-}
-
-# Domain-specific action expansions for genuine responses
-DOMAIN_EXPANSIONS = {
-    "fintech": {
-        "login": ["Authenticate User", "Verify Credentials", "Start Session", "Validate Identity"],
-        "signup": ["Register Account", "Create Profile", "Initialize User", "Onboard Customer"],
-        "2fa": ["Verify OTP", "Handle Timeout", "Resend Code", "Validate Token"],
-        "kyc": ["Verify Documents", "Check Identity", "Validate KYC", "Process Verification"],
-        "transaction": ["Process Payment", "Validate Amount", "Check Balance", "Execute Transfer"],
-        "upi": ["UPI Verification", "Link Bank Account", "Validate VPA", "Process UPI Payment"],
-        "payment": ["Process Payment", "Verify Payment Method", "Authorize Transaction", "Confirm Payment"],
-    },
-    "default": {
-        "create": ["Initialize Creation", "Validate Input", "Process Creation", "Confirm Creation"],
-        "update": ["Fetch Current Data", "Validate Changes", "Apply Updates", "Confirm Update"],
-        "delete": ["Verify Permissions", "Confirm Deletion", "Execute Deletion", "Log Action"],
-        "review": ["Fetch Details", "Analyze Content", "Provide Feedback", "Approve/Reject"],
-    }
-}
+from typing import Dict, Iterable, List, Tuple
+
+from flow_graph import ALL_FORMATS, FlowGraph
+from instrumentation import current_timings
+from lexicon import load_lexicons
+from pipelines import requires
+from rules import match as match_rules
+from similarity import NearDuplicateIndex, similar_pair_count
+from uniqueness import UniquenessTracker, get_tracker
 
-# Response hash cache for uniqueness validation (in-memory for session)
-RESPONSE_CACHE: Set[str] = set()
+
+# Domain lexicons live in lexicons/*.json and are compiled once into a
+# term automaton (see lexicon.py). These views are kept for callers that
+# read the tables directly.
+_LEXICONS = load_lexicons()
+FINTECH_TERMS = set(_LEXICONS.domains["fintech"].priority_terms) if "fintech" in _LEXICONS.domains else set()
+DOMAIN_EXPANSIONS = {name: lexicon.expansions for name, lexicon in _LEXICONS.domains.items()}
 
 
 @dataclass
@@ -60,25 +44,37 @@ def calculate_similarity(s1: str, s2: str) -> float:
     return len(common) / max(len(set(s1)), len(set(s2)))
 
 
-def extract_candidates_spacy(doc) -> Tuple[List[str], List[str], List[str]]:
+@dataclass
+class RawCandidates:
+    """Candidates found in one Doc, before dedupe and ranking."""
+    roles: List[str]
+    actions: List[str]
+    benefits: List[str]
+    action_scores: Dict[str, float]
+
+
+@requires("tagger", "lemmatizer", "parser", "ner")
+def extract_candidates_spacy(doc, rng: random.Random | None = None) -> Tuple[List[str], List[str], List[str]]:
     """Extract candidate roles, actions, benefits using ADVANCED dependency parsing.
 
     Enhancements:
     - Compound phrase extraction (e.g., "has role assigned" as decision condition)
     - Uniqueness filtering with similarity checks
     - Relevance ranking
-    - Random shuffle on 20-30% of elements for variability
+    - Random shuffle on 20-30% of elements for variability (pass a seeded
+      rng for reproducible output)
     """
+    accumulator = CandidateAccumulator()
+    accumulator.add(collect_candidates(doc))
+    return accumulator.finalize(rng=rng)
+
+
+@requires("tagger", "lemmatizer", "parser", "ner")
+def collect_candidates(doc) -> RawCandidates:
+    """Raw roles, actions (with relevance scores) and benefits of one Doc."""
     roles, actions, benefits = [], [], []
     action_scores = {}  # Track action relevance
-
-    # Enhanced role extraction with more keywords
-    role_keywords = {
-        "user", "admin", "manager", "developer", "customer", "client", 
-        "employee", "team", "system", "reviewer", "approver", "validator",
-        "executor", "stakeholder", "member", "owner", "lead", "analyst",
-        "designer", "tester", "qa", "operator", "supervisor", "coordinator"
-    }
+    matches = match_rules(doc)  # role keywords and action nouns (rules.py)
     
     # Named entities as potential roles
     for ent in doc.ents:
@@ -86,8 +82,9 @@ def extract_candidates_spacy(doc) -> Tuple[List[str], List[str], List[str]]:
             roles.append(ent.text)
     
     # Extract role-indicating nouns
-    for token in doc:
-        if token.pos_ in {"NOUN", "PROPN"} and token.text.lower() in role_keywords:
+    for span in matches.roles:
+        token = span[0]
+        if token.pos_ in {"NOUN", "PROPN"}:
             roles.append(token.text.capitalize())
 
     # ADVANCED action extraction with compound phrases and dependencies
@@ -126,14 +123,10 @@ def extract_candidates_spacy(doc) -> Tuple[List[str], List[str], List[str]]:
             action_scores[action_phrase] = relevance_score
     
     # Extract noun phrases as potential actions (e.g., "request approval")
+    action_noun_tokens = matches.action_noun_tokens
     for chunk in doc.noun_chunks:
-        chunk_text = chunk.text.lower()
         # Action-indicating noun phrases
-        if any(word in chunk_text for word in [
-            "request", "approval", "review", "validation", "execution",
-            "verification", "authorization", "confirmation", "notification",
-            "submission", "processing", "assignment", "allocation"
-        ]):
+        if any(i in action_noun_tokens for i in range(chunk.start, chunk.end)):
             actions.append(chunk.text)
             action_scores[chunk.text] = 0.8
 
@@ -156,47 +149,73 @@ def extract_candidates_spacy(doc) -> Tuple[List[str], List[str], List[str]]:
                 if len(benefits) >= 3:
                     break
 
-    # Deduplicate with similarity filtering (remove near-duplicates)
-    def deduplicate_with_similarity(items: List[str], threshold: float = 0.7) -> List[str]:
-        unique = []
-        for item in items:
-            item_clean = item.strip().title()
-            if not item_clean or len(item_clean) < 3:
-                continue
-            # Check similarity with existing unique items
-            is_duplicate = False
-            for existing in unique:
-                if calculate_similarity(item_clean, existing) > threshold:
-                    is_duplicate = True
-                    break
-            if not is_duplicate:
-                unique.append(item_clean)
-        return unique
-    
-    roles = deduplicate_with_similarity(roles, threshold=0.8)
-    actions = deduplicate_with_similarity(actions, threshold=0.7)
-    benefits = deduplicate_with_similarity(benefits, threshold=0.75)
-    
-    # Rank actions by relevance score
-    actions = sorted(actions, key=lambda a: action_scores.get(a, 0.5), reverse=True)
-    
-    # Random shuffle 20-30% for variability (ensures unique responses per run)
-    shuffle_count = int(len(actions) * random.uniform(0.2, 0.3))
-    if shuffle_count > 0 and len(actions) > shuffle_count:
-        indices_to_shuffle = random.sample(range(len(actions)), shuffle_count)
-        shuffled_items = [actions[i] for i in indices_to_shuffle]
-        random.shuffle(shuffled_items)
-        for i, idx in enumerate(indices_to_shuffle):
-            actions[idx] = shuffled_items[i]
-    
-    # Ensure we have at least some roles
-    if not roles:
-        roles = ["User", "System", "Manager"]
-    
-    return roles, actions, benefits
+    return RawCandidates(roles, actions, benefits, action_scores)
+
+
+class CandidateAccumulator:
+    """Merges the raw candidates of one or more Docs, in order.
 
+    Dedupe is incremental (one NearDuplicateIndex per category), so adding
+    the windows or shards of a document one by one gives the same result as
+    deduplicating their concatenation, and only accepted candidates are kept.
+    """
 
-def apply_domain_boost(project_type: str | None, actions: List[str]) -> List[str]:
+    # Similarity above which a candidate counts as a near-duplicate
+    THRESHOLDS = {"roles": 0.8, "actions": 0.7, "benefits": 0.75}
+
+    def __init__(self):
+        self._indexes = {name: NearDuplicateIndex(threshold) for name, threshold in self.THRESHOLDS.items()}
+        self.action_scores: Dict[str, float] = {}
+
+    def add(self, raw: RawCandidates) -> Dict[str, List[str]]:
+        """Deduplicate raw against everything seen so far; return what was new."""
+        with current_timings().stage("extract.dedupe"):
+            return self._add(raw)
+
+    def _add(self, raw: RawCandidates) -> Dict[str, List[str]]:
+        accepted = {}
+        for name, index in self._indexes.items():
+            accepted[name] = []
+            for item in getattr(raw, name):
+                item_clean = item.strip().title()
+                if not item_clean or len(item_clean) < 3:
+                    continue
+                if index.add(item_clean):
+                    accepted[name].append(item_clean)
+        # Ranking looks scores up by the cleaned item, so only phrases already
+        # in that form can ever match; the rest need not be kept
+        for phrase, score in raw.action_scores.items():
+            if phrase == phrase.strip().title():
+                self.action_scores[phrase] = score
+        return accepted
+
+    def finalize(self, rng: random.Random | None = None) -> Tuple[List[str], List[str], List[str]]:
+        """Ranked, lightly shuffled roles, actions and benefits."""
+        rng = rng or random
+        roles = list(self._indexes["roles"].items)
+        benefits = list(self._indexes["benefits"].items)
+
+        # Rank actions by relevance score
+        action_scores = self.action_scores
+        actions = sorted(self._indexes["actions"].items, key=lambda a: action_scores.get(a, 0.5), reverse=True)
+
+        # Random shuffle 20-30% for variability (ensures unique responses per run)
+        shuffle_count = int(len(actions) * rng.uniform(0.2, 0.3))
+        if shuffle_count > 0 and len(actions) > shuffle_count:
+            indices_to_shuffle = rng.sample(range(len(actions)), shuffle_count)
+            shuffled_items = [actions[i] for i in indices_to_shuffle]
+            rng.shuffle(shuffled_items)
+            for i, idx in enumerate(indices_to_shuffle):
+                actions[idx] = shuffled_items[i]
+
+        # Ensure we have at least some roles
+        if not roles:
+            roles = ["User", "System", "Manager"]
+
+        return roles, actions, benefits
+
+
+def apply_domain_boost(project_type: str | None, actions: List[str], rng: random.Random | None = None) -> List[str]:
     """Enhanced domain boosting with dynamic expansion and synonym generation.
     
     Enhancements:
@@ -205,58 +224,51 @@ def apply_domain_boost(project_type: str | None, actions: List[str]) -> List[str
     - Randomized boost order for uniqueness
     - Domain-specific variants (e.g., UPI Verification for fintech)
     """
+    rng = rng or random
     if not project_type:
         return actions
     
-    domain = project_type.lower()
+    lexicons = load_lexicons()
+    lexicon = lexicons.get(project_type.lower())
     expanded_actions = list(actions)  # Start with original actions
-    
-    if domain == "fintech":
-        # Scan for fintech-specific terms and expand dynamically
-        expansions_added = []
-        
-        for action in actions:
-            action_lower = action.lower()
-            
-            # Check for domain terms and add related actions
-            for term, variants in DOMAIN_EXPANSIONS.get("fintech", {}).items():
-                if term in action_lower:
-                    # Add 2-3 random variants (not all, for uniqueness)
-                    num_variants = random.randint(2, min(3, len(variants)))
-                    selected_variants = random.sample(variants, num_variants)
-                    expansions_added.extend(selected_variants)
-        
-        # Add expanded actions without duplicates
-        for expansion in expansions_added:
-            if expansion not in expanded_actions:
-                expanded_actions.append(expansion)
-        
-        # Sort with fintech terms prioritized, but randomize within groups
-        fintech_actions = [a for a in expanded_actions if any(term in a.lower() for term in FINTECH_TERMS)]
-        other_actions = [a for a in expanded_actions if a not in fintech_actions]
-        
-        # Shuffle within each group for variability
-        random.shuffle(fintech_actions)
-        random.shuffle(other_actions)
-        
-        return fintech_actions + other_actions
-    
-    elif domain in DOMAIN_EXPANSIONS:
-        # Generic domain expansion
-        for action in actions:
-            action_lower = action.lower()
-            for term, variants in DOMAIN_EXPANSIONS[domain].items():
-                if term in action_lower:
-                    num_variants = random.randint(1, 2)
-                    selected_variants = random.sample(variants, min(num_variants, len(variants)))
-                    for variant in selected_variants:
-                        if variant not in expanded_actions:
-                            expanded_actions.append(variant)
-    
-    return expanded_actions
-
-
-def build_gherkin_stories(roles: List[str], actions: List[str], benefits: List[str], max_stories: int = 5) -> List[str]:
+    if lexicon is None:
+        return expanded_actions
+    
+    # One automaton pass per action finds every lexicon term it contains
+    seen = set(expanded_actions)
+    min_variants, max_variants = lexicon.variants_per_term
+    for action in actions:
+        for term in lexicon.expansion_terms(lexicons.find(action)):
+            variants = lexicon.expansions[term]
+            # Add a few random variants (not all, for uniqueness)
+            num_variants = rng.randint(min_variants, max_variants)
+            for variant in rng.sample(variants, min(num_variants, len(variants))):
+                if variant not in seen:
+                    seen.add(variant)
+                    expanded_actions.append(variant)
+    
+    if not lexicon.priority_terms:
+        return expanded_actions
+    
+    # Sort with priority terms (e.g. fintech) first, but randomize within groups
+    priority = [lexicon.is_priority(lexicons.find(a)) for a in expanded_actions]
+    priority_actions = [a for a, first in zip(expanded_actions, priority) if first]
+    other_actions = [a for a, first in zip(expanded_actions, priority) if not first]
+    
+    # Shuffle within each group for variability
+    rng.shuffle(priority_actions)
+    rng.shuffle(other_actions)
+    
+    return priority_actions + other_actions
+
+
+def build_gherkin_stories(
+    roles: List[str],
+    actions: List[str],
+    benefits: List[str],
+    max_stories: int = 5,
+    rng: random.Random | None = None,
+) -> List[str]:
     """Generate diverse user stories with role/benefit rotation and randomization.
     
     Enhancements:
@@ -266,6 +278,7 @@ def build_gherkin_stories(roles: List[str], actions: List[str], benefits: List[s
     - Check for similar phrases and rephrase
     - Tie stories directly to extracted elements (no defaults unless no data)
     """
+    rng = rng or random
     stories: List[str] = []
     
     # Prepare role and benefit pools (top 3 of each for rotation)
@@ -295,11 +308,11 @@ def build_gherkin_stories(roles: List[str], actions: List[str], benefits: List[s
             continue
         
         # Randomly select role and benefit from pools
-        role = random.choice(role_pool)
-        benefit = random.choice(benefit_pool)
+        role = rng.choice(role_pool)
+        benefit = rng.choice(benefit_pool)
         
         # Rephrase 50% of actions for variety
-        if random.random() < 0.5:
+        if rng.random() < 0.5:
             for key, rephrase in action_rephrases.items():
                 if key in action_clean:
                     action_clean = action_clean.replace(key, rephrase)
@@ -327,8 +340,8 @@ def build_gherkin_stories(roles: List[str], actions: List[str], benefits: List[s
         # Generate additional stories with different phrasings
         for i in range(min(3 - len(stories), len(actions))):
             if i < len(actions):
-                role = random.choice(role_pool)
-                benefit = random.choice(benefit_pool)
+                role = rng.choice(role_pool)
+                benefit = rng.choice(benefit_pool)
                 action = actions[i].strip().lower()
                 action = action[0].lower() + action[1:] if len(action) > 1 else action.lower()
                 story = f"As a {role}, I want to {action} so that {benefit}."
@@ -342,7 +355,14 @@ def build_gherkin_stories(roles: List[str], actions: List[str], benefits: List[s
     return stories[:max_stories]
 
 
-def build_swimlane_flow(actions: List[str], min_steps: int = 20, actors: List[str] = None) -> Dict:
+def build_swimlane_flow(
+    actions: List[str],
+    min_steps: int = 20,
+    actors: List[str] = None,
+    rng: random.Random | None = None,
+    timestamp: int | None = None,
+    formats: Iterable[str] = ALL_FORMATS,
+) -> Dict:
     """Create ADVANCED swimlane-based flow with hierarchical structures, decisions, and loops.
     
     MAJOR ENHANCEMENTS:
@@ -357,24 +377,27 @@ def build_swimlane_flow(actions: List[str], min_steps: int = 20, actors: List[st
         actions: List of action verbs/steps extracted from input
         min_steps: Minimum number of process steps (excluding start/end)
         actors: List of roles/departments for swimlanes
+        rng: Random source; pass a seeded random.Random for reproducible flows
+        timestamp: Millisecond timestamp embedded in Mermaid node IDs
+            (defaults to now; fix it together with rng for byte-identical output)
+        formats: Outputs to serialize ("react_flow" for nodes/edges, "mermaid")
     
     Returns:
         Dict with nodes, edges, actors, and mermaid diagram
     """
+    rng = rng or random
     # Default actors if not provided - expanded pool
     if not actors:
         actors = ["User", "Manager", "System", "Admin", "Client"]
     
     # Randomize actor order for uniqueness per run
     actors_shuffled = actors.copy()
-    random.shuffle(actors_shuffled)
+    rng.shuffle(actors_shuffled)
     actors = actors_shuffled
     
-    nodes: List[Dict] = []
-    edges: List[Dict] = []
-    
     # Swimlane layout: horizontal lanes with vertical spacing
     lane_height = 150
+    graph = FlowGraph(actors, lane_height=lane_height)
     x_start = 100
     x_spacing = 200
     
@@ -433,21 +456,7 @@ def build_swimlane_flow(actions: List[str], min_steps: int = 20, actors: List[st
             expanded_actions.append(f"Process Step {i + 1}")
 
     def add_node(node_id: str, label: str, actor: str, shape: str = "process", x_pos: int = 0):
-        # Calculate y position based on actor's lane
-        actor_idx = actors.index(actor) if actor in actors else 0
-        y_pos = actor_idx * lane_height + 50
-        
-        nodes.append({
-            "id": node_id,
-            "type": "custom",
-            "data": {
-                "label": label,
-                "type": shape,
-                "actor": actor,
-                "description": f"AI generated: {label}"
-            },
-            "position": {"x": x_pos, "y": y_pos}
-        })
+        graph.add_node(node_id, label, actor, shape, x_pos)
         return x_pos + x_spacing
 
     # Start node
@@ -469,7 +478,7 @@ def build_swimlane_flow(actions: List[str], min_steps: int = 20, actors: List[st
         nid = f"step-{i+1}"
         
         # 20% of steps are decision nodes (more realistic)
-        is_decision = random.random() < 0.2 or (i + 1) % 5 == 0
+        is_decision = rng.random() < 0.2 or (i + 1) % 5 == 0
         
         # Check if action suggests a decision (contains question words or validation terms)
         action_lower = act.lower()
@@ -479,19 +488,16 @@ def build_swimlane_flow(actions: List[str], min_steps: int = 20, actors: List[st
         shape = "decision" if is_decision else "process"
         
         # Randomize actor assignment (not just rotation) for cross-lane connections
-        if random.random() < 0.3:  # 30% chance to pick random actor
-            actor = random.choice(actors)
+        if rng.random() < 0.3:  # 30% chance to pick random actor
+            actor = rng.choice(actors)
         else:
             actor = actors[(i + 1) % len(actors)]
         
         current_x = add_node(nid, act, actor, shape, current_x)
         
         # Main edge with varied labels
-        edge_label = random.choice(edge_label_variants["default"])
-        edge_dict = {"id": f"e-{prev}-{nid}", "source": prev, "target": nid, "type": "smoothstep"}
-        if edge_label:
-            edge_dict["label"] = edge_label
-        edges.append(edge_dict)
+        edge_label = rng.choice(edge_label_variants["default"])
+        graph.add_edge(prev, nid, edge_label)
         
         # Decision nodes have MULTIPLE alternate paths
         if shape == "decision":
@@ -499,164 +505,39 @@ def build_swimlane_flow(actions: List[str], min_steps: int = 20, actors: List[st
             
             if i < len(expanded_actions) - 1:
                 # "Yes" path (continues to next)
-                yes_label = random.choice(edge_label_variants["yes"])
+                yes_label = rng.choice(edge_label_variants["yes"])
                 
                 # "No" path (branches or loops back)
-                no_label = random.choice(edge_label_variants["no"])
+                no_label = rng.choice(edge_label_variants["no"])
                 
                 # 70% chance: skip to later step, 30% chance: loop back for retry
-                if random.random() < 0.7:
+                if rng.random() < 0.7:
                     # Skip ahead
-                    skip_distance = random.randint(2, min(4, len(expanded_actions) - i))
+                    skip_distance = rng.randint(2, min(4, len(expanded_actions) - i))
                     next_next_id = f"step-{i+skip_distance}" if i + skip_distance <= len(expanded_actions) else "end"
                 else:
                     # Loop back to previous step for retry
                     if i > 2:
-                        loop_back_distance = random.randint(1, min(3, i))
+                        loop_back_distance = rng.randint(1, min(3, i))
                         next_next_id = f"step-{i - loop_back_distance + 1}"
                     else:
                         next_next_id = f"step-{i+2}" if i + 1 < len(expanded_actions) else "end"
                 
-                edges.append({
-                    "id": f"e-{nid}-{next_next_id}-alt",
-                    "source": nid,
-                    "target": next_next_id,
-                    "type": "smoothstep",
-                    "label": no_label
-                })
+                graph.add_edge(nid, next_next_id, no_label, alt=True)
         
         prev = nid
 
     # End node
     add_node("end", "End", actors[-1], "end", current_x)
-    edges.append({"id": f"e-{prev}-end", "source": prev, "target": "end", "type": "smoothstep"})
+    graph.add_edge(prev, "end")
 
     # ENHANCED Mermaid diagram generation with varied connectors and comments
-    timestamp_id = int(time.time() * 1000)  # Unique ID per run
-    mermaid_lines = [
-        "flowchart LR",
-        f"%% === Generated at {timestamp_id} ==="
-    ]
-    
-    # Group nodes by actor for swimlane subgraphs
-    actor_nodes = {}
-    for node in nodes:
-        actor = node["data"].get("actor", "System")
-        if actor not in actor_nodes:
-            actor_nodes[actor] = []
-        actor_nodes[actor].append(node)
-    
-    # Create node ID mapping with timestamp for uniqueness
-    node_id_map = {nodes[i]["id"]: f"N{i}_{timestamp_id % 1000}" for i in range(len(nodes))}
-    
-    # EXPANDED icon pool with dynamic selection
-    actor_icon_pool = {
-        "Initiator": ["👤", "🙋", "👨‍💼", "👩‍💼"],
-        "User": ["👤", "🧑", "👨", "👩"],
-        "Manager": ["👨‍💼", "👩‍💼", "🎯", "📊"],
-        "Admin": ["🛠️", "⚙️", "🔧", "👨‍💻"],
-        "System": ["🤖", "💻", "🖥️", "⚡"],
-        "Client": ["💼", "🤝", "👔", "📋"],
-    }
-    
-    # Select icons dynamically
-    actor_icons = {}
-    for actor in actors:
-        if actor in actor_icon_pool:
-            actor_icons[actor] = random.choice(actor_icon_pool[actor])
-        else:
-            actor_icons[actor] = random.choice(["📋", "🔷", "⭐", "🎯"])
-    
-    # Randomize subgraph order for uniqueness
-    actor_items = list(actor_nodes.items())
-    if random.random() < 0.5:  # 50% chance to shuffle
-        random.shuffle(actor_items)
-    
-    for actor, actor_node_list in actor_items:
-        icon = actor_icons.get(actor, "📋")
-        mermaid_lines.append(f'\n%% === Swimlane: {actor} ===')
-        mermaid_lines.append(f'subgraph {actor.replace(" ", "_")}["{icon} {actor}"]')
-        
-        # Add nodes within this swimlane
-        for node in actor_node_list:
-            node_idx = nodes.index(node)
-            node_id = node_id_map.get(node["id"], f"N{node_idx}")
-            label = node["data"]["label"]
-            shape_type = node["data"]["type"]
-            
-            if shape_type == "start" or shape_type == "end":
-                mermaid_lines.append(f"    {node_id}([{label}])")
-            elif shape_type == "decision":
-                mermaid_lines.append(f"    {node_id}{{{label}}}")
-            else:
-                mermaid_lines.append(f"    {node_id}[{label}]")
-        
-        # Add edges within this swimlane with VARIED connectors
-        connector_styles = [" --> ", " -.-> ", " ==> "]  # solid, dotted, thick
-        
-        for edge in edges:
-            from_node = next((n for n in nodes if n["id"] == edge["source"]), None)
-            to_node = next((n for n in nodes if n["id"] == edge["target"]), None)
-            
-            if from_node and to_node:
-                from_actor = from_node["data"].get("actor", "System")
-                to_actor = to_node["data"].get("actor", "System")
-                
-                # Only add edge if both nodes are in current swimlane
-                if from_actor == actor and to_actor == actor:
-                    from_id = node_id_map.get(edge["source"], edge["source"])
-                    to_id = node_id_map.get(edge["target"], edge["target"])
-                    label = edge.get("label", "")
-                    
-                    # Vary connector style (50% chance for alternative style)
-                    if label and random.random() < 0.5:
-                        connector = f' -- "{label}" --> '
-                    elif label:
-                        connector = f" -- {label} --> "
-                    else:
-                        connector = random.choice(connector_styles)
-                    
-                    mermaid_lines.append(f"    {from_id}{connector}{to_id}")
-        
-        mermaid_lines.append("end")
-    
-    # Add cross-swimlane connections with comments
-    mermaid_lines.append("\n%% === Cross-Lane Connections ===")
-    cross_lane_count = 0
-    for edge in edges:
-        from_node = next((n for n in nodes if n["id"] == edge["source"]), None)
-        to_node = next((n for n in nodes if n["id"] == edge["target"]), None)
-        
-        if from_node and to_node:
-            from_actor = from_node["data"].get("actor", "System")
-            to_actor = to_node["data"].get("actor", "System")
-            
-            # Only add edge if nodes are in different swimlanes
-            if from_actor != to_actor:
-                from_id = node_id_map.get(edge["source"], edge["source"])
-                to_id = node_id_map.get(edge["target"], edge["target"])
-                label = edge.get("label", "")
-                
-                # Use thick arrows for cross-lane connections
-                if label:
-                    connector = f' == "{label}" ==> '
-                else:
-                    connector = " ==> "
-                
-                mermaid_lines.append(f"{from_id}{connector}{to_id}")
-                cross_lane_count += 1
-    
-    if cross_lane_count > 0:
-        mermaid_lines.append(f"%% Total cross-lane connections: {cross_lane_count}")
-    
-    mermaid_diagram = "\n".join(mermaid_lines)
-
-    return {
-        "nodes": nodes,
-        "edges": edges,
-        "actors": actors,
-        "mermaid": mermaid_diagram
-    }
+    timestamp_id = timestamp if timestamp is not None else int(time.time() * 1000)  # Unique ID per run
+    timings = current_timings()
+    timings.count("flow_nodes", len(graph.nodes))
+    timings.count("flow_edges", len(graph.edges))
+    with timings.stage("flow.render"):
+        return graph.serialize(formats, timestamp=timestamp_id, rng=rng)
 
 
 def confidence_score(roles: List[str], actions: List[str], benefits: List[str]) -> float:
@@ -685,17 +566,10 @@ def confidence_score(roles: List[str], actions: List[str], benefits: List[str])
     elif benefits:
         score += 0.1
     
-    # Diversity check for actions (deduct if too similar)
+    # Diversity check for actions (deduct if too similar); all pairs are
+    # scored at once by the vectorized similarity engine
     if len(actions) > 1:
-        similarity_count = 0
-        total_comparisons = 0
-        
-        for i in range(len(actions)):
-            for j in range(i + 1, len(actions)):
-                similarity = calculate_similarity(actions[i], actions[j])
-                if similarity > 0.7:  # Too similar
-                    similarity_count += 1
-                total_comparisons += 1
+        similarity_count, total_comparisons = similar_pair_count(actions, 0.7)  # > 0.7 is too similar
         
         if total_comparisons > 0:
             similarity_ratio = similarity_count / total_comparisons
@@ -711,22 +585,10 @@ def confidence_score(roles: List[str], actions: List[str], benefits: List[str])
     return round(max(0.0, min(score, 1.0)), 2)
 
 
-def validate_response_uniqueness(response_data: Dict) -> bool:
+def validate_response_uniqueness(response_data: Dict, tracker: UniquenessTracker | None = None) -> bool:
     """Check if response is unique (not a duplicate of previous responses).
     
-    Uses hash-based caching to detect repetitive outputs.
+    Fingerprints the stories and Mermaid diagram and records them in the
+    uniqueness tracker (process-wide by default, see uniqueness.py).
     """
-    # Create hash of key response elements
-    key_elements = str(response_data.get("stories", [])) + str(response_data.get("flow", {}).get("mermaid", ""))
-    response_hash = hashlib.md5(key_elements.encode()).hexdigest()
-    
-    if response_hash in RESPONSE_CACHE:
-        return False  # Duplicate detected
-    
-    RESPONSE_CACHE.add(response_hash)
-    
-    # Keep cache size manageable (max 100 entries)
-    if len(RESPONSE_CACHE) > 100:
-        RESPONSE_CACHE.clear()
-    
-    return True
+    return (tracker or get_tracker()).check(response_data)
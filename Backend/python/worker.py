@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+"""
+Long-lived worker loop for the SmartReq AI NLP processor
+--------------------------------------------------------
+Keeps the spaCy model loaded and answers newline-delimited JSON requests
+either on stdin/stdout or on a local Unix socket, so the Node backend can
+pool warm workers instead of spawning one process per generation.
+
+Protocol (one JSON object per line):
+  -> {"id": "42", "input_text": "...", "project_type": "fintech"}
+  <- {"id": "42", "type": "result", "stories": [...], "flow": {...}, ...}
+  <- {"id": "42", "type": "error", "error": "..."}
+
+  -> {"id": "h1", "type": "health"}
+  <- {"id": "h1", "type": "health", "status": "ok", "processed": 10, ...}
+
+  -> {"id": "m1", "type": "metrics"}
+  <- {"id": "m1", "type": "metrics", "format": "prometheus", "content": "# HELP ..."}
+
+  -> {"type": "shutdown"}
+  <- {"type": "shutdown", "status": "stopping"}
+
+On startup a {"type": "ready", ...} line is written to stdout once the model
+is loaded. EOF on stdin, a shutdown message, SIGTERM or SIGINT stop the
+worker after the request in progress has been answered.
+"""
+
+import json
+import logging
+import os
+import signal
+import socket
+import time
+from typing import IO, Any, Callable, Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger("smartreq.nlp.worker")
+
+Handler = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+class WorkerShutdown(Exception):
+    """Raised from the signal handler to leave a blocking read."""
+
+
+class WorkerState:
+    """Counters and lifecycle flags shared by the serve loops."""
+
+    def __init__(self, model: str | None = None):
+        self.model = model
+        self.started_at = time.time()
+        self.processed = 0
+        self.failed = 0
+        self.busy = False
+        self.stopping = False
+        # Extra sections for health responses, e.g. {"cache": cache.stats}
+        self.health_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        # Extra Prometheus text for metrics responses, e.g. REGISTRY.render
+        self.metrics_providers: List[Callable[[], str]] = []
+
+    def ready_message(self) -> Dict[str, Any]:
+        return {"type": "ready", "pid": os.getpid(), "model": self.model}
+
+    def health_message(self, request_id: Any = None) -> Dict[str, Any]:
+        message = {
+            "id": request_id,
+            "type": "health",
+            "status": "stopping" if self.stopping else "ok",
+            "pid": os.getpid(),
+            "model": self.model,
+            "uptime": round(time.time() - self.started_at, 3),
+            "processed": self.processed,
+            "failed": self.failed,
+        }
+        for name, provider in self.health_providers.items():
+            message[name] = provider()
+        return message
+
+    def metrics_message(self, request_id: Any = None) -> Dict[str, Any]:
+        lines = [
+            "# HELP smartreq_worker_requests_total Requests answered by this worker.",
+            "# TYPE smartreq_worker_requests_total counter",
+            f'smartreq_worker_requests_total{{outcome="processed"}} {self.processed}',
+            f'smartreq_worker_requests_total{{outcome="failed"}} {self.failed}',
+            "# HELP smartreq_worker_uptime_seconds Seconds since the worker started.",
+            "# TYPE smartreq_worker_uptime_seconds gauge",
+            f"smartreq_worker_uptime_seconds {time.time() - self.started_at:.3f}",
+        ]
+        content = "\n".join(lines) + "\n" + "".join(provider() for provider in self.metrics_providers)
+        return {"id": request_id, "type": "metrics", "format": "prometheus", "content": content}
+
+
+def install_signal_handlers(state: WorkerState) -> None:
+    """Stop after the current request on SIGTERM/SIGINT, immediately if idle."""
+
+    def _handle(signum, _frame):
+        logger.info(f"Received signal {signum}, shutting down worker")
+        state.stopping = True
+        if not state.busy:
+            raise WorkerShutdown()
+
+    signal.signal(signal.SIGTERM, _handle)
+    signal.signal(signal.SIGINT, _handle)
+
+
+def parse_line(line: str, state: WorkerState) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """Decode one protocol line into (payload, None) or (None, error response).
+
+    Blank lines give (None, None).
+    """
+    line = line.strip()
+    if not line:
+        return None, None
+
+    try:
+        payload = json.loads(line)
+        if not isinstance(payload, dict):
+            raise ValueError("request must be a JSON object")
+    except Exception as e:
+        state.failed += 1
+        return None, {"id": None, "type": "error", "error": f"Invalid JSON request: {e}"}
+    return payload, None
+
+
+def control_response(payload: Dict[str, Any], state: WorkerState) -> Optional[Dict[str, Any]]:
+    """Answer health/shutdown/unknown messages; None for process requests."""
+    request_id = payload.get("id")
+    message_type = payload.get("type", "process")
+
+    if message_type == "health":
+        return state.health_message(request_id)
+
+    if message_type == "metrics":
+        return state.metrics_message(request_id)
+
+    if message_type == "shutdown":
+        state.stopping = True
+        return {"id": request_id, "type": "shutdown", "status": "stopping"}
+
+    if message_type != "process":
+        state.failed += 1
+        return {"id": request_id, "type": "error", "error": f"Unknown message type: {message_type}"}
+    return None
+
+
+def handle_line(line: str, handler: Handler, state: WorkerState) -> Optional[Dict[str, Any]]:
+    """Dispatch one protocol line and return the response (None for blank lines)."""
+    payload, error = parse_line(line, state)
+    if payload is None:
+        return error
+
+    response = control_response(payload, state)
+    if response is not None:
+        return response
+
+    request_id = payload.get("id")
+    state.busy = True
+    try:
+        result = handler(payload)
+        state.processed += 1
+        return {"id": request_id, "type": "result", **result}
+    except Exception as e:
+        logger.exception("Failed to process worker request")
+        state.failed += 1
+        return {"id": request_id, "type": "error", "error": str(e)}
+    finally:
+        state.busy = False
+
+
+def encode_message(message: Dict[str, Any]) -> str:
+    return json.dumps(message, ensure_ascii=False) + "\n"
+
+
+def _write_message(outfile: IO[str], message: Dict[str, Any]) -> None:
+    outfile.write(encode_message(message))
+    outfile.flush()
+
+
+def _serve_lines(handler: Handler, infile: IO[str], outfile: IO[str], state: WorkerState) -> None:
+    while not state.stopping:
+        line = infile.readline()
+        if not line:  # EOF
+            break
+        response = handle_line(line, handler, state)
+        if response is not None:
+            _write_message(outfile, response)
+
+
+def serve_stream(handler: Handler, infile: IO[str], outfile: IO[str], state: WorkerState) -> None:
+    """Serve NDJSON requests from infile until EOF, shutdown or a signal."""
+    _write_message(outfile, state.ready_message())
+    try:
+        _serve_lines(handler, infile, outfile, state)
+    except WorkerShutdown:
+        pass
+    logger.info(f"Worker stopped after {state.processed} requests")
+
+
+def serve_unix_socket(handler: Handler, path: str, outfile: IO[str], state: WorkerState) -> None:
+    """Serve NDJSON requests on a Unix socket, one connection at a time.
+
+    The ready message is written to outfile (stdout) once the socket is
+    listening, so the parent process knows when it can connect.
+    """
+    if os.path.exists(path):
+        os.unlink(path)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen()
+    server.settimeout(1.0)  # wake up periodically to honour shutdown requests
+
+    ready = state.ready_message()
+    ready["socket"] = path
+    _write_message(outfile, ready)
+
+    try:
+        while not state.stopping:
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+            with conn:
+                conn.settimeout(None)
+                reader = conn.makefile("r", encoding="utf-8")
+                writer = conn.makefile("w", encoding="utf-8")
+                try:
+                    _serve_lines(handler, reader, writer, state)
+                except (BrokenPipeError, ConnectionResetError):
+                    logger.warning("Client disconnected before the response was written")
+                finally:
+                    reader.close()
+                    writer.close()
+    except WorkerShutdown:
+        pass
+    finally:
+        server.close()
+        if os.path.exists(path):
+            os.unlink(path)
+        logger.info(f"Worker stopped after {state.processed} requests")
@@ -25,6 +25,8 @@ const config = {
   
   // Python NLP Script
   PYTHON_SCRIPT_PATH: process.env.PYTHON_SCRIPT_PATH || './python/nlp_script.py',
+  // Per-input extraction results reused across re-generations
+  NLP_INPUT_STORE_PATH: process.env.NLP_INPUT_STORE_PATH || './.cache/nlp-inputs.sqlite3',
   
   // LLM Providers
   LLM_PROVIDER: (process.env.LLM_PROVIDER || '').toLowerCase(),
@@ -324,7 +324,7 @@ const generateArtifacts = asyncHandler(async (req, res) => {
       
       // Try basic processing first
       try {
-        const result = await processProjectInputs(inputs)
+        const result = await processProjectInputs(inputs, projectType)
         console.log('Basic result:', JSON.stringify(result, null, 2))
         
         // Enforce minimum 20 nodes in flow
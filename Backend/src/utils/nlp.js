@@ -4,22 +4,23 @@ const config = require('../config/env');
 const { logger } = require('../middleware/errorHandler');
 
 /**
- * Process text using Python NLP script to extract requirements and generate artifacts
- * @param {string} text - Input text to process
- * @returns {Promise<Object>} - Generated artifacts (stories and flows)
+ * Run the Python NLP script with the given arguments and stdin data
+ * @param {Array<string>} args - Extra command line arguments
+ * @param {string} input - Data written to the script's stdin
+ * @returns {Promise<Object>} - Parsed JSON output of the script
  */
-const processTextWithNLP = (text) => {
+const runPythonNLP = (args, input) => {
   return new Promise((resolve, reject) => {
     const pythonScript = path.resolve(config.PYTHON_SCRIPT_PATH);
-    const pythonProcess = spawn('python3', [pythonScript], {
+    const pythonProcess = spawn('python3', [pythonScript, ...args], {
       stdio: ['pipe', 'pipe', 'pipe']
     });
 
     let output = '';
     let errorOutput = '';
 
-    // Send text to Python script
-    pythonProcess.stdin.write(text);
+    // Send input to Python script
+    pythonProcess.stdin.write(input);
     pythonProcess.stdin.end();
 
     // Collect output
@@ -59,6 +60,29 @@ const processTextWithNLP = (text) => {
   });
 };
 
+/**
+ * Process text using Python NLP script to extract requirements and generate artifacts
+ * @param {string} text - Input text to process
+ * @returns {Promise<Object>} - Generated artifacts (stories and flows)
+ */
+const processTextWithNLP = (text) => runPythonNLP([], text);
+
+/**
+ * Process a project's inputs incrementally: the Python side keeps each
+ * input's extracted candidates in NLP_INPUT_STORE_PATH and only re-parses
+ * inputs whose content changed since the last generation
+ * @param {Array} inputs - Array of {id, content}
+ * @param {string} [projectType] - Project type e.g. fintech
+ * @returns {Promise<Object>} - Generation result ({stories, flow, inputs, ...})
+ */
+const processInputsWithNLP = (inputs, projectType) => {
+  const payload = {
+    inputs: inputs.map(input => ({ id: String(input.id), content: input.content })),
+    project_type: projectType || null
+  };
+  return runPythonNLP(['--stdin', '--input-store', path.resolve(config.NLP_INPUT_STORE_PATH)], JSON.stringify(payload));
+};
+
 /**
  * Extract user stories from processed text
  * @param {string} text - Input text
@@ -98,24 +122,24 @@ const generateProcessFlows = async (text) => {
  * @param {Array} inputs - Array of input objects
  * @returns {Promise<Object>} - Generated artifacts
  */
-const processProjectInputs = async (inputs) => {
+const processProjectInputs = async (inputs, projectType) => {
   try {
-    // Combine all text content
-    const combinedText = inputs
-      .filter(input => input.content)
-      .map(input => input.content)
-      .join('\n\n');
+    // Inputs are sent separately (not joined) so unchanged ones are not re-parsed
+    const textInputs = inputs.filter(input => input.content && input.content.trim());
 
-    if (!combinedText.trim()) {
+    if (textInputs.length === 0) {
       logger.warn('No text content found in inputs for NLP processing. Returning empty artifacts.');
       return { stories: [], flows: [] };
     }
 
-    const result = await processTextWithNLP(combinedText);
+    const result = await processInputsWithNLP(textInputs, projectType);
+    if (result.inputs) {
+      logger.info(`NLP re-parsed ${result.inputs.parsed} of ${result.inputs.total} project inputs`);
+    }
     
     return {
       stories: result.stories || [],
-      flows: result.flows || []
+      flows: result.flow ? [result.flow] : (result.flows || [])
     };
   } catch (error) {
     logger.warn('NLP unavailable or failed while processing project inputs. Returning basic artifacts.', {
@@ -155,6 +179,7 @@ const processProjectInputs = async (inputs) => {
 
 module.exports = {
   processTextWithNLP,
+  processInputsWithNLP,
   extractUserStories,
   generateProcessFlows,
   processProjectInputs